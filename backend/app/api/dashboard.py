@@ -1,16 +1,15 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from app.core.database import get_session
-from app.models.models import Alert, User, Log
+from fastapi import APIRouter, Request
+from sqlmodel import Session, select, func
+from app.services.response_cache import response_cache
+from app.models.models import Alert, User, Log, LogRollupMinute, LogRollupHour
+from app.core.sql import bucket_index
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-import json
 import random
 
 router = APIRouter()
 
-@router.get("/stats", response_model=Dict[str, Any])
-def get_dashboard_stats(session: Session = Depends(get_session)):
+def compute_dashboard_stats(session: Session) -> Dict[str, Any]:
     """
     Get aggregated statistics for the dashboard from REAL DB DATA.
     """
@@ -18,34 +17,42 @@ def get_dashboard_stats(session: Session = Depends(get_session)):
     one_hour_ago = now - timedelta(hours=1)
     one_day_ago = now - timedelta(days=1)
 
-    # 1. Top Stats
-    total_users = session.exec(select(User)).all()
-    monitored_users = len(total_users)
+    dialect = session.get_bind().dialect.name
+
+    # 1. Top Stats (all counted in the database)
+    monitored_users = session.exec(select(func.count()).select_from(User)).one()
     
-    high_risk_alerts = session.exec(select(Alert).where(Alert.risk_score > 50)).all()
-    high_risk_users_count = len(set(a.entity_id for a in high_risk_alerts))
+    high_risk_users_count = session.exec(
+        select(func.count(func.distinct(Alert.entity_id))).where(Alert.risk_score > 50)
+    ).one()
     
-    # Real Event Count (Last Hour)
-    events_last_hour = len(session.exec(select(Log).where(Log.timestamp >= one_hour_ago)).all())
+    # Real Event Count (Last Hour, from the minute rollups)
+    events_last_hour = session.exec(
+        select(func.coalesce(func.sum(LogRollupMinute.event_count), 0))
+        .where(LogRollupMinute.bucket_start >= one_hour_ago.replace(second=0, microsecond=0))
+    ).one()
     
     # Real Offense Count (Last Hour)
-    offenses_last_hour = len(session.exec(select(Alert).where(Alert.timestamp >= one_hour_ago)).all())
+    offenses_last_hour = session.exec(
+        select(func.count()).select_from(Alert).where(Alert.timestamp >= one_hour_ago)
+    ).one()
 
     # 2. Charts Data
     # System Score (Derived from recent risk)
-    # We'll calculate a score for each hour of the last 24h
+    # Risk is summed per hour of the last 24h in a single grouped query
+    start_of_window = now - timedelta(hours=24)
+    hour_bucket = bucket_index(Alert.timestamp, start_of_window, 3600, dialect)
+    risk_by_hour = dict(session.exec(
+        select(hour_bucket, func.sum(Alert.risk_score)).where(
+            Alert.timestamp >= start_of_window,
+            Alert.timestamp < now
+        ).group_by(hour_bucket)
+    ).all())
+
     system_score_data = []
     for i in range(24):
-        start_time = now - timedelta(hours=24-i)
-        end_time = start_time + timedelta(hours=1)
-        
-        # Get alerts in this window
-        alerts_in_window = session.exec(select(Alert).where(
-            Alert.timestamp >= start_time, 
-            Alert.timestamp < end_time
-        )).all()
-        
-        total_risk = sum(a.risk_score for a in alerts_in_window)
+        start_time = start_of_window + timedelta(hours=i)
+        total_risk = risk_by_hour.get(i) or 0
         # Base score 100, minus risk. Clamped at 0.
         # Visual scale: 0-100
         score = max(0, 100 - (total_risk / 10)) 
@@ -54,13 +61,13 @@ def get_dashboard_stats(session: Session = Depends(get_session)):
         system_score_data.append({"time": time_label, "score": round(score, 1)})
 
     # Threat Types Distribution
-    # Group alerts by title
-    all_alerts = session.exec(select(Alert)).all()
+    # Group alerts by title in the database, then fold titles sharing a prefix
+    title_counts = session.exec(select(Alert.title, func.count()).group_by(Alert.title)).all()
     threat_counts = {}
-    for alert in all_alerts:
+    for full_title, count in title_counts:
         # Simplify title for grouping (e.g. "Port Scan Detected" -> "Port Scan")
-        title = alert.title.split(":")[0] if ":" in alert.title else alert.title
-        threat_counts[title] = threat_counts.get(title, 0) + 1
+        title = full_title.split(":")[0] if ":" in full_title else full_title
+        threat_counts[title] = threat_counts.get(title, 0) + count
     
     threat_types = []
     colors = ["#ef4444", "#f59e0b", "#3b82f6", "#8b5cf6", "#10b981"]
@@ -77,11 +84,11 @@ def get_dashboard_stats(session: Session = Depends(get_session)):
     # 3. Lists
     # High Risk Users
     high_risk_users = []
-    user_risks = {}
-    for alert in high_risk_alerts:
-        user_risks[alert.entity_id] = user_risks.get(alert.entity_id, 0) + alert.risk_score
-    
-    sorted_users = sorted(user_risks.items(), key=lambda x: x[1], reverse=True)[:5]
+    user_risk = func.sum(Alert.risk_score)
+    sorted_users = session.exec(
+        select(Alert.entity_id, user_risk).where(Alert.risk_score > 50)
+        .group_by(Alert.entity_id).order_by(user_risk.desc()).limit(5)
+    ).all()
     for uid, score in sorted_users:
         high_risk_users.append({"username": uid, "score": int(score)})
 
@@ -89,10 +96,12 @@ def get_dashboard_stats(session: Session = Depends(get_session)):
     categories = ["security", "network", "application", "hardware"]
     category_stats = {cat: 0 for cat in categories}
     
-    all_logs = session.exec(select(Log)).all()
-    for log in all_logs:
-        cat = log.category if log.category in categories else "security"
-        category_stats[cat] += 1
+    category_counts = session.exec(
+        select(LogRollupHour.category, func.sum(LogRollupHour.event_count)).group_by(LogRollupHour.category)
+    ).all()
+    for category, count in category_counts:
+        cat = category if category in categories else "security"
+        category_stats[cat] += count
 
     # Recent Offenses
     recent_offenses = []
@@ -154,34 +163,35 @@ def get_dashboard_stats(session: Session = Depends(get_session)):
         }
     }
 
-@router.get("/network-stats", response_model=Dict[str, Any])
-def get_network_stats(session: Session = Depends(get_session)):
+def _hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def compute_network_stats(session: Session) -> Dict[str, Any]:
     """
-    Get real-time network statistics.
+    Get real-time network statistics from the hourly rollups.
     """
-    now = datetime.utcnow()
-    # 1. Traffic Volume (Last 24h)
+    current_hour = _hour(datetime.utcnow())
+    # 1. Traffic Volume (Last 24h, 2-hour intervals)
+    start_of_window = current_hour - timedelta(hours=22)
+    hourly = session.exec(select(
+        LogRollupHour.bucket_start,
+        func.sum(LogRollupHour.bytes_in),
+        func.sum(LogRollupHour.bytes_out)
+    ).where(
+        LogRollupHour.category == "network",
+        LogRollupHour.bucket_start >= start_of_window
+    ).group_by(LogRollupHour.bucket_start)).all()
+
+    traffic = {}
+    for bucket_start, inbound, outbound in hourly:
+        slot = int((bucket_start - start_of_window).total_seconds() // 7200)
+        slot_in, slot_out = traffic.get(slot, (0, 0))
+        traffic[slot] = (slot_in + (inbound or 0), slot_out + (outbound or 0))
+
     traffic_data = []
-    for i in range(12): # 2-hour intervals
-        start_time = now - timedelta(hours=(12-i)*2)
-        end_time = start_time + timedelta(hours=2)
-        
-        logs = session.exec(select(Log).where(
-            Log.category == "network",
-            Log.timestamp >= start_time,
-            Log.timestamp < end_time
-        )).all()
-        
-        inbound = 0
-        outbound = 0
-        for log in logs:
-            try:
-                data = json.loads(log.raw_data)
-                inbound += data.get("bytes_in", 0)
-                outbound += data.get("bytes_out", 0)
-            except:
-                pass
-                
+    for i in range(12):
+        start_time = start_of_window + timedelta(hours=i * 2)
+        inbound, outbound = traffic.get(i, (0, 0))
         time_label = start_time.strftime("%H:%M")
         # Convert to MB for display
         traffic_data.append({
@@ -190,21 +200,18 @@ def get_network_stats(session: Session = Depends(get_session)):
             "outbound": round(outbound / 1024 / 1024, 2)
         })
 
-    # 2. Top Ports
-    port_counts = {}
-    recent_network_logs = session.exec(select(Log).where(Log.category == "network").limit(1000)).all()
-    for log in recent_network_logs:
-        try:
-            data = json.loads(log.raw_data)
-            port = data.get("dest_port") or data.get("port")
-            if port:
-                port_counts[port] = port_counts.get(port, 0) + 1
-        except:
-            pass
+    # 2. Top Ports (Last 24h)
+    port_count = func.sum(LogRollupHour.event_count)
+    sorted_ports = session.exec(select(
+        LogRollupHour.dest_port, port_count
+    ).where(
+        LogRollupHour.category == "network",
+        LogRollupHour.bucket_start >= start_of_window,
+        LogRollupHour.dest_port != 0
+    ).group_by(LogRollupHour.dest_port).order_by(port_count.desc()).limit(5)).all()
             
     top_ports = []
     colors = ['#3b82f6', '#10b981', '#f59e0b', '#8b5cf6', '#ef4444']
-    sorted_ports = sorted(port_counts.items(), key=lambda x: x[1], reverse=True)[:5]
     
     for i, (port, count) in enumerate(sorted_ports):
         top_ports.append({
@@ -218,35 +225,30 @@ def get_network_stats(session: Session = Depends(get_session)):
         "top_ports": top_ports
     }
 
-@router.get("/hardware-stats", response_model=Dict[str, Any])
-def get_hardware_stats(session: Session = Depends(get_session)):
+def compute_hardware_stats(session: Session) -> Dict[str, Any]:
     """
     Get real-time hardware statistics.
     """
-    now = datetime.utcnow()
+    current_hour = _hour(datetime.utcnow())
     
-    # 1. Temp Trend (Last 12h)
+    # 1. Temp Trend (Last 12h, from the hourly rollups)
+    start_of_window = current_hour - timedelta(hours=11)
+    temps_by_hour = {
+        bucket_start: (temp_sum / temp_count if temp_count else 0)
+        for bucket_start, temp_sum, temp_count in session.exec(select(
+            LogRollupHour.bucket_start,
+            func.sum(LogRollupHour.temp_sum),
+            func.sum(LogRollupHour.temp_count)
+        ).where(
+            LogRollupHour.category == "hardware",
+            LogRollupHour.bucket_start >= start_of_window
+        ).group_by(LogRollupHour.bucket_start)).all()
+    }
+
     temp_data = []
     for i in range(12):
-        start_time = now - timedelta(hours=12-i)
-        end_time = start_time + timedelta(hours=1)
-        
-        logs = session.exec(select(Log).where(
-            Log.category == "hardware",
-            Log.timestamp >= start_time,
-            Log.timestamp < end_time
-        )).all()
-        
-        temps = []
-        for log in logs:
-            try:
-                data = json.loads(log.raw_data)
-                if "temp" in data:
-                    temps.append(data["temp"])
-            except:
-                pass
-        
-        avg_temp = sum(temps) / len(temps) if temps else 0
+        start_time = start_of_window + timedelta(hours=i)
+        avg_temp = temps_by_hour.get(start_time, 0)
         time_label = start_time.strftime("%H:%M")
         temp_data.append({"time": time_label, "temp": int(avg_temp)})
 
@@ -259,73 +261,61 @@ def get_hardware_stats(session: Session = Depends(get_session)):
     for log in hw_logs:
         rack_id = log.entity_id
         if rack_id not in racks:
-            try:
-                data = json.loads(log.raw_data)
-                temp = data.get("temp", 0)
-                load = data.get("cpu_load", 0)
+            temp = log.temp or 0
+            load = log.cpu_load or 0
+            
+            status = "optimal"
+            if temp > 80 or load > 90:
+                status = "critical"
+            elif temp > 60 or load > 70:
+                status = "warning"
                 
-                status = "optimal"
-                if temp > 80 or load > 90:
-                    status = "critical"
-                elif temp > 60 or load > 70:
-                    status = "warning"
-                    
-                racks[rack_id] = {
-                    "id": rack_id,
-                    "status": status,
-                    "load": load,
-                    "temp": temp
-                }
-            except:
-                pass
+            racks[rack_id] = {
+                "id": rack_id,
+                "status": status,
+                "load": load,
+                "temp": temp
+            }
                 
     return {
         "temp_data": temp_data,
         "racks": list(racks.values())[:6] # Limit to 6 racks
     }
 
-@router.get("/app-stats", response_model=Dict[str, Any])
-def get_app_stats(session: Session = Depends(get_session)):
+def compute_app_stats(session: Session) -> Dict[str, Any]:
     """
     Get real-time application security statistics.
     """
-    now = datetime.utcnow()
+    current_hour = _hour(datetime.utcnow())
+    start_of_window = current_hour - timedelta(hours=23)
+    app_rollups = (
+        LogRollupHour.category == "application",
+        LogRollupHour.bucket_start >= start_of_window
+    )
     
     # 1. Request Volume (Last 24h)
+    requests_by_hour = dict(session.exec(select(
+        LogRollupHour.bucket_start, func.sum(LogRollupHour.event_count)
+    ).where(*app_rollups).group_by(LogRollupHour.bucket_start)).all())
+
     request_data = []
     for i in range(24):
-        start_time = now - timedelta(hours=24-i)
-        end_time = start_time + timedelta(hours=1)
-        
-        count = len(session.exec(select(Log).where(
-            Log.category == "application",
-            Log.timestamp >= start_time,
-            Log.timestamp < end_time
-        )).all())
-        
+        start_time = start_of_window + timedelta(hours=i)
         time_label = start_time.strftime("%H:00")
-        request_data.append({"time": time_label, "requests": count})
+        request_data.append({"time": time_label, "requests": requests_by_hour.get(start_time, 0)})
 
-    # 2. Top Active Users
-    user_activity = {}
-    recent_app_logs = session.exec(select(Log).where(Log.category == "application").limit(1000)).all()
-    
-    error_count = 0
-    total_requests = len(recent_app_logs)
-    
-    for log in recent_app_logs:
-        user = log.entity_id
-        user_activity[user] = user_activity.get(user, 0) + 1
-        
-        try:
-            data = json.loads(log.raw_data)
-            if data.get("status_code", 200) >= 500:
-                error_count += 1
-        except:
-            pass
+    # 2. Top Active Users (Last 24h)
+    user_requests = func.sum(LogRollupHour.event_count)
+    sorted_users = session.exec(select(
+        LogRollupHour.entity_id, user_requests
+    ).where(*app_rollups).group_by(LogRollupHour.entity_id).order_by(user_requests.desc()).limit(5)).all()
+
+    total_requests, error_count = session.exec(select(
+        func.coalesce(func.sum(LogRollupHour.event_count), 0),
+        func.coalesce(func.sum(LogRollupHour.error_count), 0)
+    ).where(*app_rollups)).one()
             
     top_users = []
-    sorted_users = sorted(user_activity.items(), key=lambda x: x[1], reverse=True)[:5]
     for user, count in sorted_users:
         top_users.append({"name": user, "requests": count})
 
@@ -363,3 +353,29 @@ def get_app_stats(session: Session = Depends(get_session)):
         "total_requests": total_requests,
         "app_alerts": app_alerts
     }
+
+# Endpoints: served from the shared response cache, invalidated by ingest
+# and analysis commits; clients can revalidate with If-None-Match
+
+@router.get("/stats", response_model=Dict[str, Any])
+def get_dashboard_stats(request: Request):
+    return response_cache.respond(request, "stats", compute_dashboard_stats)
+
+@router.get("/network-stats", response_model=Dict[str, Any])
+def get_network_stats(request: Request):
+    return response_cache.respond(request, "network-stats", compute_network_stats)
+
+@router.get("/hardware-stats", response_model=Dict[str, Any])
+def get_hardware_stats(request: Request):
+    return response_cache.respond(request, "hardware-stats", compute_hardware_stats)
+
+@router.get("/app-stats", response_model=Dict[str, Any])
+def get_app_stats(request: Request):
+    return response_cache.respond(request, "app-stats", compute_app_stats)
+
+@router.get("/cache-stats", response_model=Dict[str, Any])
+def get_cache_stats():
+    """
+    Hit ratio, 304s and compute time per cached dashboard payload.
+    """
+    return response_cache.stats()
@@ -1,42 +1,339 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlmodel import Session
-from app.core.database import get_session
-from app.models.models import Log, Alert
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import get_session, get_writer_session
+from app.models.models import Log, Alert, Incident, SoarAction
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 import json
+import threading
+import time
 
 router = APIRouter()
 
-from app.services.analysis import analyze_log_task
-from app.core.database import engine
-from sqlmodel import Session as SQLSession
-
-def get_session_factory():
-    return lambda: SQLSession(engine)
+from app.services.ingest import ingest_batch, ingest_stats, parse_batch
+from app.services.normalization import normalize_log
+from app.services.rollups import apply_rollups
+from app.services.workers import analysis_pool
+from app.ml.training import model_trainer
+from app.services.rule_engine import rule_engine
+from app.services.threat_intel import threat_intel
+from app.services.entity_context import entity_context
+from app.services.correlation import correlation_engine
+from app.services.alert_aggregation import alert_aggregator
+from app.services.soar_executor import soar_executor
+from app.services.live import live_hub
+from app.services.response_cache import keys_for_log_categories, response_cache
+from app.services.search import SEARCH_MODELS, SearchFilters, build_query, stream_page
+from app.services.export import ExportJob
+from app.services.partitions import log_partitions
 
 from app.core.logging import logger
 
+def _analysis_queue_full():
+    return HTTPException(
+        status_code=429,
+        detail="Analysis queue is full, retry later",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/logs", response_model=Log)
-def ingest_log(log: Log, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+def ingest_log(log: Log, session: Session = Depends(get_writer_session)):
     """
     Ingest a new log entry.
-    Trigger async analysis here.
+    Analysis runs asynchronously on the analysis worker pool.
     """
     logger.info(f"Received log from {log.source} (Type: {log.event_type})")
-    session.add(log)
-    session.commit()
-    session.refresh(log)
+    if not analysis_pool.reserve(1):
+        raise _analysis_queue_full()
+
+    try:
+        start = time.perf_counter()
+        normalize_log(log)
+        session.add(log)
+        apply_rollups(session, [log])
+        session.commit()
+        session.refresh(log)
+        ingest_stats.record(1, 0, time.perf_counter() - start)
+        response_cache.invalidate(keys_for_log_categories([log.category]))
+        live_hub.publish_logs([log])
+    except Exception:
+        analysis_pool.release(1)
+        raise
     
-    background_tasks.add_task(analyze_log_task, log.id, get_session_factory())
+    analysis_pool.submit([log.id], reserved=1)
     
     return log
 
+@router.post("/logs/batch", response_model=Dict[str, Any])
+async def ingest_log_batch(request: Request, session: Session = Depends(get_writer_session)):
+    """
+    Ingest many logs at once, as a JSON array or NDJSON (Content-Type: application/x-ndjson).
+    All valid records are stored with one bulk insert and analyzed as a single job.
+    """
+    body = await request.body()
+    try:
+        records = parse_batch(body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(records) > settings.INGEST_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(records)} records exceeds limit of {settings.INGEST_MAX_BATCH_SIZE}"
+        )
+
+    # Blocks in "block" backpressure mode, so keep it off the event loop
+    if not await run_in_threadpool(analysis_pool.reserve, len(records)):
+        raise _analysis_queue_full()
+
+    try:
+        summary, log_ids = await run_in_threadpool(ingest_batch, session, records)
+    except Exception:
+        analysis_pool.release(len(records))
+        raise
+
+    analysis_pool.submit(log_ids, reserved=len(records))
+
+    return summary
+
+@router.get("/ingest/stats", response_model=Dict[str, Any])
+def read_ingest_stats():
+    """
+    Ingest throughput counters, for sizing collectors.
+    """
+    return ingest_stats.snapshot()
+
+@router.get("/model", response_model=Dict[str, Any])
+def read_model_status():
+    """
+    Current anomaly model version, training time and sample count.
+    """
+    return model_trainer.status()
+
+@router.post("/model/train", response_model=Dict[str, Any], status_code=202)
+def trigger_model_training():
+    """
+    Start a retraining run in the background.
+    """
+    threading.Thread(target=_train_quietly, name="model-trainer-manual", daemon=True).start()
+    return {"status": "training started"}
+
+def _train_quietly():
+    try:
+        model_trainer.train_now()
+    except Exception:
+        pass  # Already logged; surfaced through /model last_error
+
+@router.get("/analysis/stats", response_model=Dict[str, Any])
+def read_analysis_stats():
+    """
+    Analysis queue depth, lag and per-worker throughput.
+    """
+    return analysis_pool.snapshot()
+
+@router.get("/rules/stats", response_model=Dict[str, Any])
+def read_rule_stats():
+    """
+    Per-rule evaluation counts, hits and time spent, slowest first.
+    """
+    return rule_engine.stats()
+
+@router.get("/entity-context/stats", response_model=Dict[str, Any])
+def read_entity_context_stats():
+    """
+    User and asset context cache size, hit ratio and evictions.
+    """
+    return entity_context.stats()
+
+@router.get("/threat-intel", response_model=Dict[str, Any])
+def read_threat_intel_stats():
+    """
+    Loaded feed version, sources and indicator counts.
+    """
+    return threat_intel.stats()
+
+@router.post("/threat-intel/reload", response_model=Dict[str, Any])
+def reload_threat_intel():
+    """
+    Reload the configured feeds. Analysis keeps using the previous
+    version until the new index is swapped in.
+    """
+    return threat_intel.reload()
+
+@router.get("/alerts/stats", response_model=Dict[str, Any])
+def read_alert_aggregation_stats():
+    """
+    Alerts created vs repeat occurrences folded into existing alerts.
+    """
+    return alert_aggregator.stats()
+
 @router.get("/alerts", response_model=List[Alert])
 def read_alerts(skip: int = 0, limit: int = 100, session: Session = Depends(get_session)):
     logger.debug(f"Fetching alerts (skip={skip}, limit={limit})")
     return session.query(Alert).offset(skip).limit(limit).all()
 
+@router.get("/incidents", response_model=List[Dict[str, Any]])
+def read_incidents(
+    status: Optional[str] = None,
+    escalated: Optional[bool] = None,
+    skip: int = 0,
+    limit: int = 50,
+    session: Session = Depends(get_session)
+):
+    """
+    Incidents, most recently active first, each with its member alerts.
+    """
+    statement = select(Incident)
+    if status:
+        statement = statement.where(Incident.status == status)
+    if escalated is not None:
+        statement = statement.where(Incident.escalated == escalated)
+    incidents = session.exec(statement.order_by(Incident.last_seen.desc()).offset(skip).limit(limit)).all()
+    return _with_alerts(session, incidents)
+
+@router.get("/incidents/stats", response_model=Dict[str, Any])
+def read_incident_stats():
+    return correlation_engine.stats()
+
+@router.get("/incidents/{incident_id}", response_model=Dict[str, Any])
+def read_incident(incident_id: int, session: Session = Depends(get_session)):
+    incident = session.get(Incident, incident_id)
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return _with_alerts(session, [incident])[0]
+
+def _with_alerts(session: Session, incidents: List[Incident]) -> List[Dict[str, Any]]:
+    # One query for the member alerts of every incident on the page
+    alerts: Dict[int, List[Alert]] = {i.id: [] for i in incidents}
+    if alerts:
+        for alert in session.exec(select(Alert).where(Alert.incident_id.in_(alerts)).order_by(Alert.timestamp)).all():
+            alerts[alert.incident_id].append(alert)
+    return [{**incident.model_dump(), "alerts": alerts[incident.id]} for incident in incidents]
+
+@router.get("/soar/actions", response_model=List[SoarAction])
+def read_soar_actions(
+    status: Optional[str] = None,
+    alert_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    session: Session = Depends(get_session)
+):
+    """
+    Queued and completed SOAR actions, newest first.
+    """
+    statement = select(SoarAction)
+    if status:
+        statement = statement.where(SoarAction.status == status)
+    if alert_id is not None:
+        statement = statement.where(SoarAction.alert_id == alert_id)
+    return session.exec(statement.order_by(SoarAction.id.desc()).offset(skip).limit(limit)).all()
+
+@router.get("/soar/stats", response_model=Dict[str, Any])
+def read_soar_stats(session: Session = Depends(get_session)):
+    """
+    SOAR queue depth by status, in-flight calls per connector and outcome counters.
+    """
+    return soar_executor.stats(session)
+
+@router.get("/logs/partitions", response_model=Dict[str, Any])
+def read_log_partitions():
+    """
+    Hot table size and the per-day log partitions, oldest first.
+    """
+    return log_partitions.stats()
+
+@router.post("/logs/partitions/maintain", response_model=Dict[str, Any])
+def maintain_log_partitions():
+    """
+    Roll aged days out of the hot table and apply retention now.
+    """
+    return log_partitions.maintain()
+
 @router.get("/logs", response_model=List[Log])
 def read_logs(skip: int = 0, limit: int = 50, session: Session = Depends(get_session)):
     logger.debug(f"Fetching logs (skip={skip}, limit={limit})")
     return session.query(Log).order_by(Log.timestamp.desc()).offset(skip).limit(limit).all()
+
+def search_filters(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    category: Optional[List[str]] = Query(None),
+    source: Optional[List[str]] = Query(None),
+    event_type: Optional[List[str]] = Query(None),
+    entity_id: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    min_risk: Optional[float] = None,
+    max_risk: Optional[float] = None,
+) -> SearchFilters:
+    return SearchFilters(start, end, category, source, event_type, entity_id, status, min_risk, max_risk)
+
+def _split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+def _search(table: str, filters: SearchFilters, fields: Optional[str], cursor: Optional[str], limit: int, order: str):
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    try:
+        query = build_query(SEARCH_MODELS[table], filters, _split_fields(fields), cursor, order == "desc")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(stream_page(query, limit), media_type="application/json")
+
+@router.get("/logs/search")
+def search_logs(
+    filters: SearchFilters = Depends(search_filters),
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    order: str = "desc",
+):
+    """
+    Filtered log search, newest first. `fields` is a comma-separated column
+    list (id and timestamp are always included). Pass the returned
+    `next_cursor` as `cursor` for the next page; it is null on the last one.
+    """
+    return _search("logs", filters, fields, cursor, limit, order)
+
+@router.get("/alerts/search")
+def search_alerts(
+    filters: SearchFilters = Depends(search_filters),
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    order: str = "desc",
+):
+    """
+    Filtered alert search, newest first; same parameters as /logs/search,
+    plus `min_risk` / `max_risk`.
+    """
+    return _search("alerts", filters, fields, cursor, limit, order)
+
+def _export(table: str, filters: SearchFilters, fields: Optional[str], format: str):
+    try:
+        job = ExportJob(table, filters, _split_fields(fields), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = job.filename(datetime.utcnow().strftime("%Y%m%d%H%M%S"))
+    return StreamingResponse(
+        job.stream(),
+        media_type=job.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/logs/export")
+def export_logs(filters: SearchFilters = Depends(search_filters), fields: Optional[str] = None, format: str = "ndjson"):
+    """
+    Stream every matching log, oldest first, as ndjson, csv, parquet or
+    arrow (IPC stream). Takes the same filters and `fields` as /logs/search.
+    """
+    return _export("logs", filters, fields, format)
+
+@router.get("/alerts/export")
+def export_alerts(filters: SearchFilters = Depends(search_filters), fields: Optional[str] = None, format: str = "ndjson"):
+    """
+    Stream every matching alert; same parameters as /logs/export.
+    """
+    return _export("alerts", filters, fields, format)
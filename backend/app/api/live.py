@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.api import dashboard
+from app.services.live import live_hub
+from typing import Any, Dict, List
+import asyncio
+
+router = APIRouter()
+
+# Topic -> the dashboard endpoint whose response it streams
+live_hub.register_snapshot("stats", dashboard.compute_dashboard_stats)
+live_hub.register_snapshot("network-stats", dashboard.compute_network_stats)
+live_hub.register_snapshot("hardware-stats", dashboard.compute_hardware_stats)
+live_hub.register_snapshot("app-stats", dashboard.compute_app_stats)
+
+
+def _parse_topics(topics: str) -> List[str]:
+    return [t.strip() for t in topics.split(",") if t.strip()] or ["events"]
+
+
+@router.get("/events")
+async def live_events(request: Request, topics: str = "events,stats"):
+    """
+    Server-Sent Events stream. `topics` is a comma-separated list of
+    "events" (deltas: new logs, new alerts, counters) and dashboard snapshot
+    topics ("stats", "network-stats", "hardware-stats", "app-stats").
+    Each message's SSE event name is its type: delta, snapshot or resync.
+    """
+    async def stream():
+        subscriber = live_hub.subscribe(_parse_topics(topics))
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    kind, message = await asyncio.wait_for(subscriber.queue.get(), settings.LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {kind}\ndata: {message}\n\n"
+        finally:
+            live_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def live_websocket(websocket: WebSocket, topics: str = "events,stats"):
+    """
+    WebSocket stream with the same messages as /events, one JSON text frame each.
+    """
+    await websocket.accept()
+    subscriber = live_hub.subscribe(_parse_topics(topics))
+    try:
+        while True:
+            try:
+                _, message = await asyncio.wait_for(subscriber.queue.get(), settings.LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                message = '{"type": "ping"}'
+            await websocket.send_text(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        live_hub.unsubscribe(subscriber)
+
+
+@router.get("/stats", response_model=Dict[str, Any])
+def read_live_stats():
+    return live_hub.stats()
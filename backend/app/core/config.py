@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Titan-SIEM"
@@ -8,6 +9,100 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Database engine; the profile follows DATABASE_URL (sqlite:/// or postgresql+psycopg://)
+    DB_POOL_SIZE: int = 10 # connections kept open
+    DB_MAX_OVERFLOW: int = 20 # extra connections opened under load
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0 # wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800 # PostgreSQL: reopen connections older than this
+    DB_POOL_PRE_PING: bool = True # PostgreSQL: check connections before use, so server restarts are survived
+    POSTGRES_COPY_INGEST: bool = True # PostgreSQL: bulk ingest with COPY instead of a multi-row INSERT
+    SQLITE_JOURNAL_MODE: str = "WAL" # readers and the writer do not block each other
+    SQLITE_SYNCHRONOUS: str = "NORMAL" # with WAL, fsync only at checkpoints: survives crashes, may lose the last commits on power loss
+    SQLITE_MMAP_SIZE: int = 268435456 # bytes of the database read through mmap
+    SQLITE_CACHE_SIZE_KB: int = 65536 # page cache per connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000 # wait this long for the write lock held by another connection or process
+
+    # Ingestion
+    INGEST_MAX_BATCH_SIZE: int = 10000
+    INGEST_MAX_REPORTED_ERRORS: int = 50
+
+    # Analysis workers
+    ANALYSIS_WORKERS: int = 2
+    ANALYSIS_BATCH_SIZE: int = 500 # logs analyzed per transaction
+    ANALYSIS_QUEUE_MAX_LOGS: int = 50000
+    ANALYSIS_BACKPRESSURE: str = "reject" # reject (HTTP 429) or block
+    ANALYSIS_BLOCK_TIMEOUT: float = 5.0 # seconds to wait for queue space in block mode
+    ANALYSIS_CLAIM_TTL_SECONDS: int = 600 # a process's claims on unprocessed logs requeued at startup expire after this
+
+    # Detection rules
+    SQLI_SIGNATURES_PATH: Optional[str] = None # extra signatures: one per line, or a JSON array
+
+    # Threat intel: comma-separated feed files and/or directories (.csv, .json, plain lists)
+    THREAT_INTEL_FEEDS: str = ""
+    THREAT_INTEL_BLOOM_FP_RATE: float = 0.0 # Bloom prefilter false-positive rate (e.g. 0.01 for large feeds); 0 disables
+    THREAT_INTEL_SNAPSHOT: Optional[str] = None # compiled snapshot (manage.py compile-threat-intel), used instead of the feeds
+
+    # Entity context cache (users, assets)
+    ENTITY_CACHE_TTL_SECONDS: int = 300
+    ENTITY_CACHE_MAX_SIZE: int = 50000
+
+    # Alert aggregation
+    ALERT_SUPPRESSION_WINDOW_SECONDS: int = 300 # repeats within this window update one alert; 0 disables
+
+    # Alert correlation
+    CORRELATION_WINDOW_MINUTES: int = 30 # max gap between alerts of one incident
+    CORRELATION_MIN_ALERTS: int = 2 # escalate when an incident has at least this many alerts...
+    CORRELATION_ESCALATION_RISK: float = 50.0 # ...and their total risk exceeds this
+
+    # SOAR action executor
+    SOAR_CONNECTOR_CONCURRENCY: str = "firewall=8,iam=4,edr=4" # max in-flight calls per connector
+    SOAR_ACTION_TIMEOUT_SECONDS: float = 10.0
+    SOAR_MAX_ATTEMPTS: int = 5
+    SOAR_RETRY_BASE_SECONDS: float = 2.0 # backoff doubles per attempt, with jitter...
+    SOAR_RETRY_MAX_SECONDS: float = 300.0 # ...up to this
+    SOAR_POLL_INTERVAL_SECONDS: float = 1.0
+    SOAR_CLAIM_BATCH_SIZE: int = 100
+    SOAR_STUB_LATENCY_MS: int = 50 # simulated latency of the local stub connectors
+    SOAR_STUB_FAILURE_RATE: float = 0.0 # fraction of stub calls that fail, for load tests
+
+    # Log / alert search
+    SEARCH_MAX_PAGE_SIZE: int = 5000
+    SEARCH_FETCH_SIZE: int = 1000 # rows fetched per round trip while streaming results
+    EXPORT_CHUNK_SIZE: int = 10000 # rows fetched per round trip and per Parquet row group / Arrow batch
+
+    # Dashboard response cache
+    DASHBOARD_CACHE_TTL_SECONDS: float = 5.0 # max age of an unchanged payload (time windows still move)
+    DASHBOARD_CACHE_MIN_REFRESH_SECONDS: float = 1.0 # while data keeps changing, recompute at most this often
+
+    # Live dashboard stream (WebSocket / SSE)
+    LIVE_FLUSH_INTERVAL_SECONDS: float = 0.5 # deltas published within this interval go out as one message
+    LIVE_SNAPSHOT_INTERVAL_SECONDS: float = 2.0 # min time between recomputing one dashboard snapshot
+    LIVE_MAX_DELTA_ITEMS: int = 50 # newest logs/alerts kept per delta message
+    LIVE_SUBSCRIBER_QUEUE_SIZE: int = 100 # a viewer this far behind is told to resync
+    LIVE_HEARTBEAT_SECONDS: float = 15.0
+
+    # Anomaly model training
+    MODEL_PATH: str = "model.pkl"
+    MODEL_DIR: str = "models" # versioned model artifacts
+    MODEL_KEEP_VERSIONS: int = 5
+    MODEL_RETRAIN_INTERVAL_SECONDS: int = 3600 # 0 disables scheduled retraining
+    MODEL_TRAINING_WINDOW_HOURS: int = 24
+    MODEL_TRAINING_MAX_SAMPLES: int = 50000
+    MODEL_MIN_TRAINING_SAMPLES: int = 200
+
+    # Dashboard rollups
+    ROLLUP_MINUTE_RETENTION_HOURS: int = 48
+
+    # Log partitions: the Log table only holds recent (hot) days
+    LOG_HOT_DAYS: int = 2 # whole UTC days kept in Log besides today; must cover the detection and training windows
+    LOG_RETENTION_DAYS: int = 0 # partitions older than this are dropped; 0 keeps everything
+    LOG_PARTITION_INTERVAL_SECONDS: int = 3600 # how often to roll over and apply retention; 0 disables
+
+    # Cold log tier: aged partitions compacted into Parquet files
+    COLD_STORAGE_DIR: str = "cold"
+    COLD_AFTER_DAYS: int = 30 # partitions older than this are compacted; 0 disables
+    COLD_ROW_GROUP_SIZE: int = 50000 # rows per Parquet row group, the unit of time-range pruning
+
     class Config:
         env_file = ".env"
 
@@ -1,11 +1,83 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlmodel import SQLModel, create_engine, Session
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+
+def database_profile(url: str) -> str:
+    """The engine profile for a database URL: "sqlite" or "postgres"."""
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return "sqlite"
+    if backend == "postgresql":
+        return "postgres"
+    raise ValueError(f"Unsupported database '{backend}' (expected sqlite or postgresql)")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.close()
+
+
+def create_engines(url: str):
+    """
+    (engine, writer_engine) for a database URL, tuned for its profile.
+
+    SQLite: every connection gets the SQLITE_* pragmas (WAL by default, so
+    dashboard reads never wait for ingest), and the ingest endpoints write
+    through a writer engine holding a single connection, so concurrent
+    batches queue in the pool instead of retrying on the database file
+    lock. Background writers (analysis workers, SOAR executor, partition
+    and cold-tier maintenance) stay on the general pool: their sessions
+    hold a connection across scoring or file writes, which would stall
+    ingest on a shared one. Their writes still contend for SQLite's lock
+    and wait on busy_timeout.
+    PostgreSQL: one pooled engine for both, sized by DB_POOL_*.
+    """
+    pool = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+    if database_profile(url) == "postgres":
+        engine = create_engine(
+            url,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            **pool
+        )
+        return engine, engine
+
+    connect_args = {"check_same_thread": False}
+    if make_url(url).database in (None, "", ":memory:"):
+        # One connection per thread; a separate writer would see another database
+        engine = create_engine(url, connect_args=connect_args)
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        return engine, engine
+    engine = create_engine(url, connect_args=connect_args, **pool)
+    writer_engine = create_engine(url, connect_args=connect_args, pool_size=1, max_overflow=0, pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS)
+    for e in (engine, writer_engine):
+        event.listen(e, "connect", _set_sqlite_pragmas)
+    return engine, writer_engine
+
+
+engine, writer_engine = create_engines(settings.DATABASE_URL)
 
 def create_db_and_tables():
+    from app.core.migrations import run_migrations
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+def get_writer_session():
+    """Session for the ingest endpoints (the dedicated writer connection on SQLite)."""
+    with Session(writer_engine) as session:
+        yield session
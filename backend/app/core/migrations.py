@@ -0,0 +1,105 @@
+from sqlmodel import SQLModel, Session, select
+from sqlalchemy import inspect, literal, text, update
+from app.models.models import Asset, Log, SchemaMigration
+from app.core.logging import logger
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def _column_ddl(column, dialect) -> str:
+    ddl = f"{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        rendered = literal(default, type_=column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {rendered}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+
+def sync_schema(engine, tables=None):
+    """
+    Add columns and indexes that exist on the models (or `tables`) but not yet
+    in the database. create_all() only creates missing tables, so this covers
+    databases created by an older version of the models.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in tables if tables is not None else SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            table_name = conn.dialect.identifier_preparer.quote(table.name)
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    logger.info(f"Migration: adding column {table.name}.{column.name}")
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {_column_ddl(column, conn.dialect)}"))
+
+            existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    logger.info(f"Migration: creating index {index.name}")
+                    index.create(conn)
+
+
+def backfill_log_normalized_fields(session: Session):
+    """
+    Populate the normalized Log columns for rows ingested before they existed.
+    """
+    from app.services.normalization import extract_fields, parse_raw_data
+
+    last_id = 0
+    total = 0
+    while True:
+        rows = session.exec(
+            select(Log.id, Log.raw_data).where(Log.id > last_id).order_by(Log.id).limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = [{"id": log_id, **extract_fields(parse_raw_data(raw_data))} for log_id, raw_data in rows]
+        session.execute(update(Log), updates)
+        session.commit()
+        last_id = rows[-1][0]
+        total += len(rows)
+
+    logger.info(f"Migration: backfilled normalized fields for {total} logs")
+
+
+def build_log_rollups(session: Session):
+    from app.services.rollups import rebuild_rollups
+    rebuild_rollups(session)
+
+
+def seed_critical_assets(session: Session):
+    """
+    The payment gateway was hard-coded as the only critical asset (x1.2).
+    """
+    if not session.exec(select(Asset).where(Asset.name == "payment_gateway")).first():
+        session.add(Asset(name="payment_gateway", display_name="Payment Gateway", asset_type="application", criticality=1.2))
+
+
+# Data migrations, applied once each and in order
+MIGRATIONS = [
+    ("0001_backfill_log_normalized_fields", backfill_log_normalized_fields),
+    ("0002_build_log_rollups", build_log_rollups),
+    ("0003_seed_critical_assets", seed_critical_assets),
+]
+
+
+def run_migrations(engine):
+    from app.services.partitions import log_partitions
+
+    sync_schema(engine)
+    # Partitions copy the Log schema, so they get its new columns too
+    sync_schema(engine, log_partitions.catalogued_tables())
+
+    with Session(engine) as session:
+        applied = set(session.exec(select(SchemaMigration.name)).all())
+        for name, migrate in MIGRATIONS:
+            if name in applied:
+                continue
+            logger.info(f"Applying migration {name}")
+            migrate(session)
+            session.add(SchemaMigration(name=name))
+            session.commit()
@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, cast, func
+from datetime import datetime
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(value: datetime) -> int:
+    """Seconds since the epoch for a naive UTC datetime."""
+    return int((value - EPOCH).total_seconds())
+
+
+def epoch_seconds(column, dialect_name: str):
+    """SQL expression for a naive UTC timestamp column as integer epoch seconds."""
+    if dialect_name == "sqlite":
+        return cast(func.strftime("%s", column), BigInteger)
+    return cast(func.extract("epoch", column), BigInteger)
+
+
+def bucket_index(column, start: datetime, width_seconds: int, dialect_name: str):
+    """
+    SQL expression numbering fixed-width time buckets from `start` (0, 1, 2...).
+    Only valid for rows with column >= start.
+    """
+    return (epoch_seconds(column, dialect_name) - to_epoch(start)) // width_seconds
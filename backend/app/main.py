@@ -9,8 +9,47 @@ async def lifespan(app: FastAPI):
     setup_logging()
     logger.info("Titan-SIEM Backend Starting...")
     create_db_and_tables()
+
+    from sqlmodel import Session
+    from app.core.database import engine
+    from app.services.rules import ALL_RULES
+    from app.services.state_store import window_store
+    from app.ml.features import feature_extractor
+    from app.ml.training import model_trainer
+    from app.ml.anomaly_detector import detector
+    try:
+        detector.load()
+    except Exception as e:
+        logger.error(f"Failed to load anomaly model: {e}")
+    from app.services.workers import analysis_pool
+    from app.services.threat_intel import threat_intel
+    from app.services.entity_context import entity_context
+    from app.services.correlation import correlation_engine
+    from app.services.alert_aggregation import alert_aggregator
+    from app.services.soar_executor import soar_executor
+    from app.services.partitions import log_partitions
+    threat_intel.reload()
+    with Session(engine) as session:
+        window_store.rebuild(session, ALL_RULES + [feature_extractor])
+        entity_context.warm(session)
+        correlation_engine.close_stale(session)
+        correlation_engine.load(session)
+        alert_aggregator.load(session)
+        session.commit()
+    analysis_pool.start()
+    analysis_pool.requeue_unprocessed()
+    soar_executor.start()
+    model_trainer.start()
+    log_partitions.start()
+    from app.services.live import live_hub
+    await live_hub.start()
     yield
     logger.info("Titan-SIEM Backend Shutting Down...")
+    await live_hub.stop()
+    model_trainer.stop()
+    log_partitions.stop()
+    analysis_pool.stop()
+    soar_executor.stop()
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -28,9 +67,10 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 
-from app.api import endpoints, dashboard
+from app.api import endpoints, dashboard, live
 app.include_router(endpoints.router, prefix=settings.API_V1_STR)
 app.include_router(dashboard.router, prefix=f"{settings.API_V1_STR}/dashboard", tags=["dashboard"])
+app.include_router(live.router, prefix=f"{settings.API_V1_STR}/live", tags=["live"])
 
 @app.get("/")
 def root():
@@ -1,48 +1,160 @@
 import numpy as np
 from sklearn.ensemble import IsolationForest
+from app.core.config import settings
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import glob
 import joblib
 import os
+import re
+
+MODEL_PARAMS = {"contamination": 0.05, "random_state": 42}
+
+
+def fit_isolation_forest(data: np.ndarray) -> IsolationForest:
+    """
+    Fit a fresh model. Module-level so it can run in a separate process.
+    """
+    model = IsolationForest(**MODEL_PARAMS)
+    model.fit(data)
+    return model
+
 
 class AnomalyDetector:
-    def __init__(self, model_path="model.pkl"):
+    """
+    IsolationForest wrapper with an atomically swappable in-memory model.
+
+    The model and its metadata live in one tuple that is replaced in a single
+    assignment, so concurrent scoring always sees a consistent pair. The disk
+    is only read by an explicit load(), never on the scoring path.
+    """
+    def __init__(self, model_path="model.pkl", model_dir="models", keep_versions=5):
         self.model_path = model_path
-        self.model = IsolationForest(contamination=0.05, random_state=42)
-        self.is_trained = False
+        self.model_dir = model_dir
+        self.keep_versions = keep_versions
+        self._state: Tuple[Optional[IsolationForest], Dict[str, Any]] = (None, {})
+        self._warned_shape = False
+
+    @property
+    def model(self) -> Optional[IsolationForest]:
+        return self._state[0]
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return dict(self._state[1])
+
+    @property
+    def is_trained(self) -> bool:
+        return self._state[0] is not None
 
     def train(self, data: np.ndarray):
         """
-        Train the Isolation Forest model.
-        Data should be a 2D array of features (e.g., [hour, location_id, access_count]).
+        Train the Isolation Forest model in-process and publish it.
+        Data should be a 2D array of features, see app.ml.features.FEATURE_NAMES.
+        """
+        self.publish(fit_isolation_forest(data), sample_count=len(data))
+
+    def publish(self, model: IsolationForest, sample_count: int, training_seconds: Optional[float] = None):
+        """
+        Save a newly fitted model as the next version and hot-swap it in.
         """
-        self.model.fit(data)
-        self.is_trained = True
-        joblib.dump(self.model, self.model_path)
+        version = self._next_version()
+        info = {
+            "version": version,
+            "trained_at": datetime.utcnow().isoformat(),
+            "sample_count": sample_count,
+            "training_seconds": training_seconds,
+            "n_features": int(getattr(model, "n_features_in_", 0)),
+        }
+        artifact = {"model": model, "info": info}
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        versioned_path = os.path.join(self.model_dir, f"model-v{version:04d}.pkl")
+        self._dump_atomic(artifact, versioned_path)
+        self._dump_atomic(artifact, self.model_path)
+        info["path"] = versioned_path
+
+        self._state = (model, info)
+        self._warned_shape = False
+        self._prune_versions()
+
+    def _dump_atomic(self, artifact: Dict[str, Any], path: str):
+        tmp_path = f"{path}.tmp"
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _versions(self):
+        versions = []
+        for path in glob.glob(os.path.join(self.model_dir, "model-v*.pkl")):
+            match = re.search(r"model-v(\d+)\.pkl$", path)
+            if match:
+                versions.append((int(match.group(1)), path))
+        return sorted(versions)
+
+    def _next_version(self) -> int:
+        versions = self._versions()
+        current = self._state[1].get("version", 0)
+        return max([current] + [v for v, _ in versions]) + 1
+
+    def _prune_versions(self):
+        for _, path in self._versions()[:-self.keep_versions]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
     def load(self):
-        if os.path.exists(self.model_path):
-            self.model = joblib.load(self.model_path)
-            self.is_trained = True
+        """
+        Load the latest published model from disk, if any. Called at startup.
+        """
+        if not os.path.exists(self.model_path):
+            return
+        artifact = joblib.load(self.model_path)
+        if isinstance(artifact, dict) and "model" in artifact:
+            self._state = (artifact["model"], dict(artifact.get("info", {})))
+        else:
+            # Bare model saved by older versions
+            self._state = (artifact, {"version": 0, "n_features": int(getattr(artifact, "n_features_in_", 0))})
+
+    def score_batch(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score an (N, k) feature matrix with a single forest pass.
+        Returns (scores, labels): lower scores are more anomalous,
+        labels are -1 for anomaly and 1 for normal.
+        """
+        n = features.shape[0]
+        model = self._state[0]
+        if model is None:
+            return np.zeros(n), np.ones(n, dtype=int) # Default to normal if not trained
+
+        expected = getattr(model, "n_features_in_", features.shape[1])
+        if features.shape[1] != expected:
+            # Model was trained on a different feature set; treat as untrained until retrained
+            if not self._warned_shape:
+                from app.core.logging import logger
+                logger.warning(f"Anomaly model expects {expected} features, got {features.shape[1]}. Retrain the model.")
+                self._warned_shape = True
+            return np.zeros(n), np.ones(n, dtype=int)
+
+        scores = model.score_samples(features)
+        # Same decision rule as IsolationForest.predict, without a second pass
+        labels = np.where(scores - model.offset_ < 0, -1, 1)
+        return scores, labels
 
     def predict(self, features: np.ndarray) -> int:
         """
         Returns -1 for anomaly, 1 for normal.
         """
-        if not self.is_trained:
-            self.load()
-            if not self.is_trained:
-                return 1 # Default to normal if not trained
-        
-        return self.model.predict(features)[0]
+        return int(self.score_batch(features)[1][0])
 
     def score_samples(self, features: np.ndarray) -> float:
         """
         Returns anomaly score. Lower is more anomalous.
         """
-        if not self.is_trained:
-            self.load()
-            if not self.is_trained:
-                return 0.0
-        
-        return self.model.score_samples(features)[0]
+        return float(self.score_batch(features)[0][0])
 
-detector = AnomalyDetector()
+detector = AnomalyDetector(
+    model_path=settings.MODEL_PATH,
+    model_dir=settings.MODEL_DIR,
+    keep_versions=settings.MODEL_KEEP_VERSIONS
+)
@@ -0,0 +1,76 @@
+import numpy as np
+from app.models.models import Log
+from app.services.state_store import window_store
+from datetime import timedelta
+from typing import List
+import zlib
+
+FEATURE_NAMES = ["hour", "event_type_code", "entity_event_count", "log_bytes"]
+ROLLING_WINDOW = timedelta(minutes=10)
+
+
+def event_type_code(event_type: str) -> int:
+    """Stable small integer for an event type (same value across processes)."""
+    return zlib.crc32((event_type or "").encode("utf-8")) % 1024
+
+
+class FeatureExtractor:
+    """
+    Builds the per-entity numeric feature matrix used by the anomaly detector:
+    hour of day, event-type code, events by the same entity in the last
+    10 minutes, and log(1 + bytes transferred).
+    """
+    def __init__(self):
+        self.entity_events = window_store.window("entity_events", ROLLING_WINDOW, timedelta(seconds=10))
+
+    def observe(self, log: Log, parsed_data: dict = None):
+        self.entity_events.add(log.entity_id, log.timestamp)
+
+    def _static_columns(self, logs: List[Log]) -> np.ndarray:
+        n = len(logs)
+        features = np.empty((n, len(FEATURE_NAMES)), dtype=np.float64)
+        features[:, 0] = np.fromiter((log.timestamp.hour for log in logs), dtype=np.float64, count=n)
+        features[:, 1] = np.fromiter((event_type_code(log.event_type) for log in logs), dtype=np.float64, count=n)
+        bytes_total = np.fromiter(((log.bytes_in or 0) + (log.bytes_out or 0) for log in logs), dtype=np.float64, count=n)
+        features[:, 3] = np.log1p(bytes_total)
+        return features
+
+    def transform(self, logs: List[Log]) -> np.ndarray:
+        """
+        Live features for logs in time order. Each log is added to the shared
+        rolling per-entity counters before its count is read.
+        """
+        features = self._static_columns(logs)
+        counts = np.empty(len(logs), dtype=np.float64)
+        for i, log in enumerate(logs):
+            self.observe(log)
+            counts[i] = self.entity_events.count(log.entity_id, log.timestamp)
+        features[:, 2] = counts
+        return features
+
+    def transform_offline(self, logs: List[Log]) -> np.ndarray:
+        """
+        Features for a historical set of logs (e.g. a training window).
+        Rolling counts are computed within the given logs only and the shared
+        live counters are left untouched.
+        """
+        if not logs:
+            return np.empty((0, len(FEATURE_NAMES)))
+        logs = sorted(logs, key=lambda l: l.timestamp)
+        features = self._static_columns(logs)
+
+        epoch = logs[0].timestamp
+        seconds = np.fromiter(((log.timestamp - epoch).total_seconds() for log in logs), dtype=np.float64, count=len(logs))
+        entities = np.array([log.entity_id for log in logs], dtype=object)
+        window = ROLLING_WINDOW.total_seconds()
+
+        counts = np.empty(len(logs), dtype=np.float64)
+        for entity in np.unique(entities):
+            idx = np.flatnonzero(entities == entity)
+            times = seconds[idx]
+            # Events for this entity in (t - window, t], inclusive of itself
+            counts[idx] = np.arange(1, len(idx) + 1) - np.searchsorted(times, times - window, side="right")
+        features[:, 2] = counts
+        return features
+
+feature_extractor = FeatureExtractor()
@@ -0,0 +1,116 @@
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logging import logger
+from app.ml.anomaly_detector import AnomalyDetector, detector, fit_isolation_forest
+from app.ml.features import feature_extractor
+from app.models.models import Log
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import multiprocessing
+import numpy as np
+import threading
+import time
+
+
+class ModelTrainer:
+    """
+    Periodically retrains the anomaly model on a recent window of logs.
+
+    Fitting runs in a separate process so it does not compete with the API
+    for the interpreter; the fitted model is then published (versioned on
+    disk) and hot-swapped into the shared detector.
+    """
+    def __init__(self, detector: AnomalyDetector):
+        self.detector = detector
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._train_lock = threading.Lock()
+        self.last_run: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[str] = None
+
+    def build_training_matrix(self, session: Session) -> np.ndarray:
+        since = datetime.utcnow() - timedelta(hours=settings.MODEL_TRAINING_WINDOW_HOURS)
+        rows = session.exec(
+            select(Log.timestamp, Log.event_type, Log.entity_id, Log.bytes_in, Log.bytes_out)
+            .where(Log.timestamp >= since)
+            .order_by(Log.timestamp.desc())
+            .limit(settings.MODEL_TRAINING_MAX_SAMPLES)
+        ).all()
+        return feature_extractor.transform_offline(rows)
+
+    def train_now(self) -> Dict[str, Any]:
+        """
+        Build the training matrix, fit out of process and hot-swap the model.
+        Returns the published model info, or a {"skipped": reason} dict.
+        """
+        if not self._train_lock.acquire(blocking=False):
+            return {"skipped": "training already in progress"}
+        try:
+            self.last_run = datetime.utcnow().isoformat()
+            with Session(engine) as session:
+                features = self.build_training_matrix(session)
+
+            if len(features) < settings.MODEL_MIN_TRAINING_SAMPLES:
+                reason = f"only {len(features)} samples, need {settings.MODEL_MIN_TRAINING_SAMPLES}"
+                logger.info(f"Model training skipped: {reason}")
+                return {"skipped": reason}
+
+            start = time.perf_counter()
+            # spawn: never fork a process that is running server threads
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                model = pool.submit(fit_isolation_forest, features).result()
+            elapsed = time.perf_counter() - start
+
+            self.detector.publish(model, sample_count=len(features), training_seconds=round(elapsed, 2))
+            self.last_error = None
+            info = self.detector.info
+            logger.info(f"Anomaly model v{info['version']} trained on {len(features)} samples in {elapsed:.1f}s")
+            return info
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Model training failed: {e}")
+            raise
+        finally:
+            self._train_lock.release()
+
+    def start(self):
+        interval = settings.MODEL_RETRAIN_INTERVAL_SECONDS
+        if interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="model-trainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, interval: int):
+        # Train soon after startup when there is no model yet, otherwise wait a full interval
+        delay = 30 if not self.detector.is_trained else interval
+        while True:
+            self.next_run = (datetime.utcnow() + timedelta(seconds=delay)).isoformat()
+            if self._stop.wait(delay):
+                return
+            try:
+                self.train_now()
+            except Exception:
+                pass  # Already logged; try again next interval
+            delay = interval
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": self.detector.info if self.detector.is_trained else None,
+            "training": self._train_lock.locked(),
+            "last_run": self.last_run,
+            "next_run": self.next_run if self._thread is not None else None,
+            "last_error": self.last_error,
+            "retrain_interval_seconds": settings.MODEL_RETRAIN_INTERVAL_SECONDS,
+        }
+
+model_trainer = ModelTrainer(detector)
@@ -1,6 +1,7 @@
 from typing import Optional, List
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -11,8 +12,16 @@ class User(SQLModel, table=True):
     is_active: bool = True
 
 class Log(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_log_category_timestamp", "category", "timestamp"),
+        # Filtered searches, ordered by (timestamp, id)
+        Index("ix_log_entity_id_timestamp", "entity_id", "timestamp"),
+        Index("ix_log_source_timestamp", "source", "timestamp"),
+        Index("ix_log_event_type_timestamp", "event_type", "timestamp"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     source: str # firewall, ad, endpoint
     category: str = "security" # security, network, application, hardware
     event_type: str # login, file_access, process_start
@@ -20,16 +29,157 @@ class Log(SQLModel, table=True):
     raw_data: str # JSON string
     processed: bool = False
 
+    # Normalized fields, extracted from raw_data once at ingest
+    source_ip: Optional[str] = Field(default=None, index=True)
+    dest_ip: Optional[str] = Field(default=None, index=True)
+    dest_port: Optional[int] = None
+    bytes_in: Optional[int] = None
+    bytes_out: Optional[int] = None
+    status: Optional[str] = None
+    status_code: Optional[int] = None
+    temp: Optional[float] = None
+    cpu_load: Optional[float] = None
+    process: Optional[str] = None
+    action: Optional[str] = None
+
 class Alert(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_alert_timestamp_risk_score", "timestamp", "risk_score"),
+        Index("ix_alert_risk_score_entity_id", "risk_score", "entity_id"),
+        Index("ix_alert_entity_id_timestamp", "entity_id", "timestamp"),
+        Index("ix_alert_status_timestamp", "status", "timestamp"),
+        Index("ix_alert_rule_key_window_start", "rule_key", "window_start", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     risk_score: float
-    title: str
+    title: str = Field(index=True)
     description: str
     status: str = "new" # new, investigating, resolved
     entity_id: str
     confidence_score: float
     playbook_executed: Optional[str] = None
+    incident_id: Optional[int] = Field(default=None, foreign_key="incident.id", index=True)
+
+    # Aggregation: repeats of the same alert within the suppression window
+    # update this row instead of creating new ones
+    rule_key: Optional[str] = Field(default=None, index=True) # hash of entity, triggered rules and title
+    window_start: Optional[datetime] = None # suppression window this row aggregates; unique per rule_key
+    occurrence_count: int = 1
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    peak_score: Optional[float] = None
+
+class Incident(SQLModel, table=True):
+    """
+    Alerts for one entity that arrived within the correlation window of each other.
+    Totals are maintained incrementally as alerts are attached.
+    """
+    __table_args__ = (
+        Index("ix_incident_status_last_seen", "status", "last_seen"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity_id: str = Field(index=True)
+    status: str = "open" # open, closed
+    first_seen: datetime = Field(default_factory=datetime.utcnow)
+    last_seen: datetime = Field(default_factory=datetime.utcnow)
+    alert_count: int = 0
+    total_risk: float = 0.0
+    max_risk: float = 0.0
+    escalated: bool = False
+    escalated_at: Optional[datetime] = None
+
+class AnalysisClaim(SQLModel, table=True):
+    """
+    An unprocessed log claimed by one process for requeueing after a
+    restart, so several server processes do not all analyze it. Claims
+    expire after ANALYSIS_CLAIM_TTL_SECONDS (e.g. if that process died).
+    """
+    log_id: int = Field(primary_key=True)
+    owner: str # host:pid
+    claimed_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class LogPartition(SQLModel, table=True):
+    """
+    One UTC day of logs moved out of the hot Log table into its own table
+    (log_pYYYYMMDD). Queries read only the partitions their time range
+    covers; retention drops whole partitions.
+    """
+    name: str = Field(primary_key=True)
+    day_start: datetime = Field(index=True)
+    day_end: datetime
+    row_count: int = 0
+    min_id: Optional[int] = None
+    max_id: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ColdSegment(SQLModel, table=True):
+    """
+    A log partition compacted into a Parquet file in COLD_STORAGE_DIR.
+    Its time range and categories let queries skip files they cannot match.
+    """
+    name: str = Field(primary_key=True) # file name
+    day_start: datetime = Field(index=True)
+    day_end: datetime
+    min_timestamp: Optional[datetime] = None
+    max_timestamp: Optional[datetime] = None
+    min_id: Optional[int] = None
+    max_id: Optional[int] = None
+    row_count: int = 0
+    categories: str = "" # comma-separated
+    size_bytes: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class LogRollupBase(SQLModel):
+    """
+    Pre-aggregated log measures for one time bucket and key.
+    For hardware logs the entity is the rack; dest_port is 0 when not applicable.
+    """
+    bucket_start: datetime = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    entity_id: str = Field(primary_key=True)
+    dest_port: int = Field(default=0, primary_key=True)
+    event_count: int = 0
+    error_count: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    temp_sum: float = 0.0
+    temp_count: int = 0
+    cpu_load_sum: float = 0.0
+    cpu_load_count: int = 0
+
+class LogRollupMinute(LogRollupBase, table=True):
+    pass
+
+class LogRollupHour(LogRollupBase, table=True):
+    pass
+
+class SoarAction(SQLModel, table=True):
+    """
+    Queued SOAR action. Analysis only inserts rows; the SOAR executor claims
+    due rows, calls the connector and records the outcome.
+    """
+    __table_args__ = (
+        Index("ix_soaraction_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    idempotency_key: str = Field(unique=True) # also sent to the connector, so a retried call is applied once
+    alert_id: Optional[int] = Field(default=None, foreign_key="alert.id", index=True)
+    playbook: str
+    connector: str # firewall, iam, edr
+    target: str
+    status: str = "pending" # pending, running, succeeded, failed
+    attempts: int = 0
+    max_attempts: int = 5
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = None
+    result: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
 
 class Playbook(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -37,3 +187,18 @@ class Playbook(SQLModel, table=True):
     risk_level: str # low, medium, high, critical
     action_script: str # function name to call
     is_active: bool = True
+
+class Asset(SQLModel, table=True):
+    """
+    A known system or host. Logs whose source or entity matches `name` get
+    their risk score multiplied by `criticality`.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(index=True, unique=True) # matched against Log.source / Log.entity_id
+    display_name: Optional[str] = None
+    asset_type: str = "server" # server, endpoint, network, application
+    criticality: float = 1.0 # risk multiplier, 1.0 = no boost
+
+class SchemaMigration(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,277 @@
+from sqlmodel import Session, select
+from sqlalchemy import case, event, update
+from sqlalchemy.orm import make_transient_to_detached
+from app.models.models import Alert
+from app.core.config import settings
+from app.core.logging import logger
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import threading
+
+_TOUCHED_KEY = "alert_aggregation_touched"
+_PENDING_KEY = "alert_aggregation_pending"
+SOAR_RISK_THRESHOLD = 80
+_EPOCH = datetime(1970, 1, 1)
+
+
+def rule_key(entity_id: str, signals: List[str], title: str) -> str:
+    """Stable key for 'the same alert': entity, the set of rules that fired, and title."""
+    raw = "\x1f".join([entity_id or "", "+".join(sorted(set(signals))), title])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+class OpenAggregate:
+    """An alert row still inside its suppression window."""
+    __slots__ = ("id", "alert", "window_end")
+
+    def __init__(self, window_end: datetime, id: Optional[int] = None, alert: Optional[Alert] = None):
+        self.id = id
+        self.alert = alert # set only until the new row is inserted
+        self.window_end = window_end
+
+
+def _insert(session: Session):
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(Alert)
+
+
+def _span(alert: Alert) -> Tuple[int, datetime, float]:
+    """(occurrences, last seen, peak score) an unsaved alert stands for."""
+    peak = alert.peak_score if alert.peak_score is not None else alert.risk_score
+    return alert.occurrence_count, alert.last_seen or alert.timestamp, peak
+
+
+class AlertAggregator:
+    """
+    Coalesces repeats of the same alert within ALERT_SUPPRESSION_WINDOW_SECONDS.
+
+    Windows are aligned to multiples of the window length. The first
+    occurrence in a window creates an Alert row; later ones only bump its
+    occurrence count, last-seen time and peak score (one UPDATE per alert
+    per batch). SOAR fires at most once per window, when the peak score
+    first crosses the threshold.
+
+    A unique index on (rule_key, window_start) makes the database the
+    arbiter: when two workers or processes create the same aggregate, the
+    second insert does nothing and its occurrences are folded into the row
+    that won. The in-memory map of open windows only saves that round trip.
+    """
+    def __init__(self):
+        self.window = timedelta(seconds=settings.ALERT_SUPPRESSION_WINDOW_SECONDS)
+        self._open: Dict[str, OpenAggregate] = {}
+        self._lock = threading.Lock()
+        self._needs_reload = True
+        self._last_sweep = datetime.utcnow()
+        self.created = 0
+        self.suppressed = 0
+
+    def window_start(self, timestamp: datetime) -> datetime:
+        return _EPOCH + (timestamp - _EPOCH) // self.window * self.window
+
+    def load(self, session: Session):
+        """
+        Rebuild open windows from the database (startup, or after a rollback).
+        """
+        since = self.window_start(datetime.utcnow())
+        rows = session.exec(
+            select(Alert.id, Alert.rule_key, Alert.window_start)
+            .where(Alert.rule_key.is_not(None), Alert.window_start >= since)
+        ).all()
+        with self._lock:
+            self._open = {
+                key: OpenAggregate(window_start + self.window, id=alert_id)
+                for alert_id, key, window_start in rows
+            }
+            self._needs_reload = False
+
+    def coalesce(self, session: Session, candidates: List[Tuple[Alert, List[str]]]) -> Tuple[List[Alert], List[Alert]]:
+        """
+        Add new alerts or fold them into their open aggregate.
+        `candidates` are unsaved alerts with the signals (rule names) behind them.
+        Returns (new_alerts, soar_alerts): the rows created in this call, and
+        the alerts SOAR should act on now. Must run before the caller commits.
+        """
+        if not candidates:
+            return [], []
+        if self.window.total_seconds() <= 0:
+            for alert, _ in candidates:
+                alert.first_seen = alert.last_seen = alert.timestamp
+                alert.peak_score = alert.risk_score
+                session.add(alert)
+            alerts = [a for a, _ in candidates]
+            session.flush()
+            return alerts, [a for a in alerts if a.risk_score > SOAR_RISK_THRESHOLD]
+
+        if self._needs_reload:
+            self.load(session)
+        self._sweep()
+        occurrences = sum(alert.occurrence_count for alert, _ in candidates)
+        new_alerts, soar_alerts = self._coalesce(session, candidates)
+        with self._lock:
+            self.created += len(new_alerts)
+            self.suppressed += occurrences - len(new_alerts)
+        return new_alerts, soar_alerts
+
+    def _coalesce(self, session: Session, candidates: List[Tuple[Alert, List[str]]]) -> Tuple[List[Alert], List[Alert]]:
+        pending: Dict[str, OpenAggregate] = session.info.setdefault(_PENDING_KEY, {})
+        planned: List[Tuple[Alert, List[str], OpenAggregate]] = []
+        deltas: Dict[int, Dict[str, Any]] = {}
+        with self._lock:
+            for alert, signals in sorted(candidates, key=lambda c: c[0].timestamp):
+                key = rule_key(alert.entity_id, signals, alert.title)
+                aggregate = pending.get(key) or self._open.get(key)
+                if aggregate is None or alert.timestamp >= aggregate.window_end:
+                    alert.rule_key = key
+                    alert.window_start = self.window_start(alert.timestamp)
+                    if alert.first_seen is None:
+                        alert.first_seen = alert.last_seen = alert.timestamp
+                        alert.peak_score = alert.risk_score
+                    aggregate = OpenAggregate(alert.window_start + self.window, alert=alert)
+                    pending[key] = aggregate
+                    planned.append((alert, signals, aggregate))
+                    continue
+
+                count, last_seen, peak = _span(alert)
+                if aggregate.alert is not None:
+                    # Planned earlier in this batch and not inserted yet
+                    existing = aggregate.alert
+                    existing.occurrence_count += count
+                    existing.last_seen = max(existing.last_seen, last_seen)
+                    existing.peak_score = max(existing.peak_score, peak)
+                    existing.risk_score = existing.peak_score
+                    continue
+                self._fold(deltas, aggregate.id, key, aggregate, alert, signals)
+
+        session.info[_TOUCHED_KEY] = True
+        new_alerts: List[Alert] = []
+        soar_alerts: List[Alert] = []
+        orphans: List[Tuple[Alert, List[str]]] = []
+        for alert, signals, aggregate in planned:
+            alert_id = session.execute(
+                _insert(session)
+                .values(**alert.model_dump(exclude={"id"}))
+                .on_conflict_do_nothing(index_elements=["rule_key", "window_start"])
+                .returning(Alert.id)
+            ).scalar()
+            if alert_id is not None:
+                alert.id = alert_id
+                make_transient_to_detached(alert)
+                session.add(alert)
+                aggregate.id, aggregate.alert = alert_id, None
+                new_alerts.append(alert)
+                if alert.peak_score > SOAR_RISK_THRESHOLD:
+                    soar_alerts.append(alert)
+                continue
+
+            # Another worker created this window's row first: fold into it
+            existing_id = session.exec(
+                select(Alert.id).where(Alert.rule_key == alert.rule_key, Alert.window_start == alert.window_start)
+            ).first()
+            if existing_id is None:
+                # ...and it is already gone again
+                if pending.get(alert.rule_key) is aggregate:
+                    del pending[alert.rule_key]
+                orphans.append((alert, signals))
+                continue
+            aggregate.id, aggregate.alert = existing_id, None
+            self._fold(deltas, existing_id, alert.rule_key, aggregate, alert, signals)
+
+        soar_ids: List[int] = []
+        for alert_id, delta in deltas.items():
+            crossed = 0
+            if delta["peak"] > SOAR_RISK_THRESHOLD:
+                # SOAR fires once per window: for whichever update lifts the peak over the threshold
+                crossed = session.exec(
+                    update(Alert)
+                    .where(Alert.id == alert_id, Alert.peak_score <= SOAR_RISK_THRESHOLD)
+                    .values(peak_score=delta["peak"])
+                ).rowcount
+            found = session.exec(
+                update(Alert)
+                .where(Alert.id == alert_id)
+                .values(
+                    occurrence_count=Alert.occurrence_count + delta["count"],
+                    last_seen=case((Alert.last_seen < delta["last_seen"], delta["last_seen"]), else_=Alert.last_seen),
+                    peak_score=case((Alert.peak_score < delta["peak"], delta["peak"]), else_=Alert.peak_score),
+                    risk_score=case((Alert.risk_score < delta["peak"], delta["peak"]), else_=Alert.risk_score),
+                )
+            ).rowcount
+            if not found:
+                # The row is gone (deleted since it was opened): start a new aggregate
+                with self._lock:
+                    if self._open.get(delta["key"]) is delta["aggregate"]:
+                        del self._open[delta["key"]]
+                if pending.get(delta["key"]) is delta["aggregate"]:
+                    del pending[delta["key"]]
+                orphans.extend(delta["candidates"])
+                continue
+            if crossed:
+                soar_ids.append(alert_id)
+        for alert_id in soar_ids:
+            alert = session.get(Alert, alert_id)
+            if alert:
+                soar_alerts.append(alert)
+
+        if deltas:
+            logger.debug(f"Suppressed {sum(d['count'] for d in deltas.values())} repeat alerts into {len(deltas)} existing alerts")
+        if orphans:
+            orphan_alerts, orphan_soar = self._coalesce(session, orphans)
+            new_alerts += orphan_alerts
+            soar_alerts += orphan_soar
+        return new_alerts, soar_alerts
+
+    def _fold(self, deltas: Dict[int, Dict[str, Any]], alert_id: int, key: str, aggregate: OpenAggregate, alert: Alert, signals: List[str]):
+        count, last_seen, peak = _span(alert)
+        delta = deltas.setdefault(alert_id, {"key": key, "aggregate": aggregate, "candidates": [], "count": 0, "last_seen": last_seen, "peak": peak})
+        delta["candidates"].append((alert, signals))
+        delta["count"] += count
+        delta["last_seen"] = max(delta["last_seen"], last_seen)
+        delta["peak"] = max(delta["peak"], peak)
+
+    def _publish(self, pending: Dict[str, OpenAggregate]):
+        """Share a committed session's new aggregates with the other workers."""
+        with self._lock:
+            for key, aggregate in pending.items():
+                current = self._open.get(key)
+                if aggregate.id is not None and (current is None or current.window_end < aggregate.window_end):
+                    self._open[key] = aggregate
+
+    def _sweep(self):
+        now = datetime.utcnow()
+        if now - self._last_sweep < timedelta(minutes=1):
+            return
+        self._last_sweep = now
+        with self._lock:
+            self._open = {k: a for k, a in self._open.items() if a.window_end > now}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.created + self.suppressed
+            return {
+                "window_seconds": self.window.total_seconds(),
+                "open_windows": len(self._open),
+                "alerts_created": self.created,
+                "occurrences_suppressed": self.suppressed,
+                "suppression_ratio": round(self.suppressed / total, 4) if total else None,
+            }
+
+alert_aggregator = AlertAggregator()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reload_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+    if session.info.pop(_TOUCHED_KEY, None):
+        alert_aggregator._needs_reload = True
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_aggregates(session):
+    session.info.pop(_TOUCHED_KEY, None)
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        alert_aggregator._publish(pending)
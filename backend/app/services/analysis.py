@@ -1,13 +1,19 @@
 from sqlmodel import Session, select
-from app.models.models import Log, Alert, User
+from app.models.models import Log, Alert
 from app.ml.anomaly_detector import detector
-from app.services.rules import ALL_RULES
+from app.ml.features import feature_extractor
+from app.services.rule_engine import rule_engine
+from app.core.config import settings
 from app.core.logging import logger
 from app.services.threat_intel import threat_intel
 from app.services.soar import SOAREngine
-from datetime import datetime
-import json
-import numpy as np
+from app.services.normalization import parse_raw_data
+from app.services.entity_context import entity_context, UserContext
+from app.services.correlation import correlation_engine
+from app.services.alert_aggregation import alert_aggregator
+from app.services.live import live_hub
+from app.services.response_cache import ALERT_KEYS, response_cache
+from typing import List, Optional, Tuple, Union
 import traceback
 
 class AnalysisService:
@@ -23,105 +29,196 @@ class AnalysisService:
             return
 
         try:
-            # Parse raw data
-            try:
-                parsed_data = json.loads(log.raw_data)
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse JSON for Log ID {log_id}")
-                parsed_data = {}
+            # 0. Context Injection
+            user_context = entity_context.get_user(self.session, log.entity_id)
 
-            risk_score = 0.0
-            reasons = []
+            risk_score, reasons, signals = self.score_log(log, user_context)
 
-            # 0. Context Injection
-            user_context = None
-            if log.entity_id:
-                user_context = self.session.exec(select(User).where(User.username == log.entity_id)).first()
-
-            # 1. Feature Extraction (Mock for now)
-            features = np.array([[datetime.utcnow().hour, 1, 1]]) 
-            
-            # 2. Anomaly Detection
-            try:
-                anomaly_score = detector.score_samples(features)
-                is_anomaly = detector.predict(features) == -1
-
-                if is_anomaly:
-                    risk_score += 50.0
-                    reasons.append(f"Behavioral Anomaly Detected (Score: {anomaly_score:.2f})")
-            except Exception as e:
-                logger.error(f"ML Anomaly Detection failed: {e}")
-
-            # 3. Rule-based Detection
-            for rule in ALL_RULES:
-                try:
-                    triggered, score, reason = rule.evaluate(log, self.session, parsed_data)
-                    if triggered:
-                        risk_score += score
-                        reasons.append(reason)
-                        logger.info(f"Rule triggered: {rule.name} for Log {log_id}")
-                except Exception as e:
-                    logger.error(f"Error evaluating rule {rule.name}: {e}")
-
-            # 4. Threat Intel
-            ip = parsed_data.get("ip") or parsed_data.get("source_ip")
-            if ip:
-                threat = threat_intel.check_ip(ip)
-                if threat:
-                    risk_score += 90.0
-                    reasons.append(f"Threat Intel Match: {threat} ({ip})")
-
-            # 5. Contextual Risk Boosting
-            if user_context and user_context.role == "admin":
-                risk_score *= 1.5
-                reasons.append("Risk Score Boosted: Admin User")
-            
-            # Mock Critical Asset Check
-            if log.source == "payment_gateway":
-                risk_score *= 1.2
-                reasons.append("Risk Score Boosted: Critical Asset (Payment Gateway)")
-
-            logger.info(f"Analysis complete. Total Risk Score: {risk_score}")
-
-            # 6. Create Alert if Risk > Threshold
-            if risk_score > 20:
-                alert = Alert(
-                    risk_score=risk_score,
-                    title=f"High Risk Event: {log.event_type}",
-                    description="; ".join(reasons),
-                    entity_id=log.entity_id,
-                    confidence_score=0.8, # Mock
-                    status="new"
-                )
-                self.session.add(alert)
+            # 6. Create Alert if Risk > Threshold (or fold it into a recent identical one)
+            alert = self.build_alert(log, risk_score, reasons)
+            if alert:
+                new_alerts, soar_alerts = alert_aggregator.coalesce(self.session, [(alert, signals)])
+                correlation_engine.attach(self.session, new_alerts)
+                live_hub.publish_alerts(self.session, new_alerts)
                 self.session.commit()
-                logger.warning(f"Alert created: {alert.title} (ID: {alert.id})")
-                
-                # Trigger SOAR if critical
-                if risk_score > 80:
-                    self.trigger_soar(alert)
-            
+                if new_alerts:
+                    logger.warning(f"Alert created: {alert.title} (ID: {alert.id})")
+
+                # Trigger SOAR if critical, once per suppression window
+                for soar_alert in soar_alerts:
+                    self.trigger_soar(soar_alert)
+
             # Mark log as processed
             log.processed = True
             self.session.add(log)
             self.session.commit()
+            keys = ALERT_KEYS if alert else ("stats",)
+            response_cache.invalidate(keys)
+            live_hub.touch(keys)
 
         except Exception as e:
             logger.error(f"Critical error in analyze_log: {e}")
             traceback.print_exc()
 
-    def trigger_soar(self, alert: Alert):
+    def analyze_batch(self, logs: List[Union[int, Log]]):
+        """
+        Analyze many logs with one session and one commit.
+        User and asset context come from the entity cache, with any uncached
+        keys fetched in one query each; all alerts, SOAR updates and processed
+        flags are written in the same transaction.
+        """
+        log_ids = [l for l in logs if isinstance(l, int)]
+        batch = [l for l in logs if isinstance(l, Log)]
+        if log_ids:
+            batch += self.session.exec(select(Log).where(Log.id.in_(log_ids))).all()
+        if not batch:
+            return
+        # Windowed rules expect events in time order
+        batch.sort(key=lambda l: (l.timestamp, l.id or 0))
+        logger.info(f"Starting batch analysis for {len(batch)} logs")
+
+        users = entity_context.get_users(self.session, (log.entity_id for log in batch))
+        # Warm the asset cache for the whole batch; score_log reads it per log
+        entity_context.get_assets(self.session, {log.source for log in batch} | {log.entity_id for log in batch})
+
+        # Features and anomaly scores for the whole batch in one forest pass
+        anomaly_scores, anomaly_labels = None, None
+        try:
+            anomaly_scores, anomaly_labels = detector.score_batch(feature_extractor.transform(batch))
+        except Exception as e:
+            logger.error(f"ML Anomaly Detection failed: {e}")
+
+        soar_engine = SOAREngine(self.session, autocommit=False)
+        candidates = []
+        try:
+            for i, log in enumerate(batch):
+                anomaly = (anomaly_scores[i], anomaly_labels[i]) if anomaly_scores is not None else None
+                try:
+                    risk_score, reasons, signals = self.score_log(log, users.get(log.entity_id), anomaly)
+                except Exception as e:
+                    logger.error(f"Error analyzing Log ID {log.id}: {e}")
+                    continue
+
+                alert = self.build_alert(log, risk_score, reasons)
+                if alert:
+                    candidates.append((alert, signals))
+                log.processed = True
+                self.session.add(log)
+
+            # Repeats within the suppression window update one alert row;
+            # new rows are flushed, so their ids are available to the playbooks
+            new_alerts, soar_alerts = alert_aggregator.coalesce(self.session, candidates)
+            correlation_engine.attach(self.session, new_alerts)
+            live_hub.publish_alerts(self.session, new_alerts)
+            for alert in soar_alerts:
+                self.trigger_soar(alert, soar_engine)
+
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            logger.error(f"Critical error in analyze_batch: {e}")
+            traceback.print_exc()
+            raise
+        # Processed flags feed the live log list; alerts, including repeats
+        # folded into existing rows, feed the offense panels
+        keys = ALERT_KEYS if candidates else ("stats",)
+        response_cache.invalidate(keys)
+        live_hub.touch(keys)
+
+        logger.info(f"Batch analysis complete: {len(batch)} logs")
+
+    def score_log(self, log: Log, user_context: Optional[UserContext], anomaly: Optional[Tuple[float, int]] = None) -> Tuple[float, List[str], List[str]]:
+        """
+        Run anomaly detection, rules, threat intel and context boosting for one log.
+        `anomaly` is a precomputed (score, label) pair from batch scoring.
+        Returns (risk_score, reasons, signals), where signals names the
+        detectors that fired (used to group repeats of the same alert).
+        """
+        # Parse raw data for the fields that are not normalized into columns
+        parsed_data = parse_raw_data(log.raw_data)
+
+        risk_score = 0.0
+        reasons = []
+        signals = []
+
+        # 1-2. Feature Extraction & Anomaly Detection
+        try:
+            if anomaly is None:
+                scores, labels = detector.score_batch(feature_extractor.transform([log]))
+                anomaly = (scores[0], labels[0])
+            anomaly_score, label = anomaly
+
+            if label == -1:
+                risk_score += 50.0
+                reasons.append(f"Behavioral Anomaly Detected (Score: {anomaly_score:.2f})")
+                signals.append("anomaly")
+        except Exception as e:
+            logger.error(f"ML Anomaly Detection failed: {e}")
+
+        # 3. Rule-based Detection
+        for rule, score, reason in rule_engine.run(log, self.session, parsed_data):
+            risk_score += score
+            reasons.append(reason)
+            signals.append(rule.name)
+            logger.info(f"Rule triggered: {rule.name} for Log {log.id}")
+
+        # 4. Threat Intel
+        ip = log.source_ip
+        if ip:
+            threat = threat_intel.check_ip(ip)
+            if threat:
+                risk_score += 90.0
+                reasons.append(f"Threat Intel Match: {threat} ({ip})")
+                signals.append("threat_intel")
+
+        # 5. Contextual Risk Boosting
+        if user_context and user_context.role == "admin":
+            risk_score *= 1.5
+            reasons.append("Risk Score Boosted: Admin User")
+
+        # Critical Asset Check
+        asset = entity_context.asset_for_log(self.session, log)
+        if asset and asset.criticality > 1.0:
+            risk_score *= asset.criticality
+            reasons.append(f"Risk Score Boosted: Critical Asset ({asset.display_name})")
+
+        logger.info(f"Analysis complete. Total Risk Score: {risk_score}")
+        return risk_score, reasons, signals
+
+    def build_alert(self, log: Log, risk_score: float, reasons: List[str]) -> Optional[Alert]:
+        if risk_score <= 20:
+            return None
+        return Alert(
+            risk_score=risk_score,
+            title=f"High Risk Event: {log.event_type}",
+            description="; ".join(reasons),
+            entity_id=log.entity_id,
+            confidence_score=0.8, # Mock
+            status="new"
+        )
+
+    def trigger_soar(self, alert: Alert, soar_engine: Optional[SOAREngine] = None):
         # Determine playbook based on alert context
         playbook = "Disable User" # Default
-        
+
         if "Threat Intel Match" in alert.description:
             playbook = "Block IP"
         elif "Lateral Movement" in alert.description:
             playbook = "Isolate Endpoint"
-            
-        self.soar_engine.execute_playbook(alert, playbook)
+
+        (soar_engine or self.soar_engine).execute_playbook(alert, playbook)
 
 def analyze_log_task(log_id: int, session_factory):
     with session_factory() as session:
         service = AnalysisService(session)
         service.analyze_log(log_id)
+
+def analyze_batch_task(log_ids: list, session_factory):
+    """
+    Analyze logs in micro-batches of ANALYSIS_BATCH_SIZE, one transaction each.
+    """
+    with session_factory() as session:
+        service = AnalysisService(session)
+        for i in range(0, len(log_ids), settings.ANALYSIS_BATCH_SIZE):
+            service.analyze_batch(log_ids[i:i + settings.ANALYSIS_BATCH_SIZE])
+            session.expunge_all()
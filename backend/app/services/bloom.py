@@ -0,0 +1,59 @@
+import math
+
+MASK64 = (1 << 64) - 1
+
+
+def _mix64(key: int) -> int:
+    """splitmix64 finalizer over a key folded to 64 bits; stable across processes."""
+    x = (key ^ (key >> 64)) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over integer keys (up to 128 bits).
+
+    Sized from the expected number of keys and the target false-positive
+    rate. Bit positions come from one 64-bit mix of the key split into two
+    32-bit halves (Kirsch-Mitzenmacher double hashing). The bit array can be
+    any buffer, so a filter can live inside a memory-mapped snapshot.
+    """
+    def __init__(self, bits, size: int, hashes: int):
+        self.bits = bits
+        self.size = size
+        self.hashes = hashes
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float) -> "BloomFilter":
+        capacity = max(capacity, 1)
+        size = max(64, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        hashes = max(1, round(size / capacity * math.log(2)))
+        return cls(bytearray((size + 7) // 8), size, hashes)
+
+    def add(self, key: int):
+        h = _mix64(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        # Same as add(), inlined: this is the lookup hot path and most probes
+        # stop at the first zero bit
+        x = (key ^ (key >> 64)) & MASK64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+        x ^= x >> 31
+        h1, h2 = x & 0xFFFFFFFF, (x >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def describe(self) -> dict:
+        return {"bits": self.size, "hashes": self.hashes, "bytes": len(self.bits)}
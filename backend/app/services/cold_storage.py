@@ -0,0 +1,188 @@
+from sqlmodel import Session, select
+from sqlalchemy import Table
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import ColdSegment
+from app.services.columnar import arrow_schema, record_batch, require_pyarrow
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import os
+
+
+class ColdStore:
+    """
+    Cold tier for aged logs: one zstd-compressed Parquet file per compacted
+    day partition, sorted by (timestamp, id) and catalogued as a
+    ColdSegment with its time range, id range and categories.
+
+    Readers prune at three levels: whole files by the catalog (time range,
+    categories), row groups by their timestamp min/max statistics, and
+    columns by reading only the projected and filtered ones.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.segments_written = 0
+        self.row_groups_read = 0
+        self.row_groups_skipped = 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # --- Compaction ----------------------------------------------------------
+
+    def write_segment(self, session: Session, table: Table, day_start: datetime, day_end: datetime) -> ColdSegment:
+        """
+        Copy a partition table into a new Parquet file and add it to the
+        catalog (uncommitted, so the caller can swap it for the partition
+        in one transaction). The file is written under a temporary name and
+        renamed when complete.
+        """
+        import pyarrow.parquet as pq
+
+        fields = list(table.c.keys())
+        schema = arrow_schema(table, fields)
+        name = f"{table.name}-{datetime.utcnow():%Y%m%d%H%M%S%f}.parquet"
+        path = self.path(name)
+        os.makedirs(self.directory, exist_ok=True)
+
+        ts_index, id_index, category_index = fields.index("timestamp"), fields.index("id"), fields.index("category")
+        segment = ColdSegment(name=name, day_start=day_start, day_end=day_end)
+        categories = set()
+        statement = table.select().order_by(table.c.timestamp, table.c.id)
+        result = session.connection().execute(statement.execution_options(yield_per=settings.COLD_ROW_GROUP_SIZE))
+        with pq.ParquetWriter(path + ".tmp", schema, compression="zstd") as writer:
+            for rows in result.partitions():
+                writer.write_batch(record_batch(schema, rows), row_group_size=settings.COLD_ROW_GROUP_SIZE)
+                if segment.min_timestamp is None:
+                    segment.min_timestamp = rows[0][ts_index]
+                segment.max_timestamp = rows[-1][ts_index]
+                ids = [row[id_index] for row in rows]
+                segment.min_id = min(ids) if segment.min_id is None else min(segment.min_id, min(ids))
+                segment.max_id = max(ids) if segment.max_id is None else max(segment.max_id, max(ids))
+                categories.update(row[category_index] for row in rows)
+                segment.row_count += len(rows)
+        os.replace(path + ".tmp", path)
+
+        segment.categories = ",".join(sorted(categories))
+        segment.size_bytes = os.path.getsize(path)
+        session.add(segment)
+        self.segments_written += 1
+        return segment
+
+    def delete_segment(self, session: Session, segment: ColdSegment):
+        """Uncatalog a segment and remove its file."""
+        name = segment.name
+        session.delete(segment)
+        session.commit()
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    # --- Reading -------------------------------------------------------------
+
+    def segments_for(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        categories: Optional[Sequence[str]] = None,
+    ) -> List[ColdSegment]:
+        """Segments that can hold logs in [start, end) of the given categories, oldest first."""
+        statement = select(ColdSegment)
+        if start is not None:
+            statement = statement.where(ColdSegment.max_timestamp >= start)
+        if end is not None:
+            statement = statement.where(ColdSegment.min_timestamp < end)
+        with Session(engine) as session:
+            segments = session.exec(statement.order_by(ColdSegment.day_start, ColdSegment.name)).all()
+        if categories:
+            wanted = set(categories)
+            segments = [s for s in segments if wanted & set(s.categories.split(","))]
+        return segments
+
+    def scan(
+        self,
+        segment: ColdSegment,
+        fields: List[str],
+        values: Dict[str, Optional[List[str]]],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        descending: bool = False,
+    ) -> Iterator[Tuple[Any, ...]]:
+        """
+        Rows of one segment as tuples of `fields`, in (timestamp, id) order,
+        matching the time range, the `values` filters (column -> allowed
+        values) and, with a cursor, strictly after `after`. Reads one row
+        group at a time.
+        """
+        pa = require_pyarrow()
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        # Time bounds for row-group pruning, including the cursor's side
+        low, high = start, end
+        if after is not None:
+            if descending:
+                high = after[0] if high is None else min(high, after[0])
+            else:
+                low = after[0] if low is None else max(low, after[0])
+
+        parquet_file = pq.ParquetFile(self.path(segment.name))
+        filter_columns = [name for name, allowed in values.items() if allowed]
+        columns = list(dict.fromkeys(fields + ["timestamp", "id"] + filter_columns))
+        ts_index = parquet_file.schema_arrow.get_field_index("timestamp")
+        groups = range(parquet_file.metadata.num_row_groups)
+        for i in reversed(groups) if descending else groups:
+            stats = parquet_file.metadata.row_group(i).column(ts_index).statistics
+            if stats is not None and stats.has_min_max:
+                # `high` is inclusive when it comes from the cursor (ties are split by id)
+                if (low is not None and stats.max < low) or (high is not None and stats.min > high):
+                    self.row_groups_skipped += 1
+                    continue
+            self.row_groups_read += 1
+
+            batch = parquet_file.read_row_group(i, columns=columns)
+            timestamp = batch.column("timestamp")
+            conditions = []
+            if start is not None:
+                conditions.append(pc.greater_equal(timestamp, pa.scalar(start, type=timestamp.type)))
+            if end is not None:
+                conditions.append(pc.less(timestamp, pa.scalar(end, type=timestamp.type)))
+            for name in filter_columns:
+                column = batch.column(name)
+                conditions.append(pc.is_in(column, value_set=pa.array(values[name], type=column.type)))
+            if after is not None:
+                after_ts = pa.scalar(after[0], type=timestamp.type)
+                past = pc.less if descending else pc.greater
+                conditions.append(pc.or_(
+                    past(timestamp, after_ts),
+                    pc.and_(pc.equal(timestamp, after_ts), past(batch.column("id"), after[1])),
+                ))
+            if conditions:
+                mask = conditions[0]
+                for condition in conditions[1:]:
+                    mask = pc.and_(mask, condition)
+                batch = batch.filter(mask)
+            if not batch.num_rows:
+                continue
+
+            rows = list(zip(*(batch.column(f).to_pylist() for f in fields)))
+            if descending:
+                rows.reverse()
+            yield from rows
+
+    def stats(self) -> Dict[str, Any]:
+        with Session(engine) as session:
+            segments = session.exec(select(ColdSegment).order_by(ColdSegment.day_start)).all()
+        return {
+            "directory": self.directory,
+            "segments": [s.model_dump() for s in segments],
+            "rows": sum(s.row_count for s in segments),
+            "size_bytes": sum(s.size_bytes for s in segments),
+            "segments_written": self.segments_written,
+            "row_groups_read": self.row_groups_read,
+            "row_groups_skipped": self.row_groups_skipped,
+        }
+
+cold_store = ColdStore(settings.COLD_STORAGE_DIR)
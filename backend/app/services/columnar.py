@@ -0,0 +1,37 @@
+from sqlalchemy import Boolean, DateTime, Float, Integer, Table
+from typing import Any, List, Sequence, Tuple
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ValueError("Parquet/Arrow support requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def arrow_schema(table: Table, fields: List[str]):
+    """Arrow schema for the given columns of a table."""
+    pa = require_pyarrow()
+    fields_out = []
+    for name in fields:
+        column = table.c[name]
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields_out.append(pa.field(name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields_out)
+
+
+def record_batch(schema, rows: Sequence[Tuple[Any, ...]]):
+    """Transpose a chunk of row tuples into an Arrow record batch."""
+    pa = require_pyarrow()
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.record_batch([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
@@ -1,33 +1,162 @@
 from sqlmodel import Session, select
-from app.models.models import Alert
+from sqlalchemy import case, event, update
+from app.models.models import Alert, Incident
+from app.core.config import settings
+from app.core.logging import logger
 from datetime import datetime, timedelta
+from typing import Any, Dict, List
+import threading
 
-class CorrelationService:
-    def __init__(self, session: Session):
-        self.session = session
+_TOUCHED_KEY = "correlation_touched_entities"
 
-    def correlate_alerts(self):
+
+class OpenIncident:
+    """In-memory running totals for an entity's open incident."""
+    __slots__ = ("id", "last_seen", "alert_count", "total_risk", "escalated")
+
+    def __init__(self, id: int, last_seen: datetime, alert_count: int = 0, total_risk: float = 0.0, escalated: bool = False):
+        self.id = id
+        self.last_seen = last_seen
+        self.alert_count = alert_count
+        self.total_risk = total_risk
+        self.escalated = escalated
+
+
+class CorrelationEngine:
+    """
+    Incrementally groups alerts into incidents keyed by entity and time window.
+
+    Each new alert is attached to its entity's open incident if the previous
+    alert arrived within CORRELATION_WINDOW_MINUTES, otherwise a new incident
+    is opened. Running totals live in memory, so escalation is decided per
+    alert without rescanning; the Incident rows are updated with one
+    incremental UPDATE per incident per batch, in the caller's transaction.
+    """
+    def __init__(self):
+        self.window = timedelta(minutes=settings.CORRELATION_WINDOW_MINUTES)
+        self._open: Dict[str, OpenIncident] = {}
+        self._lock = threading.Lock()
+        self._needs_reload = True
+        self._last_sweep = datetime.utcnow()
+
+    def load(self, session: Session):
         """
-        Group alerts by entity_id within a time window.
+        Rebuild the open-incident map from the database (startup, or after a
+        rolled-back batch left it out of sync).
         """
-        # Find recent alerts that are not yet resolved
-        statement = select(Alert).where(Alert.status == "new")
-        alerts = self.session.exec(statement).all()
-        
-        # Simple correlation: Group by Entity ID
-        grouped_alerts = {}
-        for alert in alerts:
-            if alert.entity_id not in grouped_alerts:
-                grouped_alerts[alert.entity_id] = []
-            grouped_alerts[alert.entity_id].append(alert)
-            
-        for entity_id, entity_alerts in grouped_alerts.items():
-            if len(entity_alerts) > 1:
-                print(f"CORRELATION FOUND: {len(entity_alerts)} alerts for {entity_id}")
-                # In a real system, we would create an 'Incident' object here
-                # For now, we just log it and maybe upgrade severity
-                
-                # Example: If multiple low alerts, upgrade to High
-                total_risk = sum(a.risk_score for a in entity_alerts)
-                if total_risk > 50:
-                    print(f"ESCALATING INCIDENT for {entity_id} (Total Risk: {total_risk})")
+        since = datetime.utcnow() - self.window
+        incidents = session.exec(
+            select(Incident).where(Incident.status == "open", Incident.last_seen >= since)
+        ).all()
+        with self._lock:
+            self._open = {
+                i.entity_id: OpenIncident(i.id, i.last_seen, i.alert_count, i.total_risk, i.escalated)
+                for i in incidents
+            }
+            self._needs_reload = False
+        return len(incidents)
+
+    def attach(self, session: Session, alerts: List[Alert]):
+        """
+        Assign each alert to an incident and update incident totals.
+        Must be called before the caller commits; new incidents are flushed
+        to obtain their ids.
+        """
+        if not alerts:
+            return
+        if self._needs_reload:
+            self.load(session)
+        if datetime.utcnow() - self._last_sweep > timedelta(minutes=1):
+            self._last_sweep = datetime.utcnow()
+            self.close_stale(session)
+
+        deltas: Dict[int, Dict[str, Any]] = {}
+        escalations = []
+        closed = []
+        with self._lock:
+            for alert in sorted(alerts, key=lambda a: a.timestamp):
+                state = self._open.get(alert.entity_id)
+                if state is None or alert.timestamp - state.last_seen > self.window:
+                    if state is not None:
+                        closed.append(state.id)
+                    incident = Incident(entity_id=alert.entity_id, first_seen=alert.timestamp, last_seen=alert.timestamp)
+                    session.add(incident)
+                    session.flush()
+                    state = OpenIncident(incident.id, alert.timestamp)
+                    self._open[alert.entity_id] = state
+
+                alert.incident_id = state.id
+                state.alert_count += 1
+                state.total_risk += alert.risk_score
+                state.last_seen = max(state.last_seen, alert.timestamp)
+
+                delta = deltas.setdefault(state.id, {"count": 0, "risk": 0.0, "max": 0.0, "last_seen": alert.timestamp})
+                delta["count"] += 1
+                delta["risk"] += alert.risk_score
+                delta["max"] = max(delta["max"], alert.risk_score)
+                delta["last_seen"] = max(delta["last_seen"], alert.timestamp)
+
+                if not state.escalated and self._should_escalate(state):
+                    state.escalated = True
+                    escalations.append((state.id, alert.entity_id, state.alert_count, state.total_risk))
+
+        session.info.setdefault(_TOUCHED_KEY, set()).update(a.entity_id for a in alerts)
+
+        if closed:
+            session.exec(update(Incident).where(Incident.id.in_(closed)).values(status="closed"))
+        for incident_id, delta in deltas.items():
+            session.exec(
+                update(Incident)
+                .where(Incident.id == incident_id)
+                .values(
+                    alert_count=Incident.alert_count + delta["count"],
+                    total_risk=Incident.total_risk + delta["risk"],
+                    max_risk=case((Incident.max_risk < delta["max"], delta["max"]), else_=Incident.max_risk),
+                    last_seen=case((Incident.last_seen < delta["last_seen"], delta["last_seen"]), else_=Incident.last_seen),
+                )
+            )
+        now = datetime.utcnow()
+        for incident_id, entity_id, count, total in escalations:
+            session.exec(update(Incident).where(Incident.id == incident_id).values(escalated=True, escalated_at=now))
+            logger.warning(f"ESCALATING INCIDENT {incident_id} for {entity_id} ({count} alerts, total risk {total:.1f})")
+
+    def _should_escalate(self, state: OpenIncident) -> bool:
+        return (
+            state.alert_count >= settings.CORRELATION_MIN_ALERTS
+            and state.total_risk > settings.CORRELATION_ESCALATION_RISK
+        )
+
+    def close_stale(self, session: Session) -> int:
+        """
+        Close incidents whose last alert is older than the window.
+        """
+        cutoff = datetime.utcnow() - self.window
+        result = session.exec(
+            update(Incident).where(Incident.status == "open", Incident.last_seen < cutoff).values(status="closed")
+        )
+        with self._lock:
+            self._open = {e: s for e, s in self._open.items() if s.last_seen >= cutoff}
+        return result.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_incidents": len(self._open),
+                "escalated_open": sum(1 for s in self._open.values() if s.escalated),
+                "window_minutes": self.window.total_seconds() / 60,
+            }
+
+correlation_engine = CorrelationEngine()
+
+
+# In-memory totals are updated before the caller commits. If that transaction
+# rolls back they no longer match the database, so rebuild on next use.
+@event.listens_for(Session, "after_rollback")
+def _reload_after_rollback(session):
+    if session.info.pop(_TOUCHED_KEY, None):
+        correlation_engine._needs_reload = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_touched(session):
+    session.info.pop(_TOUCHED_KEY, None)
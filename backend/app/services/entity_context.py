@@ -0,0 +1,194 @@
+from sqlmodel import Session, select
+from sqlalchemy import event, inspect
+from app.models.models import Asset, User
+from app.core.config import settings
+from app.core.logging import logger
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+import threading
+import time
+
+
+class UserContext:
+    """Read-only snapshot of the User fields analysis needs; safe to share across sessions."""
+    __slots__ = ("id", "username", "role", "is_active")
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.is_active = user.is_active
+
+
+class AssetContext:
+    __slots__ = ("id", "name", "display_name", "asset_type", "criticality")
+
+    def __init__(self, asset: Asset):
+        self.id = asset.id
+        self.name = asset.name
+        self.display_name = asset.display_name or asset.name
+        self.asset_type = asset.asset_type
+        self.criticality = asset.criticality
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    Negative results (None) are cached too: most entity ids are IPs or hosts
+    with no User row, and those would otherwise hit the database every time.
+    """
+    _MISSING = object()
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """Cached value (possibly None), or TTLCache._MISSING."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                self.misses += 1
+                return self._MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+class EntityContextService:
+    """
+    Cached user and asset context for analysis and SOAR.
+
+    Lookups hit the database only for keys that are missing or expired, and
+    bulk lookups fetch all of those in one query. Writes to User or Asset
+    through the ORM invalidate the affected keys once the transaction commits.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.users = TTLCache(max_size, ttl)
+        self.assets = TTLCache(max_size, ttl)
+
+    def _get_many(self, cache: TTLCache, session: Session, model, key_column, wrap, keys: Iterable[str]) -> Dict[str, Any]:
+        found: Dict[str, Any] = {}
+        missing = []
+        for key in set(k for k in keys if k):
+            value = cache.get(key)
+            if value is TTLCache._MISSING:
+                missing.append(key)
+            elif value is not None:
+                found[key] = value
+        if missing:
+            rows = {getattr(row, key_column): wrap(row) for row in session.exec(select(model).where(getattr(model, key_column).in_(missing))).all()}
+            for key in missing:
+                cache.put(key, rows.get(key))
+            found.update(rows)
+        return found
+
+    def get_users(self, session: Session, usernames: Iterable[str]) -> Dict[str, UserContext]:
+        return self._get_many(self.users, session, User, "username", UserContext, usernames)
+
+    def get_user(self, session: Session, username: str) -> Optional[UserContext]:
+        return self.get_users(session, [username]).get(username)
+
+    def get_assets(self, session: Session, names: Iterable[str]) -> Dict[str, AssetContext]:
+        return self._get_many(self.assets, session, Asset, "name", AssetContext, names)
+
+    def get_asset(self, session: Session, name: str) -> Optional[AssetContext]:
+        return self.get_assets(session, [name]).get(name)
+
+    def asset_for_log(self, session: Session, log) -> Optional[AssetContext]:
+        """The asset a log came from (its source) or is about (its entity)."""
+        assets = self.get_assets(session, [log.source, log.entity_id])
+        return assets.get(log.source) or assets.get(log.entity_id)
+
+    def warm(self, session: Session) -> int:
+        """
+        Load users and assets in bulk, up to the cache size. Called at startup.
+        """
+        count = 0
+        for cache, model, key_column, wrap in ((self.users, User, "username", UserContext), (self.assets, Asset, "name", AssetContext)):
+            for row in session.exec(select(model).limit(cache.max_size)).all():
+                cache.put(getattr(row, key_column), wrap(row))
+                count += 1
+        logger.info(f"Entity context cache warmed with {count} users/assets")
+        return count
+
+    def invalidate(self, model, key: str):
+        (self.users if model is User else self.assets).invalidate(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"users": self.users.stats(), "assets": self.assets.stats()}
+
+entity_context = EntityContextService(settings.ENTITY_CACHE_MAX_SIZE, settings.ENTITY_CACHE_TTL_SECONDS)
+
+
+# --- Invalidation -------------------------------------------------------------
+# Keys touched by a flush are remembered on the session and dropped from the
+# cache after commit, so a concurrent reader cannot re-cache the old row
+# between the flush and the commit.
+
+_PENDING_KEY = "entity_context_invalidations"
+_KEY_COLUMNS = {User: "username", Asset: "name"}
+
+
+def _record_write(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    model = type(target)
+    column = _KEY_COLUMNS[model]
+    keys = {getattr(target, column)}
+    # A renamed row must also drop its old key
+    keys.update(inspect(target).attrs[column].history.deleted or ())
+    session.info.setdefault(_PENDING_KEY, set()).update((model, key) for key in keys if key)
+
+
+for _model in _KEY_COLUMNS:
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _record_write)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    for model, key in session.info.pop(_PENDING_KEY, ()):
+        entity_context.invalidate(model, key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,141 @@
+from app.core.config import settings
+from app.services.columnar import arrow_schema, record_batch, require_pyarrow
+from app.services.search import SEARCH_MODELS, SearchFilters, build_query, json_default
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import csv
+import io
+import json
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+_COLUMNAR_FORMATS = ("parquet", "arrow")
+
+
+class ExportJob:
+    """
+    A validated export: the query, its columns and the output format.
+    Building it raises ValueError for bad filters, fields or formats, so
+    errors surface before the first byte is streamed.
+    """
+    def __init__(self, table: str, filters: SearchFilters, fields: Optional[Sequence[str]] = None, fmt: str = "ndjson"):
+        if table not in SEARCH_MODELS:
+            raise ValueError(f"Unknown table '{table}' (expected one of: {', '.join(SEARCH_MODELS)})")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format '{fmt}' (expected one of: {', '.join(EXPORT_FORMATS)})")
+        if fmt in _COLUMNAR_FORMATS:
+            require_pyarrow()
+        self.table = table
+        self.model = SEARCH_MODELS[table]
+        self.format = fmt
+        # Oldest first, so an export reads like the original event stream
+        self.query = build_query(self.model, filters, fields, descending=False)
+        self.fields = self.query.fields
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_FORMATS[self.format][0]
+
+    def filename(self, stamp: str) -> str:
+        return f"{self.table}-{stamp}.{EXPORT_FORMATS[self.format][1]}"
+
+    def chunks(self) -> Iterator[Sequence[Tuple[Any, ...]]]:
+        return self.query.chunks(settings.EXPORT_CHUNK_SIZE)
+
+    def stream(self) -> Iterator[bytes]:
+        """The encoded export, one piece per fetched chunk of rows."""
+        writer = {
+            "ndjson": _write_ndjson,
+            "csv": _write_csv,
+            "parquet": _write_parquet,
+            "arrow": _write_arrow,
+        }[self.format]
+        return writer(self)
+
+
+def _write_ndjson(job: ExportJob) -> Iterator[bytes]:
+    for chunk in job.chunks():
+        lines = [json.dumps(dict(zip(job.fields, row)), default=json_default) for row in chunk]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _write_csv(job: ExportJob) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(job.fields)
+    for chunk in job.chunks():
+        writer.writerows((v.isoformat() if hasattr(v, "isoformat") else v for v in row) for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Write-only file object for pyarrow writers: collects the bytes written
+    since the last drain() while reporting the total written from tell(),
+    which the Parquet footer's offsets are based on.
+    """
+    def __init__(self):
+        self._pieces: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._pieces.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._pieces = b"".join(self._pieces), []
+        return data
+
+
+def _record_batches(job: ExportJob, schema) -> Iterator[Any]:
+    """One Arrow record batch (and Parquet row group) per fetched chunk."""
+    for chunk in job.chunks():
+        yield record_batch(schema, chunk)
+
+
+def _write_parquet(job: ExportJob) -> Iterator[bytes]:
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(job.model.__table__, job.fields)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd") as writer:
+        for batch in _record_batches(job, schema):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _write_arrow(job: ExportJob) -> Iterator[bytes]:
+    pa = require_pyarrow()
+
+    schema = arrow_schema(job.model.__table__, job.fields)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in _record_batches(job, schema):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,191 @@
+from sqlmodel import Session
+from sqlalchemy import func, insert, select
+from pydantic import ValidationError
+from app.models.models import Log
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.normalization import normalize_log
+from app.services.rollups import apply_rollups
+from app.services.live import live_hub
+from app.services.response_cache import keys_for_log_categories, response_cache
+from collections import deque
+from typing import Any, Dict, List, Tuple
+import json
+import threading
+import time
+
+
+class IngestStats:
+    """
+    Thread-safe counters for the ingest path, used to size collectors.
+    """
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._recent = deque()  # (monotonic time, accepted)
+        self.total_accepted = 0
+        self.total_rejected = 0
+        self.total_batches = 0
+        self.total_insert_seconds = 0.0
+        self.last_batch = None
+
+    def record(self, accepted: int, rejected: int, insert_seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            self.total_accepted += accepted
+            self.total_rejected += rejected
+            self.total_batches += 1
+            self.total_insert_seconds += insert_seconds
+            self._recent.append((now, accepted))
+            self._expire(now)
+            self.last_batch = {
+                "accepted": accepted,
+                "rejected": rejected,
+                "insert_ms": round(insert_seconds * 1000, 2),
+                "rows_per_sec": round(accepted / insert_seconds, 1) if insert_seconds > 0 else None,
+            }
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            recent_events = sum(n for _, n in self._recent)
+            return {
+                "total_accepted": self.total_accepted,
+                "total_rejected": self.total_rejected,
+                "total_batches": self.total_batches,
+                "events_per_sec": round(recent_events / self.window_seconds, 2),
+                "window_seconds": self.window_seconds,
+                "insert_rows_per_sec": round(self.total_accepted / self.total_insert_seconds, 1) if self.total_insert_seconds > 0 else None,
+                "last_batch": self.last_batch,
+            }
+
+ingest_stats = IngestStats()
+
+
+def parse_batch(body: bytes, content_type: str) -> List[Any]:
+    """
+    Parse a batch payload: either a JSON array or NDJSON (one record per line).
+    Raises ValueError if the payload cannot be parsed as a whole.
+    """
+    text = body.decode("utf-8")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        records = []
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Keep the slot so the record is reported as rejected with its index
+                records.append(ValueError(f"Invalid JSON on line {line_no}"))
+        return records
+
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON payload: {e}")
+    if not isinstance(payload, list):
+        raise ValueError("Batch payload must be a JSON array or NDJSON")
+    return payload
+
+
+def validate_records(records: List[Any]) -> Tuple[List[Log], List[Dict[str, Any]]]:
+    """
+    Validate raw records into Log objects.
+    Returns (valid_logs, rejected) where rejected holds {index, error} entries.
+    """
+    logs = []
+    rejected = []
+    for index, record in enumerate(records):
+        if isinstance(record, Exception):
+            rejected.append({"index": index, "error": str(record)})
+            continue
+        if not isinstance(record, dict):
+            rejected.append({"index": index, "error": "Record must be a JSON object"})
+            continue
+        # Server-assigned fields are never taken from the collector
+        record = {k: v for k, v in record.items() if k not in ("id", "processed")}
+        try:
+            log = Log.model_validate(record)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            rejected.append({"index": index, "error": errors})
+            continue
+        normalize_log(log)
+        logs.append(log)
+    return logs, rejected
+
+
+def bulk_insert_logs(session: Session, logs: List[Log]) -> List[int]:
+    """
+    Insert all logs with one multi-row INSERT (COPY on PostgreSQL), update
+    the rollups and commit once.
+    Returns the new ids in input order.
+    """
+    if not logs:
+        return []
+    rows = [log.model_dump(exclude={"id"}) for log in logs]
+    dialect = session.get_bind().dialect
+    if settings.POSTGRES_COPY_INGEST and dialect.name == "postgresql" and dialect.driver == "psycopg":
+        ids = _copy_logs(session, rows)
+    else:
+        result = session.execute(
+            insert(Log).returning(Log.id, sort_by_parameter_order=True),
+            rows
+        )
+        ids = list(result.scalars().all())
+    apply_rollups(session, logs)
+    session.commit()
+    response_cache.invalidate(keys_for_log_categories({log.category for log in logs}))
+    live_hub.publish_logs(logs, ids)
+    return ids
+
+
+def _copy_logs(session: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    PostgreSQL (psycopg) bulk path: reserve ids from the Log sequence, then
+    stream the rows with COPY, in the session's transaction.
+    """
+    table = Log.__table__
+    ids = sorted(session.execute(
+        select(func.nextval(func.pg_get_serial_sequence(table.name, "id")))
+        .select_from(func.generate_series(1, len(rows)))
+    ).scalars().all())
+
+    columns = ["id"] + list(rows[0])
+    quote = session.get_bind().dialect.identifier_preparer.quote
+    statement = f"COPY {quote(table.name)} ({', '.join(quote(c) for c in columns)}) FROM STDIN"
+    cursor = session.connection().connection.cursor()
+    with cursor.copy(statement) as copy:
+        for log_id, row in zip(ids, rows):
+            copy.write_row([log_id] + [row[c] for c in columns[1:]])
+    return ids
+
+
+def ingest_batch(session: Session, records: List[Any]) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    Validate and store a batch. Returns (summary, log_ids).
+    """
+    logs, rejected = validate_records(records)
+
+    start = time.perf_counter()
+    log_ids = bulk_insert_logs(session, logs)
+    elapsed = time.perf_counter() - start
+
+    ingest_stats.record(len(log_ids), len(rejected), elapsed)
+    logger.info(f"Batch ingested: {len(log_ids)} accepted, {len(rejected)} rejected in {elapsed * 1000:.1f}ms")
+
+    summary = {
+        "accepted": len(log_ids),
+        "rejected": len(rejected),
+        "errors": rejected[:settings.INGEST_MAX_REPORTED_ERRORS],
+        "insert_ms": round(elapsed * 1000, 2),
+    }
+    return summary, log_ids
@@ -0,0 +1,272 @@
+from sqlmodel import Session
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.response_cache import ALERT_KEYS, keys_for_log_categories, response_cache
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import threading
+import time
+
+EVENTS_TOPIC = "events"
+_PENDING_ALERTS_KEY = "live_pending_alerts"
+
+
+def log_summary(log, log_id: Optional[int] = None) -> Dict[str, Any]:
+    """Same shape as the dashboard's live_logs entries."""
+    return {
+        "id": log_id if log_id is not None else log.id,
+        "timestamp": log.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        "source": log.source,
+        "category": log.category,
+        "event_type": log.event_type,
+        "entity_id": log.entity_id,
+        "status": "processed" if log.processed else "pending",
+    }
+
+
+def alert_summary(alert) -> Dict[str, Any]:
+    """Fields of the dashboard's recent_offenses and anomalies entries."""
+    return {
+        "id": alert.id,
+        "user": alert.entity_id,
+        "entity_id": alert.entity_id,
+        "title": alert.title,
+        "risk_score": round(alert.risk_score, 1),
+        "category": "security",
+        "status": alert.status,
+        "time": alert.timestamp.strftime("%H:%M"),
+        "timestamp": alert.timestamp.strftime("%H:%M:%S"),
+    }
+
+
+class Subscriber:
+    """One connected viewer: a bounded queue of (type, serialized message) pairs."""
+    def __init__(self, topics: Set[str], max_queue: int):
+        self.topics = topics
+        self.queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue(max_queue)
+        self.dropped = 0
+
+    def offer(self, kind: str, message: str):
+        if self.queue.full():
+            # Too far behind for deltas to be useful: drop the backlog and
+            # tell the client to refetch its snapshots
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.dropped += 1
+            kind, message = "resync", json.dumps({"type": "resync"})
+        self.queue.put_nowait((kind, message))
+
+
+class LiveHub:
+    """
+    Fans out live dashboard updates to WebSocket and SSE viewers.
+
+    Ingest and analysis publish from any thread; publishing only appends to a
+    buffer. One flusher task on the server's event loop coalesces the buffer
+    every LIVE_FLUSH_INTERVAL_SECONDS into a single "delta" message (new logs,
+    new alerts, counter increments), serializes it once and queues the same
+    string for every subscriber. Dashboard snapshots are recomputed at most
+    once per LIVE_SNAPSHOT_INTERVAL_SECONDS per topic, only when something
+    that feeds them changed and someone is subscribed, so N viewers cost one
+    aggregation instead of N polls. Snapshots come from the shared
+    response cache.
+    """
+    def __init__(self):
+        self._snapshots: Dict[str, Callable[[Session], Dict[str, Any]]] = {}
+        self._computed_at: Dict[str, float] = {}
+        self._published_etags: Dict[str, str] = {}
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._logs: List[Dict[str, Any]] = []
+        self._alerts: List[Dict[str, Any]] = []
+        self._counters: Counter = Counter()
+        self._dirty: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._wake_pending = False
+        self._task: Optional[asyncio.Task] = None
+        self.seq = 0
+        self.messages_sent = 0
+        self.snapshots_published = 0
+
+    def register_snapshot(self, topic: str, compute: Callable[[Session], Dict[str, Any]]):
+        self._snapshots[topic] = compute
+
+    @property
+    def topics(self) -> List[str]:
+        return [EVENTS_TOPIC] + list(self._snapshots)
+
+    # --- Lifecycle (on the event loop) --------------------------------------
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    def subscribe(self, topics: Iterable[str]) -> Subscriber:
+        """
+        Register a viewer. Viewers load their initial snapshot from the REST
+        endpoints; snapshots are not computed while nobody watches a topic,
+        so its next one is scheduled now.
+        """
+        subscriber = Subscriber(set(topics) & set(self.topics), settings.LIVE_SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(subscriber)
+        self._mark_dirty(subscriber.topics - {EVENTS_TOPIC})
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    # --- Publishing (any thread) --------------------------------------------
+
+    def publish_logs(self, logs: List[Any], log_ids: Optional[List[int]] = None):
+        if not self._subscribers or not logs:
+            return
+        summaries = [log_summary(log, log_ids[i] if log_ids else None) for i, log in enumerate(logs)]
+        categories = Counter(log.category for log in logs)
+        with self._lock:
+            self._logs.extend(summaries[-settings.LIVE_MAX_DELTA_ITEMS:])
+            del self._logs[:-settings.LIVE_MAX_DELTA_ITEMS]
+            for category, count in categories.items():
+                self._counters[f"logs.{category}"] += count
+            self._dirty.update(keys_for_log_categories(categories))
+        self._schedule()
+
+    def publish_alerts(self, session: Session, alerts: List[Any]):
+        """
+        Publish new alerts once `session` commits; dropped if it rolls back.
+        """
+        if self._subscribers and alerts:
+            session.info.setdefault(_PENDING_ALERTS_KEY, []).extend(alert_summary(alert) for alert in alerts)
+
+    def _publish_alert_summaries(self, summaries: List[Dict[str, Any]]):
+        with self._lock:
+            self._alerts.extend(summaries[-settings.LIVE_MAX_DELTA_ITEMS:])
+            del self._alerts[:-settings.LIVE_MAX_DELTA_ITEMS]
+            self._counters["alerts"] += len(summaries)
+            self._dirty.update(ALERT_KEYS)
+        self._schedule()
+
+    def touch(self, topics: Iterable[str] = ("stats",)):
+        """Mark snapshots stale without a delta (e.g. an alert was resolved)."""
+        if self._subscribers:
+            self._mark_dirty(topics)
+
+    def _mark_dirty(self, topics: Iterable[str]):
+        with self._lock:
+            self._dirty.update(topics)
+        self._schedule()
+
+    def _schedule(self):
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        with self._lock:
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # Loop closed during shutdown
+
+    # --- Fan-out (on the event loop) ----------------------------------------
+
+    def _broadcast(self, topic: str, kind: str, message: str):
+        for subscriber in list(self._subscribers):
+            if topic in subscriber.topics:
+                subscriber.offer(kind, message)
+                self.messages_sent += 1
+
+    async def _flusher(self):
+        while True:
+            await self._wake.wait()
+            # Coalesce everything published in the next interval into one message
+            await asyncio.sleep(settings.LIVE_FLUSH_INTERVAL_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                self._wake_pending = False
+                logs, self._logs = self._logs, []
+                alerts, self._alerts = self._alerts, []
+                counters, self._counters = self._counters, Counter()
+                dirty, self._dirty = self._dirty, set()
+
+            if logs or alerts or counters:
+                self.seq += 1
+                self._broadcast(EVENTS_TOPIC, "delta", json.dumps({
+                    "type": "delta",
+                    "seq": self.seq,
+                    "logs": logs,
+                    "alerts": alerts,
+                    "counters": {
+                        "logs": {k.split(".", 1)[1]: v for k, v in counters.items() if k.startswith("logs.")},
+                        "alerts": counters["alerts"],
+                    },
+                }))
+
+            deferred = set()
+            for topic in dirty:
+                if topic not in self._snapshots or not any(topic in s.topics for s in self._subscribers):
+                    continue
+                wait = self._computed_at.get(topic, 0) + settings.LIVE_SNAPSHOT_INTERVAL_SECONDS - time.monotonic()
+                if wait > 0:
+                    deferred.add(topic)
+                    continue
+                await self._refresh_snapshot(topic)
+            if deferred:
+                with self._lock:
+                    self._dirty.update(deferred)
+                self._loop.call_later(settings.LIVE_SNAPSHOT_INTERVAL_SECONDS, self._schedule)
+
+    async def _refresh_snapshot(self, topic: str):
+        self._computed_at[topic] = time.monotonic()
+        try:
+            # Shared with the REST endpoints, so pollers and viewers reuse one computation
+            entry = await asyncio.to_thread(response_cache.get, topic, self._snapshots[topic], False)
+        except Exception as e:
+            logger.error(f"Live snapshot {topic} failed: {e}")
+            return
+        if self._published_etags.get(topic) == entry.etag:
+            return
+        self._published_etags[topic] = entry.etag
+        self.snapshots_published += 1
+        body = entry.body.decode("utf-8")
+        self._broadcast(topic, "snapshot", f'{{"type": "snapshot", "topic": {json.dumps(topic)}, "data": {body}}}')
+
+    def stats(self) -> Dict[str, Any]:
+        subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "by_topic": {t: sum(1 for s in subscribers if t in s.topics) for t in self.topics},
+            "seq": self.seq,
+            "messages_sent": self.messages_sent,
+            "snapshots_published": self.snapshots_published,
+            "resyncs": sum(s.dropped for s in subscribers),
+        }
+
+live_hub = LiveHub()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_alerts(session):
+    summaries = session.info.pop(_PENDING_ALERTS_KEY, None)
+    if summaries:
+        live_hub._publish_alert_summaries(summaries)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_alerts(session):
+    session.info.pop(_PENDING_ALERTS_KEY, None)
@@ -0,0 +1,153 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+import json
+import re
+
+# Up to this many patterns, C-level substring checks and a regex alternation
+# beat walking the automaton in Python
+SMALL_SET_MAX_PATTERNS = 64
+
+
+class MultiPatternMatcher:
+    """
+    Finds every occurrence of a fixed set of literal patterns in one pass.
+
+    Built once per signature set as an Aho-Corasick automaton, so scan cost
+    depends on the text length and not on the number of signatures. Matching
+    is case-insensitive by default. Small sets (a handful of keywords) skip
+    the automaton and use substring checks / a compiled regex, which run in C.
+    """
+    def __init__(self, patterns: Iterable[str], case_sensitive: bool = False):
+        self.case_sensitive = case_sensitive
+        # Preserve order, drop duplicates and empty strings
+        self.patterns: List[str] = list(dict.fromkeys(p for p in patterns if p))
+        self._build_automaton()
+        self._small = None
+        self._regex = None
+        if self.patterns and len(self.patterns) <= SMALL_SET_MAX_PATTERNS:
+            self._small = [(index, self._fold(p)) for index, p in enumerate(self.patterns)]
+            alternation = "|".join(re.escape(p) for p in sorted(self.patterns, key=len, reverse=True))
+            self._regex = re.compile(alternation, 0 if case_sensitive else re.IGNORECASE)
+            self._by_folded = {self._fold(p): p for p in reversed(self.patterns)}
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _fold(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def _build_automaton(self):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in self._fold(pattern):
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(index)
+
+        # Breadth-first failure links; outputs are merged along the failure
+        # chain so a scan never has to walk it to report matches
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0)
+                outputs[nxt].extend(outputs[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(o) for o in outputs]
+
+    def _scan(self, text: str, first_only: bool) -> List[int]:
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: List[int] = []
+        seen = set()
+        state = 0
+        for char in self._fold(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    if index not in seen:
+                        if first_only:
+                            return [index]
+                        seen.add(index)
+                        found.append(index)
+        return found
+
+    def find_all(self, text: str) -> List[str]:
+        """
+        Every distinct pattern that occurs in `text`, overlapping matches included.
+        """
+        if not text or not self.patterns:
+            return []
+        if self._small is not None:
+            folded = self._fold(text)
+            return [self.patterns[i] for i, p in self._small if p in folded]
+        return [self.patterns[i] for i in self._scan(text, first_only=False)]
+
+    def search(self, text: str) -> Optional[str]:
+        """
+        The first pattern found in `text`, or None.
+        """
+        if not text or not self.patterns:
+            return None
+        if self._regex is not None:
+            match = self._regex.search(text)
+            if match is None:
+                return None
+            # Report the signature as written, not as it appeared in the text
+            return self._by_folded[self._fold(match.group(0))]
+        found = self._scan(text, first_only=True)
+        return self.patterns[found[0]] if found else None
+
+    def find_in_fields(self, data) -> List[str]:
+        """
+        Scan every string value in a parsed log payload (nested dicts and
+        lists included), each field separately.
+        """
+        matches: List[str] = []
+        for value in iter_strings(data):
+            for pattern in self.find_all(value):
+                if pattern not in matches:
+                    matches.append(pattern)
+        return matches
+
+
+def iter_strings(data) -> Iterable[str]:
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from iter_strings(value)
+    elif isinstance(data, (list, tuple)):
+        for value in data:
+            yield from iter_strings(value)
+
+
+def load_signatures(path: str) -> List[str]:
+    """
+    Load signatures from a file: a JSON array of strings, or plain text with
+    one signature per line (blank lines and lines starting with '#' skipped).
+    """
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        return [str(p) for p in json.loads(content) if p]
+    return [
+        line.rstrip("\r\n")
+        for line in content.splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
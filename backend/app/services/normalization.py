@@ -0,0 +1,90 @@
+from app.models.models import Log
+from typing import Any, Dict, Optional
+import json
+
+# Normalized column -> raw_data keys it may come from, in priority order
+FIELD_ALIASES = {
+    "source_ip": ("source_ip", "src_ip", "ip"),
+    "dest_ip": ("dest_ip", "target_ip"),
+    "dest_port": ("dest_port", "port"),
+    "bytes_in": ("bytes_in",),
+    "bytes_out": ("bytes_out",),
+    "status": ("status",),
+    "status_code": ("status_code",),
+    "temp": ("temp", "temperature"),
+    "cpu_load": ("cpu_load",),
+    "process": ("process",),
+    "action": ("action",),
+}
+
+INT_FIELDS = {"dest_port", "bytes_in", "bytes_out", "status_code"}
+FLOAT_FIELDS = {"temp", "cpu_load"}
+
+NORMALIZED_FIELDS = tuple(FIELD_ALIASES.keys())
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_raw_data(raw_data: str) -> dict:
+    try:
+        parsed = json.loads(raw_data)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def extract_fields(parsed_data: dict) -> Dict[str, Any]:
+    """
+    Map a parsed raw_data payload onto the typed, normalized Log columns.
+    """
+    fields = {}
+    for field, keys in FIELD_ALIASES.items():
+        value = None
+        for key in keys:
+            value = parsed_data.get(key)
+            if value is not None and value != "":
+                break
+
+        if value is None or value == "":
+            fields[field] = None
+        elif field in INT_FIELDS:
+            fields[field] = _to_int(value)
+        elif field in FLOAT_FIELDS:
+            fields[field] = _to_float(value)
+        else:
+            fields[field] = str(value)
+
+    # Numeric 'status' values (e.g. HTTP codes) double as the status code
+    if fields["status_code"] is None and fields["status"] and fields["status"].isdigit():
+        fields["status_code"] = int(fields["status"])
+    return fields
+
+
+def normalize_log(log: Log) -> dict:
+    """
+    Parse raw_data once and populate the normalized columns on the log.
+    Returns the parsed payload.
+    """
+    parsed_data = parse_raw_data(log.raw_data)
+    for field, value in extract_fields(parsed_data).items():
+        setattr(log, field, value)
+    return parsed_data
@@ -0,0 +1,252 @@
+from sqlmodel import Session, select
+from sqlalchemy import Index, MetaData, Table, delete, func, insert
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logging import logger
+from app.models.models import ColdSegment, Log, LogPartition
+from app.services.cold_storage import cold_store
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import threading
+
+DAY = timedelta(days=1)
+
+
+def partition_name(day: datetime) -> str:
+    return f"log_p{day:%Y%m%d}"
+
+
+def day_start(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class LogPartitionManager:
+    """
+    Time-partitioned log storage.
+
+    New logs are written to the hot Log table, which analysis, the windowed
+    rules, training and the live dashboard read. Whole UTC days older than
+    LOG_HOT_DAYS are moved into one table per day (log_pYYYYMMDD), with the
+    same columns, recorded in the LogPartition catalog. Partitions older
+    than COLD_AFTER_DAYS are compacted into the cold tier (Parquet files).
+    Time-range queries (search, export, rollup rebuilds) read the hot table
+    plus only the partitions and cold segments their range covers;
+    retention drops a partition table or cold file whole instead of
+    deleting rows.
+    """
+    def __init__(self):
+        self._metadata = MetaData()
+        self._tables: Dict[str, Table] = {}
+        self._tables_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._maintain_lock = threading.Lock()
+        self.last_run: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.rows_moved = 0
+        self.partitions_compacted = 0
+        self.partitions_dropped = 0
+
+    def table(self, name: str) -> Table:
+        """The Table for a partition: Log's columns, with its own index names."""
+        with self._tables_lock:
+            table = self._tables.get(name)
+            if table is None:
+                columns = [c._copy() for c in Log.__table__.columns]
+                for column in columns:
+                    column.index = None  # Partitions get only the indexes below
+                table = Table(name, self._metadata, *columns)
+                Index(f"ix_{name}_timestamp", table.c.timestamp)
+                Index(f"ix_{name}_category_timestamp", table.c.category, table.c.timestamp)
+                Index(f"ix_{name}_entity_id_timestamp", table.c.entity_id, table.c.timestamp)
+                self._tables[name] = table
+            return table
+
+    def catalogued_tables(self) -> List[Table]:
+        with Session(engine) as session:
+            return [self.table(name) for name in session.exec(select(LogPartition.name)).all()]
+
+    def tables_for(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Table]:
+        """
+        Tables holding logs in [start, end): the hot table first, then the
+        overlapping partitions, oldest first.
+        """
+        statement = select(LogPartition.name)
+        if start is not None:
+            statement = statement.where(LogPartition.day_end > start)
+        if end is not None:
+            statement = statement.where(LogPartition.day_start < end)
+        with Session(engine) as session:
+            names = session.exec(statement.order_by(LogPartition.day_start)).all()
+        return [Log.__table__] + [self.table(name) for name in names]
+
+    # --- Maintenance ---------------------------------------------------------
+
+    def hot_cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return day_start(now or datetime.utcnow()) - timedelta(days=settings.LOG_HOT_DAYS)
+
+    def rollover(self, now: Optional[datetime] = None) -> int:
+        """
+        Move analyzed logs from before the hot cutoff into their day's
+        partition, one day per transaction. Unprocessed logs stay in the hot
+        table until analysis has seen them. Returns the number of rows moved.
+        """
+        cutoff = self.hot_cutoff(now)
+        hot = Log.__table__
+        total = 0
+        while True:
+            with Session(engine) as session:
+                # The newest row always stays: SQLite numbers new rows from the
+                # table's current max id, so emptying it would reuse ids that
+                # are already in partitions
+                newest_id = session.exec(select(func.max(Log.id))).one()
+                movable = (hot.c.timestamp < cutoff, hot.c.processed == True, hot.c.id != newest_id)
+                oldest = session.exec(select(func.min(hot.c.timestamp)).where(*movable)).one()
+                if oldest is None:
+                    break
+                start = day_start(oldest)
+                end = start + DAY
+                name = partition_name(start)
+                table = self.table(name)
+                table.create(session.connection(), checkfirst=True)
+
+                in_day = (hot.c.timestamp >= start, hot.c.timestamp < end, *movable)
+                session.execute(insert(table).from_select(list(hot.c.keys()), select(*hot.c).where(*in_day)))
+                # Delete exactly the rows that were copied, even if more rows
+                # of that day were marked processed in between
+                moved = session.execute(
+                    delete(hot).where(*in_day, hot.c.id.in_(select(table.c.id)))
+                ).rowcount
+
+                count, min_id, max_id = session.execute(
+                    select(func.count(), func.min(table.c.id), func.max(table.c.id)).select_from(table)
+                ).one()
+                partition = session.get(LogPartition, name) or LogPartition(name=name, day_start=start, day_end=end)
+                partition.row_count, partition.min_id, partition.max_id = count, min_id, max_id
+                partition.updated_at = datetime.utcnow()
+                session.add(partition)
+                session.commit()
+
+            if not moved:
+                break
+            total += moved
+            logger.info(f"Log partitions: moved {moved} logs into {name}")
+        self.rows_moved += total
+        return total
+
+    def _drop_table(self, session: Session, name: str):
+        self.table(name).drop(session.connection(), checkfirst=True)
+        session.commit()
+        with self._tables_lock:
+            table = self._tables.pop(name, None)
+            if table is not None:
+                self._metadata.remove(table)
+
+    def compact(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Move partitions that ended more than COLD_AFTER_DAYS ago into the
+        cold tier. The segment replaces the partition in the catalogs in one
+        transaction, then the table is dropped.
+        """
+        if settings.COLD_AFTER_DAYS <= 0:
+            return []
+        horizon = day_start(now or datetime.utcnow()) - timedelta(days=settings.COLD_AFTER_DAYS)
+        compacted = []
+        with Session(engine) as session:
+            aged = session.exec(
+                select(LogPartition).where(LogPartition.day_end <= horizon).order_by(LogPartition.day_start)
+            ).all()
+            for partition in aged:
+                name = partition.name
+                segment = cold_store.write_segment(session, self.table(name), partition.day_start, partition.day_end)
+                session.delete(partition)
+                session.commit()
+                self._drop_table(session, name)
+                compacted.append(name)
+                logger.info(f"Log partitions: compacted {name} into {segment.name} ({segment.size_bytes} bytes)")
+        self.partitions_compacted += len(compacted)
+        return compacted
+
+    def apply_retention(self, now: Optional[datetime] = None) -> List[str]:
+        """Drop partitions and cold segments that ended more than LOG_RETENTION_DAYS ago."""
+        if settings.LOG_RETENTION_DAYS <= 0:
+            return []
+        horizon = day_start(now or datetime.utcnow()) - timedelta(days=settings.LOG_RETENTION_DAYS)
+        dropped = []
+        with Session(engine) as session:
+            expired = session.exec(select(LogPartition).where(LogPartition.day_end <= horizon)).all()
+            for partition in expired:
+                name, row_count = partition.name, partition.row_count
+                # Uncatalog first, so no new query routes to the table being dropped
+                session.delete(partition)
+                session.commit()
+                self._drop_table(session, name)
+                dropped.append(name)
+                logger.info(f"Log partitions: dropped {name} ({row_count} logs)")
+
+            for segment in session.exec(select(ColdSegment).where(ColdSegment.day_end <= horizon)).all():
+                name, row_count = segment.name, segment.row_count
+                cold_store.delete_segment(session, segment)
+                dropped.append(name)
+                logger.info(f"Log partitions: dropped cold segment {name} ({row_count} logs)")
+        self.partitions_dropped += len(dropped)
+        return dropped
+
+    def maintain(self) -> Dict[str, Any]:
+        with self._maintain_lock:
+            self.last_run = datetime.utcnow().isoformat()
+            try:
+                moved = self.rollover()
+                compacted = self.compact()
+                dropped = self.apply_retention()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Log partition maintenance failed: {e}")
+                raise
+            return {"moved": moved, "compacted": compacted, "dropped": dropped}
+
+    def start(self):
+        interval = settings.LOG_PARTITION_INTERVAL_SECONDS
+        if interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="log-partitions", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, interval: int):
+        # Let startup (window rebuild, requeued analysis) finish first
+        delay = min(60, interval)
+        while not self._stop.wait(delay):
+            try:
+                self.maintain()
+            except Exception:
+                pass  # Already logged; try again next interval
+            delay = interval
+
+    def stats(self) -> Dict[str, Any]:
+        with Session(engine) as session:
+            partitions = session.exec(select(LogPartition).order_by(LogPartition.day_start)).all()
+            hot_rows = session.exec(select(func.count()).select_from(Log)).one()
+        return {
+            "hot_rows": hot_rows,
+            "hot_cutoff": self.hot_cutoff().isoformat(),
+            "partitions": [p.model_dump() for p in partitions],
+            "partition_rows": sum(p.row_count for p in partitions),
+            "cold": cold_store.stats(),
+            "cold_after_days": settings.COLD_AFTER_DAYS,
+            "retention_days": settings.LOG_RETENTION_DAYS,
+            "rows_moved": self.rows_moved,
+            "partitions_compacted": self.partitions_compacted,
+            "partitions_dropped": self.partitions_dropped,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
+
+log_partitions = LogPartitionManager()
@@ -0,0 +1,154 @@
+from fastapi import Request, Response
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.database import engine
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+import hashlib
+import json
+import threading
+import time
+
+# Cache keys (dashboard payloads) that new logs of a category can change
+_LOG_CATEGORY_KEYS = {
+    "network": ("stats", "network-stats"),
+    "hardware": ("stats", "hardware-stats"),
+    "application": ("stats", "app-stats"),
+}
+ALERT_KEYS = ("stats", "app-stats")
+
+
+def keys_for_log_categories(categories: Iterable[str]) -> Set[str]:
+    return {key for category in categories for key in _LOG_CATEGORY_KEYS.get(category, ("stats",))}
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "generation", "computed_at")
+
+    def __init__(self, body: bytes, generation: int):
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.generation = generation
+        self.computed_at = time.monotonic()
+
+
+class _KeyStats:
+    __slots__ = ("hits", "misses", "coalesced", "not_modified", "computes", "compute_seconds", "last_compute_seconds")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+        self.computes = 0
+        self.compute_seconds = 0.0
+        self.last_compute_seconds = 0.0
+
+
+class ResponseCache:
+    """
+    Shared cache of computed JSON payloads (the dashboard endpoints).
+
+    Each key has a generation counter that ingest, analysis and SOAR bump
+    when they commit data the payload is built from. An entry is served
+    while its generation is current and it is younger than the TTL. While
+    data keeps changing, an entry younger than `min_refresh` is still
+    served, so under constant ingest a payload is recomputed at most once
+    per `min_refresh` instead of on every request. Concurrent misses for
+    one key wait for a single computation. Payloads are stored serialized,
+    with an ETag, so hits and 304s skip both the queries and the encoding.
+    """
+    def __init__(self, ttl: float, min_refresh: float):
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self._entries: Dict[str, CacheEntry] = {}
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._stats: Dict[str, _KeyStats] = {}
+        self._lock = threading.Lock()
+
+    def _key_state(self, key: str):
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+                self._stats[key] = _KeyStats()
+            return self._key_locks[key], self._stats[key]
+
+    def invalidate(self, keys: Iterable[str]):
+        """Mark payloads stale; called after the change is committed."""
+        with self._lock:
+            for key in keys:
+                self._generations[key] += 1
+
+    def _usable(self, key: str, entry: Optional[CacheEntry], allow_stale: bool) -> bool:
+        if entry is None:
+            return False
+        age = time.monotonic() - entry.computed_at
+        if entry.generation == self._generations.get(key, 0) and age < self.ttl:
+            return True
+        return allow_stale and age < self.min_refresh
+
+    def get(self, key: str, compute: Callable[[Session], Any], allow_stale: bool = True) -> CacheEntry:
+        """
+        The cached payload for `key`, computing it with `compute(session)`
+        on a miss. allow_stale=False only accepts entries whose data has
+        not changed since they were computed.
+        """
+        key_lock, stats = self._key_state(key)
+        entry = self._entries.get(key)
+        if self._usable(key, entry, allow_stale):
+            stats.hits += 1
+            return entry
+
+        with key_lock:
+            # Another request may have computed it while we waited
+            entry = self._entries.get(key)
+            if self._usable(key, entry, allow_stale):
+                stats.coalesced += 1
+                return entry
+
+            stats.misses += 1
+            # Read the generation first: changes committed during the
+            # computation leave the new entry stale
+            generation = self._generations.get(key, 0)
+            start = time.perf_counter()
+            with Session(engine) as session:
+                data = compute(session)
+            entry = CacheEntry(json.dumps(data, default=str).encode("utf-8"), generation)
+            elapsed = time.perf_counter() - start
+            stats.computes += 1
+            stats.compute_seconds += elapsed
+            stats.last_compute_seconds = elapsed
+            self._entries[key] = entry
+            return entry
+
+    def respond(self, request: Request, key: str, compute: Callable[[Session], Any]) -> Response:
+        """
+        Serve `key` as a JSON response with an ETag; 304 when the client's
+        If-None-Match still matches.
+        """
+        entry = self.get(key, compute)
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if entry.etag in request.headers.get("if-none-match", ""):
+            self._key_state(key)[1].not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        keys = {}
+        for key, s in list(self._stats.items()):
+            served = s.hits + s.coalesced + s.misses
+            keys[key] = {
+                "hits": s.hits,
+                "coalesced": s.coalesced,
+                "misses": s.misses,
+                "not_modified": s.not_modified,
+                "hit_ratio": round((s.hits + s.coalesced) / served, 4) if served else None,
+                "computes": s.computes,
+                "avg_compute_ms": round(s.compute_seconds / s.computes * 1000, 2) if s.computes else None,
+                "last_compute_ms": round(s.last_compute_seconds * 1000, 2),
+                "generation": self._generations.get(key, 0),
+            }
+        return {"ttl_seconds": self.ttl, "min_refresh_seconds": self.min_refresh, "keys": keys}
+
+response_cache = ResponseCache(settings.DASHBOARD_CACHE_TTL_SECONDS, settings.DASHBOARD_CACHE_MIN_REFRESH_SECONDS)
@@ -0,0 +1,154 @@
+from sqlmodel import Session, select, delete, func
+from sqlalchemy import text
+from app.models.models import Log, LogRollupMinute, LogRollupHour
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.cold_storage import cold_store
+from app.services.partitions import log_partitions
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Optional, Tuple
+import threading
+import time
+
+KEY_FIELDS = ("bucket_start", "category", "entity_id", "dest_port")
+MEASURES = (
+    "event_count", "error_count", "bytes_in", "bytes_out",
+    "temp_sum", "temp_count", "cpu_load_sum", "cpu_load_count",
+)
+
+# Log columns the rollups are computed from, for reading the cold tier
+LogRow = namedtuple("LogRow", ["timestamp", "category", "entity_id", "dest_port", "status_code", "bytes_in", "bytes_out", "temp", "cpu_load"])
+
+GRANULARITIES = (
+    (LogRollupMinute, lambda ts: ts.replace(second=0, microsecond=0)),
+    (LogRollupHour, lambda ts: ts.replace(minute=0, second=0, microsecond=0)),
+)
+
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def aggregate(logs: Iterable[Log]) -> Dict[type, Dict[Tuple, Dict[str, float]]]:
+    """
+    Fold logs into per-minute and per-hour rollup rows, keyed like the tables.
+    """
+    rollups = {model: {} for model, _ in GRANULARITIES}
+    for log in logs:
+        for model, truncate in GRANULARITIES:
+            key = (truncate(log.timestamp), log.category, log.entity_id, log.dest_port or 0)
+            row = rollups[model].get(key)
+            if row is None:
+                row = rollups[model][key] = dict.fromkeys(MEASURES, 0)
+            row["event_count"] += 1
+            if (log.status_code or 0) >= 500:
+                row["error_count"] += 1
+            row["bytes_in"] += log.bytes_in or 0
+            row["bytes_out"] += log.bytes_out or 0
+            if log.temp is not None:
+                row["temp_sum"] += log.temp
+                row["temp_count"] += 1
+            if log.cpu_load is not None:
+                row["cpu_load_sum"] += log.cpu_load
+                row["cpu_load_count"] += 1
+    return rollups
+
+
+def _upsert(session: Session, model, rows: list):
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(model)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(KEY_FIELDS),
+        set_={m: getattr(model, m) + getattr(statement.excluded, m) for m in MEASURES}
+    )
+    session.execute(statement, rows)
+
+
+def _write(session: Session, rollups: Dict[type, Dict[Tuple, Dict[str, float]]]):
+    for model, rows in rollups.items():
+        if rows:
+            # In key order, so concurrent batches lock shared rows in the same
+            # order (unordered upserts deadlock each other on PostgreSQL)
+            _upsert(session, model, [dict(zip(KEY_FIELDS, key), **measures) for key, measures in sorted(rows.items())])
+
+
+def apply_rollups(session: Session, logs: Iterable[Log]):
+    """
+    Add logs to the rollup tables. Runs inside the caller's transaction.
+    """
+    _write(session, aggregate(logs))
+    _maybe_prune(session)
+
+
+def _maybe_prune(session: Session):
+    """Drop minute rollups past retention, at most every few minutes."""
+    global _last_prune
+    now = time.monotonic()
+    with _prune_lock:
+        if now - _last_prune < 300:
+            return
+        _last_prune = now
+    cutoff = datetime.utcnow() - timedelta(hours=settings.ROLLUP_MINUTE_RETENTION_HOURS)
+    session.exec(delete(LogRollupMinute).where(LogRollupMinute.bucket_start < cutoff))
+
+
+def rebuild_rollups(session: Session, since: Optional[datetime] = None, chunk_size: int = 5000) -> int:
+    """
+    Regenerate the rollup tables from Log, its day partitions and the cold
+    tier (everything, or from `since` onwards). Returns the number of logs
+    folded in.
+
+    Runs as one transaction, so dashboards keep reading the old totals until
+    it commits. Ingest waits for it: the rollup tables are locked (SQLite's
+    write lock, an exclusive table lock on PostgreSQL), and on SQLite ingest
+    fails once SQLITE_BUSY_TIMEOUT_MS runs out, so rebuild large ranges
+    while ingest is quiet.
+    """
+    if since is not None:
+        # Whole hours only, so hourly and minute buckets are rebuilt consistently
+        since = since.replace(minute=0, second=0, microsecond=0)
+
+    if session.get_bind().dialect.name == "postgresql":
+        tables = ", ".join(model.__table__.name for model, _ in GRANULARITIES)
+        session.execute(text(f"LOCK TABLE {tables} IN EXCLUSIVE MODE"))
+    for model, _ in GRANULARITIES:
+        statement = delete(model)
+        if since is not None:
+            statement = statement.where(model.bucket_start >= since)
+        session.exec(statement)
+    # Logs committed after this point were rolled up by ingest itself; the
+    # bound keeps the scan from counting them a second time
+    max_id = session.exec(select(func.max(Log.id))).one() or 0
+
+    total = 0
+    for table in log_partitions.tables_for(start=since):
+        last_id = 0
+        while True:
+            statement = select(table).where(table.c.id > last_id, table.c.id <= max_id)
+            if since is not None:
+                statement = statement.where(table.c.timestamp >= since)
+            logs = session.execute(statement.order_by(table.c.id).limit(chunk_size)).all()
+            if not logs:
+                break
+            _write(session, aggregate(logs))
+            last_id = logs[-1].id
+            total += len(logs)
+
+    for segment in cold_store.segments_for(start=since):
+        rows = cold_store.scan(segment, list(LogRow._fields), {}, start=since)
+        while True:
+            logs = [LogRow._make(row) for row in islice(rows, chunk_size)]
+            if not logs:
+                break
+            _write(session, aggregate(logs))
+            total += len(logs)
+
+    session.commit()
+    logger.info(f"Rollups rebuilt from {total} logs")
+    return total
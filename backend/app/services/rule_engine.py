@@ -0,0 +1,114 @@
+from sqlmodel import Session
+from app.models.models import Log
+from app.services.rules import ALL_RULES, BaseRule
+from app.core.logging import logger
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+
+
+class RuleStats:
+    __slots__ = ("evaluations", "hits", "errors", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.evaluations = 0
+        self.hits = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+
+class RuleEngine:
+    """
+    Dispatches each log only to the rules that declare its category / event type.
+
+    Rules are indexed by category when registered; the final rule list for a
+    (category, event_type) pair is resolved once and cached, so the per-log cost
+    is a single dict lookup. Per-rule timing and hit counters are kept for
+    GET /rules/stats.
+    """
+    def __init__(self, rules: List[BaseRule]):
+        self._lock = threading.Lock()
+        self.register(rules)
+
+    def register(self, rules: List[BaseRule]):
+        by_category: Dict[Optional[str], List[BaseRule]] = {None: []}
+        for rule in rules:
+            for category in rule.categories or ():
+                by_category.setdefault(category, [])
+        for rule in rules:
+            targets = by_category.keys() if rule.categories is None else rule.categories
+            for category in targets:
+                by_category[category].append(rule)
+
+        with self._lock:
+            self.rules = list(rules)
+            self._by_category = by_category
+            self._dispatch: Dict[Tuple[str, str], Tuple[BaseRule, ...]] = {}
+            self._stats = {rule.name: RuleStats() for rule in rules}
+
+    def rules_for(self, category: str, event_type: str) -> Tuple[BaseRule, ...]:
+        key = (category, event_type)
+        rules = self._dispatch.get(key)
+        if rules is None:
+            # Unknown categories only see the category-agnostic rules
+            candidates = self._by_category.get(category, self._by_category[None])
+            rules = tuple(r for r in candidates if r.event_types is None or event_type in r.event_types)
+            self._dispatch[key] = rules
+        return rules
+
+    def run(self, log: Log, session: Session, parsed_data: dict) -> List[Tuple[BaseRule, float, str]]:
+        """
+        Observe and evaluate the applicable rules for one log.
+        Returns (rule, score, reason) for every rule that triggered.
+        """
+        triggered = []
+        timings = []
+        for rule in self.rules_for(log.category, log.event_type):
+            start = time.perf_counter_ns()
+            hit, failed = False, False
+            try:
+                rule.observe(log, parsed_data)
+                hit, score, reason = rule.evaluate(log, session, parsed_data)
+                if hit:
+                    triggered.append((rule, score, reason))
+            except Exception as e:
+                failed = True
+                logger.error(f"Error evaluating rule {rule.name}: {e}")
+            timings.append((rule.name, time.perf_counter_ns() - start, hit, failed))
+
+        # Counters are shared across analysis workers
+        with self._lock:
+            for name, elapsed, hit, failed in timings:
+                stats = self._stats[name]
+                stats.evaluations += 1
+                stats.hits += hit
+                stats.errors += failed
+                stats.total_ns += elapsed
+                if elapsed > stats.max_ns:
+                    stats.max_ns = elapsed
+        return triggered
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rules = [
+                {
+                    "name": name,
+                    "evaluations": s.evaluations,
+                    "hits": s.hits,
+                    "errors": s.errors,
+                    "total_ms": round(s.total_ns / 1e6, 3),
+                    "avg_us": round(s.total_ns / s.evaluations / 1e3, 2) if s.evaluations else 0.0,
+                    "max_us": round(s.max_ns / 1e3, 2),
+                }
+                for name, s in self._stats.items()
+            ]
+            dispatch_keys = len(self._dispatch)
+        rules.sort(key=lambda r: r["total_ms"], reverse=True)
+        return {"rules": rules, "dispatch_keys": dispatch_keys}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {rule.name: RuleStats() for rule in self.rules}
+
+rule_engine = RuleEngine(ALL_RULES)
@@ -1,12 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple
-from sqlmodel import Session, select
+from typing import FrozenSet, List, Optional, Tuple
+from sqlmodel import Session
 from app.models.models import Log
-from datetime import datetime, timedelta
-import json
-from app.core.logging import logger
+from datetime import timedelta
+from app.services.state_store import window_store
+from app.services.matcher import MultiPatternMatcher, load_signatures
+from app.core.config import settings
 
 class BaseRule(ABC):
+    # Categories / event types this rule can fire on; None means any.
+    # Used by the rule engine to dispatch each log only to relevant rules.
+    categories: Optional[FrozenSet[str]] = None
+    event_types: Optional[FrozenSet[str]] = None
+
     def __init__(self, name: str, description: str, risk_score: float):
         self.name = name
         self.description = description
@@ -20,36 +26,38 @@ class BaseRule(ABC):
         """
         pass
 
+    def observe(self, log: Log, parsed_data: dict):
+        """
+        Update any sliding-window state this rule keeps.
+        Called for every log before evaluate(), and when rebuilding state at startup.
+        """
+        pass
+
 class BruteForceRule(BaseRule):
+    event_types = frozenset({"login"})
+
     def __init__(self):
         super().__init__(
             name="Brute Force Detection",
             description="Detects multiple failed login attempts within a short period",
             risk_score=40.0
         )
+        # Failed logins per entity in the last 5 minutes
+        self.failed_logins = window_store.window("failed_logins", timedelta(minutes=5), timedelta(seconds=5))
+
+    def _is_failed_login(self, log: Log, parsed_data: dict) -> bool:
+        return log.event_type == "login" and "failed" in (log.status or "").lower()
+
+    def observe(self, log: Log, parsed_data: dict):
+        if self._is_failed_login(log, parsed_data):
+            self.failed_logins.add(log.entity_id, log.timestamp)
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
-        if log.event_type != "login" or "failed" not in str(parsed_data.get("status", "")).lower():
+        if not self._is_failed_login(log, parsed_data):
             return False, 0.0, ""
 
-        # Check for previous failed logins in the last 5 minutes
-        five_mins_ago = log.timestamp - timedelta(minutes=5)
-        statement = select(Log).where(
-            Log.entity_id == log.entity_id,
-            Log.event_type == "login",
-            Log.timestamp >= five_mins_ago,
-            Log.id != log.id
-        )
-        recent_logs = session.exec(statement).all()
-        
-        failed_count = 1 # Current one
-        for l in recent_logs:
-            try:
-                data = json.loads(l.raw_data)
-                if "failed" in str(data.get("status", "")).lower():
-                    failed_count += 1
-            except:
-                continue
+        # Includes the current one
+        failed_count = self.failed_logins.count(log.entity_id, log.timestamp)
 
         if failed_count >= 5:
             return True, self.base_risk_score + (failed_count * 5), f"Brute Force: {failed_count} failed logins in 5 mins"
@@ -63,10 +71,11 @@ class ImpossibleTravelRule(BaseRule):
             description="Detects VPN usage or impossible travel patterns",
             risk_score=20.0
         )
+        self.keywords = MultiPatternMatcher(["vpn"])
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
         # Mock logic: check for 'vpn' keyword or specific flag
-        if "vpn" in log.raw_data.lower() or parsed_data.get("is_vpn", False):
+        if self.keywords.search(log.raw_data) or parsed_data.get("is_vpn", False):
             return True, self.base_risk_score, "VPN Access detected"
         return False, 0.0, ""
 
@@ -77,10 +86,10 @@ class MaliciousIPRule(BaseRule):
             description="Detects communication with known malicious IPs",
             risk_score=80.0
         )
-        self.malicious_ips = ["1.1.1.1", "bad.ip.address", "192.168.1.100"] # Mock list
+        self.malicious_ips = frozenset(["1.1.1.1", "bad.ip.address", "192.168.1.100"]) # Mock list; threat intel feeds score separately in analysis
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
-        ip = parsed_data.get("ip") or parsed_data.get("source_ip")
+        ip = log.source_ip
         if ip and ip in self.malicious_ips:
             return True, self.base_risk_score, f"Communication with malicious IP: {ip}"
         return False, 0.0, ""
@@ -92,14 +101,14 @@ class CriticalProcessRule(BaseRule):
             description="Detects stopping or modification of critical system processes",
             risk_score=70.0
         )
-        self.critical_processes = ["firewall.exe", "antivirus.exe", "sshd"]
+        self.critical_processes = MultiPatternMatcher(["firewall.exe", "antivirus.exe", "sshd"])
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
-        action = parsed_data.get("action", "").lower()
-        process = parsed_data.get("process", "").lower()
+        action = (log.action or "").lower()
+        process = (log.process or "").lower()
         
         if action in ["stop", "kill", "terminate", "modify"]:
-            if any(cp in process for cp in self.critical_processes):
+            if self.critical_processes.search(process):
                 return True, self.base_risk_score, f"Critical process {action}: {process}"
         return False, 0.0, ""
 
@@ -112,48 +121,38 @@ class AdminPrivilegeGrantRule(BaseRule):
         )
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
-        action = parsed_data.get("action", "").lower()
-        group = parsed_data.get("group", "").lower()
+        action = (log.action or "").lower()
+        group = str(parsed_data.get("group", "")).lower()
         
         if "add" in action and ("admin" in group or "wheel" in group or "root" in group):
             return True, self.base_risk_score, f"User added to privileged group: {group}"
         return False, 0.0, ""
 
 class LateralMovementRule(BaseRule):
+    event_types = frozenset({"login"})
+
     def __init__(self):
         super().__init__(
             name="Lateral Movement",
             description="Detects sequential logins across different entities by the same user",
             risk_score=60.0
         )
+        # Distinct sources each user logged in from in the last 10 minutes
+        # For simplicity in this mock, we'll assume 'source' represents the machine/endpoint
+        self.login_sources = window_store.window("login_sources", timedelta(minutes=10), timedelta(seconds=10))
+
+    def observe(self, log: Log, parsed_data: dict):
+        if log.event_type == "login":
+            self.login_sources.add(log.entity_id, log.timestamp, log.source)
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
         if log.event_type != "login":
             return False, 0.0, ""
         
-        user_id = log.entity_id
-        # Check for logins by this user on DIFFERENT sources/ips in the last 10 minutes
-        ten_mins_ago = log.timestamp - timedelta(minutes=10)
-        
-        # We need to find logs where entity_id is the same (same user) but source or raw_data['ip'] is different
-        # For simplicity in this mock, we'll assume 'source' represents the machine/endpoint
-        
-        statement = select(Log).where(
-            Log.entity_id == user_id,
-            Log.event_type == "login",
-            Log.timestamp >= ten_mins_ago,
-            Log.id != log.id
-        )
-        recent_logs = session.exec(statement).all()
-        
-        visited_sources = set()
-        visited_sources.add(log.source)
-        
-        for l in recent_logs:
-            visited_sources.add(l.source)
+        visited_sources = self.login_sources.distinct(log.entity_id, log.timestamp)
             
-        if len(visited_sources) >= 3:
-            return True, self.base_risk_score + (len(visited_sources) * 10), f"Lateral Movement: User accessed {len(visited_sources)} different sources in 10 mins"
+        if visited_sources >= 3:
+            return True, self.base_risk_score + (visited_sources * 10), f"Lateral Movement: User accessed {visited_sources} different sources in 10 mins"
             
         return False, 0.0, ""
 
@@ -166,88 +165,74 @@ class DataExfiltrationRule(BaseRule):
         )
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
-        # Check for 'bytes_out' or similar field
-        bytes_out = parsed_data.get("bytes_out", 0)
-        try:
-            bytes_out = int(bytes_out)
-        except:
-            bytes_out = 0
-            
+        bytes_out = log.bytes_out or 0
+
         if bytes_out > 100_000_000: # 100 MB
             return True, self.base_risk_score, f"High Data Transfer Detected: {bytes_out/1_000_000:.2f} MB"
             
         return False, 0.0, ""
 
 class PortScanRule(BaseRule):
+    categories = frozenset({"network"})
+
     def __init__(self):
         super().__init__(
             name="Port Scan Detected",
             description="Detects connection attempts to multiple ports on the same host",
             risk_score=50.0
         )
+        # Distinct ports per target host in the last minute
+        self.target_ports = window_store.window("target_ports", timedelta(minutes=1))
 
-    def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
+    def _target(self, log: Log, parsed_data: dict):
         if log.category != "network":
-            return False, 0.0, ""
-        
-        target_ip = parsed_data.get("dest_ip") or parsed_data.get("target_ip")
-        port = parsed_data.get("dest_port") or parsed_data.get("port")
-        
+            return None, None
+        return log.dest_ip, log.dest_port
+
+    def observe(self, log: Log, parsed_data: dict):
+        target_ip, port = self._target(log, parsed_data)
+        if target_ip and port:
+            self.target_ports.add(target_ip, log.timestamp, port)
+
+    def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
+        target_ip, port = self._target(log, parsed_data)
         if not target_ip or not port:
             return False, 0.0, ""
 
-        # Check for multiple ports on same target in last minute
-        one_min_ago = log.timestamp - timedelta(minutes=1)
-        statement = select(Log).where(
-            Log.category == "network",
-            Log.timestamp >= one_min_ago,
-            Log.id != log.id
-        )
-        recent_logs = session.exec(statement).all()
-        
-        ports = set()
-        ports.add(port)
-        
-        for l in recent_logs:
-            try:
-                data = json.loads(l.raw_data)
-                l_target = data.get("dest_ip") or data.get("target_ip")
-                l_port = data.get("dest_port") or data.get("port")
-                if l_target == target_ip and l_port:
-                    ports.add(l_port)
-            except:
-                continue
+        ports = self.target_ports.distinct(target_ip, log.timestamp)
                 
-        if len(ports) >= 5:
-            return True, self.base_risk_score + (len(ports) * 5), f"Port Scan: {len(ports)} distinct ports targeted on {target_ip}"
+        if ports >= 5:
+            return True, self.base_risk_score + (ports * 5), f"Port Scan: {ports} distinct ports targeted on {target_ip}"
             
         return False, 0.0, ""
 
 class DDoSRule(BaseRule):
+    categories = frozenset({"network"})
+
     def __init__(self):
         super().__init__(
             name="DDoS Pattern Detected",
             description="Detects high volume of requests from a single IP",
             risk_score=85.0
         )
+        # Network events per source entity in the last minute
+        self.requests = window_store.window("network_requests", timedelta(minutes=1))
+
+    def observe(self, log: Log, parsed_data: dict):
+        # Assuming entity_id is source_ip for network logs
+        if log.category == "network":
+            self.requests.add(log.entity_id, log.timestamp)
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
         if log.category != "network":
             return False, 0.0, ""
             
-        source_ip = parsed_data.get("source_ip") or parsed_data.get("src_ip")
+        source_ip = log.source_ip
         if not source_ip:
             return False, 0.0, ""
             
         # Simple count check in last minute
-        one_min_ago = log.timestamp - timedelta(minutes=1)
-        statement = select(Log).where(
-            Log.category == "network",
-            Log.timestamp >= one_min_ago,
-            Log.entity_id == log.entity_id # Assuming entity_id is source_ip for network logs
-        )
-        # Note: In real DB, count() is faster. Here we fetch all (mock limitation)
-        count = len(session.exec(statement).all())
+        count = self.requests.count(log.entity_id, log.timestamp)
         
         if count > 100: # Threshold lowered for demo
             return True, self.base_risk_score, f"DDoS Pattern: {count} requests from {source_ip} in 1 min"
@@ -255,55 +240,59 @@ class DDoSRule(BaseRule):
         return False, 0.0, ""
 
 class SQLInjectionRule(BaseRule):
+    categories = frozenset({"application"})
+
     def __init__(self):
         super().__init__(
             name="SQL Injection Attempt",
             description="Detects common SQL injection patterns in input",
             risk_score=90.0
         )
-        self.patterns = ["' OR 1=1", "UNION SELECT", "--", "/*", "DROP TABLE"]
+        patterns = ["' OR 1=1", "UNION SELECT", "--", "/*", "DROP TABLE"]
+        if settings.SQLI_SIGNATURES_PATH:
+            patterns += load_signatures(settings.SQLI_SIGNATURES_PATH)
+        # Built once; every field is scanned in a single pass whatever the signature count
+        self.matcher = MultiPatternMatcher(patterns)
 
     def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
         if log.category != "application":
             return False, 0.0, ""
-            
-        query = parsed_data.get("query", "") or parsed_data.get("input", "") or str(parsed_data)
-        query_upper = query.upper()
-        
-        for pattern in self.patterns:
-            if pattern in query_upper:
-                return True, self.base_risk_score, f"SQL Injection detected: {pattern}"
-                
+
+        matches = self.matcher.find_in_fields(parsed_data)
+        if matches:
+            shown = ", ".join(matches[:5])
+            more = f" (+{len(matches) - 5} more)" if len(matches) > 5 else ""
+            return True, self.base_risk_score, f"SQL Injection detected: {shown}{more}"
+
         return False, 0.0, ""
 
 class ErrorRateSpikeRule(BaseRule):
+    categories = frozenset({"application"})
+
     def __init__(self):
         super().__init__(
             name="Error Rate Spike",
             description="Detects high frequency of application errors",
             risk_score=45.0
         )
+        # Application 500s across all services in the last minute
+        self.errors = window_store.window("application_errors", timedelta(minutes=1))
 
-    def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
+    def _is_error(self, log: Log, parsed_data: dict) -> bool:
         if log.category != "application":
-            return False, 0.0, ""
-            
-        status = parsed_data.get("status_code") or parsed_data.get("status")
-        if str(status) != "500":
+            return False
+        return log.status_code == 500
+
+    def observe(self, log: Log, parsed_data: dict):
+        if self._is_error(log, parsed_data):
+            self.errors.add("*", log.timestamp)
+
+    def evaluate(self, log: Log, session: Session, parsed_data: dict) -> Tuple[bool, float, str]:
+        if not self._is_error(log, parsed_data):
             return False, 0.0, ""
             
         # Check for other 500s
-        one_min_ago = log.timestamp - timedelta(minutes=1)
-        statement = select(Log).where(
-            Log.category == "application",
-            Log.timestamp >= one_min_ago
-        )
-        recent_logs = session.exec(statement).all()
-        
-        error_count = 0
-        for l in recent_logs:
-            if "500" in l.raw_data:
-                error_count += 1
+        error_count = self.errors.count("*", log.timestamp)
                 
         if error_count >= 10:
             return True, self.base_risk_score, f"Application Stability Risk: {error_count} errors in 1 min"
@@ -311,6 +300,8 @@ class ErrorRateSpikeRule(BaseRule):
         return False, 0.0, ""
 
 class HighTempRule(BaseRule):
+    categories = frozenset({"hardware"})
+
     def __init__(self):
         super().__init__(
             name="Hardware Overheating",
@@ -322,13 +313,15 @@ class HighTempRule(BaseRule):
         if log.category != "hardware":
             return False, 0.0, ""
             
-        temp = parsed_data.get("temp") or parsed_data.get("temperature")
-        if temp and int(temp) > 80:
-            return True, self.base_risk_score, f"Critical Temperature: {temp}°C"
+        temp = log.temp
+        if temp and temp > 80:
+            return True, self.base_risk_score, f"Critical Temperature: {temp:g}°C"
             
         return False, 0.0, ""
 
 class DiskFailureRule(BaseRule):
+    categories = frozenset({"hardware"})
+
     def __init__(self):
         super().__init__(
             name="Disk Failure Risk",
@@ -340,8 +333,8 @@ class DiskFailureRule(BaseRule):
         if log.category != "hardware":
             return False, 0.0, ""
             
-        status = parsed_data.get("status", "").lower()
-        error = parsed_data.get("error", "").lower()
+        status = (log.status or "").lower()
+        error = str(parsed_data.get("error", "")).lower()
         
         if "smart_fail" in status or "disk_full" in status or "io_error" in error:
             return True, self.base_risk_score, f"Hardware Failure Detected: {status or error}"
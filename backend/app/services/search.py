@@ -0,0 +1,247 @@
+from sqlmodel import Session, select
+from sqlalchemy import tuple_, union_all
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import Alert, Log
+from app.services.cold_storage import cold_store
+from app.services.partitions import log_partitions
+from datetime import datetime
+from itertools import groupby, islice
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import base64
+import binascii
+import heapq
+import json
+
+# Searchable tables; every column can be projected
+SEARCH_MODELS = {"logs": Log, "alerts": Alert}
+
+# Always returned: the keyset the cursor is built from
+_KEY_FIELDS = ("timestamp", "id")
+
+
+class SearchFilters:
+    """
+    Server-side filters shared by the log/alert search and the exports.
+    List filters match any of their values; `start` is inclusive and
+    `end` exclusive.
+    """
+    def __init__(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        category: Optional[List[str]] = None,
+        source: Optional[List[str]] = None,
+        event_type: Optional[List[str]] = None,
+        entity_id: Optional[List[str]] = None,
+        status: Optional[List[str]] = None,
+        min_risk: Optional[float] = None,
+        max_risk: Optional[float] = None,
+    ):
+        self.start = start
+        self.end = end
+        self.values = {
+            "category": category,
+            "source": source,
+            "event_type": event_type,
+            "entity_id": entity_id,
+            "status": status,
+        }
+        self.min_risk = min_risk
+        self.max_risk = max_risk
+
+    def apply(self, statement, table):
+        """Add the WHERE clauses; raises ValueError for filters the table does not have."""
+        columns = table.c
+        if self.start is not None:
+            statement = statement.where(columns.timestamp >= self.start)
+        if self.end is not None:
+            statement = statement.where(columns.timestamp < self.end)
+        for name, values in self.values.items():
+            if not values:
+                continue
+            if name not in columns:
+                raise ValueError(f"Filter '{name}' does not apply to {table.name}")
+            column = columns[name]
+            statement = statement.where(column == values[0] if len(values) == 1 else column.in_(values))
+        if self.min_risk is not None or self.max_risk is not None:
+            if "risk_score" not in columns:
+                raise ValueError(f"Risk filters do not apply to {table.name}")
+            if self.min_risk is not None:
+                statement = statement.where(columns.risk_score >= self.min_risk)
+            if self.max_risk is not None:
+                statement = statement.where(columns.risk_score <= self.max_risk)
+        return statement
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([timestamp.isoformat(), row_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def resolve_fields(model, fields: Optional[Sequence[str]]) -> List[str]:
+    """
+    The requested columns (all by default), plus the cursor keys.
+    Raises ValueError for unknown names.
+    """
+    columns = list(model.__table__.columns.keys())
+    if not fields:
+        return columns
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields for {model.__tablename__}: {', '.join(unknown)}")
+    return [f for f in _KEY_FIELDS if f not in fields] + list(dict.fromkeys(fields))
+
+
+class SearchQuery:
+    """
+    A validated search: a SQL statement, plus for logs the cold segments
+    its range covers. Rows come back as tuples of `fields`, in (timestamp,
+    id) order, merged across the database and the cold files.
+    """
+    def __init__(self, statement, fields: List[str], filters: SearchFilters, after, segments, descending: bool):
+        self.statement = statement
+        self.fields = fields
+        self.filters = filters
+        self.after = after
+        self.segments = segments
+        self.descending = descending
+        self._ts_index, self._id_index = fields.index("timestamp"), fields.index("id")
+
+    def _cold_rows(self) -> Iterator[Tuple[Any, ...]]:
+        # Segments of different days never overlap, so they are read one
+        # after another; only same-day segments need merging
+        segments = reversed(self.segments) if self.descending else self.segments
+        for _, day in groupby(segments, key=lambda s: s.day_start):
+            scans = [
+                cold_store.scan(
+                    segment, self.fields, self.filters.values,
+                    self.filters.start, self.filters.end, self.after, self.descending,
+                )
+                for segment in day
+            ]
+            yield from scans[0] if len(scans) == 1 else heapq.merge(*scans, key=self._key, reverse=self.descending)
+
+    def _key(self, row):
+        return row[self._ts_index], row[self._id_index]
+
+    def chunks(self, chunk_size: int, limit: Optional[int] = None) -> Iterator[Sequence[Tuple[Any, ...]]]:
+        if not self.segments:
+            yield from iter_chunks(self.statement, chunk_size, limit)
+            return
+        sql_rows = (row for chunk in iter_chunks(self.statement, chunk_size, limit) for row in chunk)
+        rows = heapq.merge(sql_rows, self._cold_rows(), key=self._key, reverse=self.descending)
+        if limit is not None:
+            rows = islice(rows, limit)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def rows(self, limit: Optional[int] = None) -> Iterator[Tuple[Any, ...]]:
+        for chunk in self.chunks(settings.SEARCH_FETCH_SIZE, limit):
+            yield from chunk
+
+
+def build_query(
+    model,
+    filters: SearchFilters,
+    fields: Optional[Sequence[str]] = None,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+) -> SearchQuery:
+    """
+    SELECT of only the projected columns, filtered and ordered by
+    (timestamp, id). With a cursor, it continues after the row the cursor
+    was taken from, by seeking on that index instead of skipping rows,
+    so deep pages cost the same as the first one.
+
+    Logs are read from the hot table and the day partitions the time
+    range covers, as a UNION ALL that the database merges in order, and
+    from the cold segments that can match the time range and categories.
+    """
+    fields = resolve_fields(model, fields)
+    after = decode_cursor(cursor) if cursor else None
+    segments = []
+    if model is Log:
+        tables = log_partitions.tables_for(filters.start, filters.end)
+        segments = cold_store.segments_for(filters.start, filters.end, filters.values["category"])
+        if after is not None:
+            # Segments wholly on the already-read side of the cursor
+            if descending:
+                segments = [s for s in segments if s.min_timestamp <= after[0]]
+            else:
+                segments = [s for s in segments if s.max_timestamp >= after[0]]
+    else:
+        tables = [model.__table__]
+
+    selects = []
+    for table in tables:
+        statement = filters.apply(select(*(table.c[f] for f in fields)), table)
+        if after is not None:
+            key, bound = tuple_(table.c.timestamp, table.c.id), tuple_(*after)
+            statement = statement.where(key < bound if descending else key > bound)
+        selects.append(statement)
+    statement = selects[0] if len(selects) == 1 else union_all(*selects)
+
+    columns = statement.selected_columns
+    if descending:
+        statement = statement.order_by(columns.timestamp.desc(), columns.id.desc())
+    else:
+        statement = statement.order_by(columns.timestamp, columns.id)
+    return SearchQuery(statement, fields, filters, after, segments, descending)
+
+
+def iter_chunks(statement, chunk_size: int, limit: Optional[int] = None) -> Iterator[Sequence[Tuple[Any, ...]]]:
+    """
+    Run `statement` in its own session and yield its rows `chunk_size` at a
+    time, fetched in chunks (a server-side cursor where the database has
+    one), so the result set is never held in memory.
+    """
+    if limit is not None:
+        statement = statement.limit(limit)
+    with Session(engine) as session:
+        result = session.execute(statement.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_page(query: SearchQuery, limit: int) -> Iterator[str]:
+    """
+    One page as a JSON object, {"items": [...], "count": n, "next_cursor": ...},
+    written out chunk by chunk. Fetches one row past the page to tell
+    whether there is a next page.
+    """
+    fields = query.fields
+    ts_index, id_index = fields.index("timestamp"), fields.index("id")
+    yield '{"items": ['
+    count, last, has_more = 0, None, False
+    chunk: List[str] = []
+    for row in query.rows(limit + 1):
+        if count == limit:
+            has_more = True
+            break
+        chunk.append(json.dumps(dict(zip(fields, row)), default=json_default))
+        count, last = count + 1, row
+        if len(chunk) >= settings.SEARCH_FETCH_SIZE:
+            yield ("," if count > len(chunk) else "") + ",".join(chunk)
+            chunk = []
+    if chunk:
+        yield ("," if count > len(chunk) else "") + ",".join(chunk)
+    next_cursor = encode_cursor(last[ts_index], last[id_index]) if has_more else None
+    yield f'], "count": {count}, "next_cursor": {json.dumps(next_cursor)}}}'
@@ -1,49 +1,52 @@
 from sqlmodel import Session, select
-from app.models.models import Alert, Playbook, User
+from app.models.models import Alert, SoarAction
+from app.core.config import settings
 from app.core.logging import logger
+from app.services.soar_connectors import PLAYBOOK_ACTIONS
+from app.services.soar_executor import ENQUEUED_KEY
+
+
+def idempotency_key(alert_id: int, playbook: str, target: str) -> str:
+    return f"{alert_id}:{playbook}:{target}"
+
 
 class SOAREngine:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, autocommit: bool = True):
         self.session = session
+        # When False the caller owns the transaction (e.g. batch analysis)
+        self.autocommit = autocommit
+
+    def _save(self, obj):
+        self.session.add(obj)
+        if self.autocommit:
+            self.session.commit()
 
-    def execute_playbook(self, alert: Alert, playbook_name: str):
+    def execute_playbook(self, alert: Alert, playbook_name: str) -> SoarAction:
         """
-        Execute a defined playbook.
+        Queue a playbook for the SOAR executor. The connector call happens
+        asynchronously; the alert stays "investigating" until it succeeds.
+        Queuing the same playbook for the same alert again is a no-op.
         """
-        logger.warning(f"EXECUTING PLAYBOOK: {playbook_name} for Alert {alert.id}")
-        
-        if playbook_name == "Block IP":
-            self._block_ip(alert.entity_id)
-        elif playbook_name == "Disable User":
-            self._disable_user(alert.entity_id)
-        elif playbook_name == "Isolate Endpoint":
-            self._isolate_endpoint(alert.entity_id)
-            
+        connector, _ = PLAYBOOK_ACTIONS[playbook_name]
+        key = idempotency_key(alert.id, playbook_name, alert.entity_id)
+        action = self.session.exec(select(SoarAction).where(SoarAction.idempotency_key == key)).first()
+        if action:
+            return action
+
+        logger.warning(f"QUEUEING PLAYBOOK: {playbook_name} for Alert {alert.id}")
+        action = SoarAction(
+            idempotency_key=key,
+            alert_id=alert.id,
+            playbook=playbook_name,
+            connector=connector,
+            target=alert.entity_id,
+            max_attempts=settings.SOAR_MAX_ATTEMPTS,
+        )
+        self.session.add(action)
+        self.session.info[ENQUEUED_KEY] = True
+
         alert.playbook_executed = playbook_name
-        alert.status = "resolved"
-        self.session.add(alert)
-        self.session.commit()
-
-    def _block_ip(self, ip: str):
-        # Mock Firewall Call
-        logger.info(f"FIREWALL ACTION: Blocking IP {ip}")
-        # In a real system, this would call a firewall API
-
-    def _disable_user(self, username: str):
-        # Mock IAM Call
-        logger.info(f"IAM ACTION: Disabling User {username}")
-        
-        # Update User in DB if exists
-        statement = select(User).where(User.username == username)
-        user = self.session.exec(statement).first()
-        if user:
-            user.is_active = False
-            self.session.add(user)
-            self.session.commit()
-            logger.info(f"User {username} disabled in local database.")
-        else:
-            logger.warning(f"User {username} not found in local database.")
+        alert.status = "investigating"
+        self._save(alert)
+        return action
 
-    def _isolate_endpoint(self, entity_id: str):
-        # Mock EDR Call
-        logger.info(f"EDR ACTION: Isolating Endpoint {entity_id}")
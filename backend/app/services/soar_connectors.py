@@ -0,0 +1,92 @@
+from abc import ABC, abstractmethod
+from app.core.config import settings
+from app.core.logging import logger
+from typing import Dict, Optional, Set
+import asyncio
+import random
+
+
+class ConnectorError(Exception):
+    """A connector call failed. `retryable` is False for errors a retry cannot fix."""
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class Connector(ABC):
+    """
+    An external system SOAR acts on (firewall, IAM, EDR).
+
+    `execute` is a coroutine so network-bound connectors can share one event
+    loop. The idempotency key identifies the action across retries; a real
+    connector passes it to the remote API (or checks it there) so an action
+    whose first attempt timed out after taking effect is not applied twice.
+    """
+    name = "connector"
+
+    @abstractmethod
+    async def execute(self, action: str, target: str, idempotency_key: str) -> str:
+        pass
+
+
+class StubConnector(Connector):
+    """
+    Local stand-in for a remote connector: sleeps SOAR_STUB_LATENCY_MS and
+    fails SOAR_STUB_FAILURE_RATE of calls, so the executor can be load-tested
+    offline. Remembers applied keys the way a remote idempotent API would.
+    """
+    log_prefix = "ACTION"
+
+    def __init__(self, latency_ms: Optional[int] = None, failure_rate: Optional[float] = None):
+        self.latency = (settings.SOAR_STUB_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+        self.failure_rate = settings.SOAR_STUB_FAILURE_RATE if failure_rate is None else failure_rate
+        self.applied: Set[str] = set()
+        self.calls = 0
+
+    async def execute(self, action: str, target: str, idempotency_key: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectorError(f"{self.name} stub: simulated failure")
+        if idempotency_key in self.applied:
+            return f"{action} {target}: already applied"
+        self.applied.add(idempotency_key)
+        logger.info(f"{self.log_prefix}: {action} {target}")
+        return f"{action} {target}: ok"
+
+
+class FirewallConnector(StubConnector):
+    name = "firewall"
+    log_prefix = "FIREWALL ACTION"
+
+
+class IAMConnector(StubConnector):
+    name = "iam"
+    log_prefix = "IAM ACTION"
+
+
+class EDRConnector(StubConnector):
+    name = "edr"
+    log_prefix = "EDR ACTION"
+
+
+# Playbook -> (connector, action)
+PLAYBOOK_ACTIONS = {
+    "Block IP": ("firewall", "block_ip"),
+    "Disable User": ("iam", "disable_user"),
+    "Isolate Endpoint": ("edr", "isolate_endpoint"),
+}
+
+
+def default_connectors() -> Dict[str, Connector]:
+    return {c.name: c for c in (FirewallConnector(), IAMConnector(), EDRConnector())}
+
+
+def parse_concurrency(spec: str) -> Dict[str, int]:
+    """'firewall=8,iam=4' -> {'firewall': 8, 'iam': 4}"""
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            limits[name.strip()] = max(1, int(value))
+    return limits
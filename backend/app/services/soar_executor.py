@@ -0,0 +1,273 @@
+from sqlmodel import Session, select
+from sqlalchemy import event, func, update
+from app.models.models import Alert, SoarAction, User
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logging import logger
+from app.services.entity_context import entity_context
+from app.services.live import live_hub
+from app.services.response_cache import response_cache
+from app.services.soar_connectors import Connector, ConnectorError, PLAYBOOK_ACTIONS, default_connectors, parse_concurrency
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import asyncio
+import random
+import threading
+
+ENQUEUED_KEY = "soar_actions_enqueued"
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped, scaled by 0.5-1.0."""
+    delay = min(settings.SOAR_RETRY_MAX_SECONDS, settings.SOAR_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+def apply_local_effects(session: Session, action: SoarAction):
+    """
+    Record a successful action in the local database: resolve the alert and,
+    for Disable User, deactivate the user.
+    """
+    if action.playbook == "Disable User":
+        # The cache answers "no such user" without a query
+        context = entity_context.get_user(session, action.target)
+        user = session.get(User, context.id) if context else None
+        if user:
+            user.is_active = False
+            session.add(user)
+            logger.info(f"User {action.target} disabled in local database.")
+        else:
+            logger.warning(f"User {action.target} not found in local database.")
+
+    alert = session.get(Alert, action.alert_id) if action.alert_id else None
+    if alert:
+        alert.status = "resolved"
+        session.add(alert)
+
+
+class SoarExecutor:
+    """
+    Runs queued SoarAction rows on an asyncio loop in a background thread.
+
+    Due actions are claimed in batches (pending -> running) and each runs
+    under its connector's semaphore with a timeout. Failures are retried
+    with exponential backoff until max_attempts, then marked failed. Claims
+    are bounded by free connector capacity, so a slow connector backs up in
+    the table rather than in memory. Database work runs in the default
+    thread pool to keep the loop free for connector I/O.
+    """
+    def __init__(self, engine, connectors: Optional[Dict[str, Connector]] = None, concurrency: Optional[Dict[str, int]] = None):
+        self.engine = engine
+        self.connectors = connectors or default_connectors()
+        limits = concurrency or parse_concurrency(settings.SOAR_CONNECTOR_CONCURRENCY)
+        self.limits = {name: limits.get(name, 1) for name in self.connectors}
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._in_flight: Dict[str, int] = {name: 0 for name in self.connectors}
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.timeouts = 0
+
+    # --- Lifecycle -----------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(started,), name="soar-executor", daemon=True)
+        self._thread.start()
+        started.wait(5)
+        logger.info(f"SOAR executor started (concurrency {self.limits})")
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self.wake()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("SOAR executor stopped")
+
+    def wake(self):
+        """Check for due actions now instead of at the next poll. Thread-safe."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def _run_loop(self, started: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main(started))
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _main(self, started: threading.Event):
+        self._wake = asyncio.Event()
+        semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.limits.items()}
+        tasks = set()
+        started.set()
+        recovered = await asyncio.to_thread(self.recover)
+        if recovered:
+            logger.info(f"SOAR executor requeued {recovered} interrupted actions")
+
+        while not self._stopping:
+            self._wake.clear()
+            capacity = sum(self.limits.values()) - sum(self._in_flight.values())
+            actions = await asyncio.to_thread(self.claim, min(capacity, settings.SOAR_CLAIM_BATCH_SIZE)) if capacity > 0 else []
+            for action in actions:
+                self._in_flight[action.connector] = self._in_flight.get(action.connector, 0) + 1
+                task = asyncio.create_task(self._execute(action, semaphores))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # A full batch means more may be due; otherwise wait for a wake-up or the poll interval
+            if len(actions) < settings.SOAR_CLAIM_BATCH_SIZE or capacity <= len(actions):
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.SOAR_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+        if tasks:
+            await asyncio.wait(tasks, timeout=settings.SOAR_ACTION_TIMEOUT_SECONDS)
+
+    # --- Queue operations (run in worker threads) ---------------------------
+
+    def recover(self) -> int:
+        """Return actions left running by a previous process to the queue."""
+        with Session(self.engine) as session:
+            result = session.exec(update(SoarAction).where(SoarAction.status == "running").values(status="pending"))
+            session.commit()
+            return result.rowcount
+
+    def claim(self, limit: int) -> List[SoarAction]:
+        """
+        Move up to `limit` due actions from pending to running and return them.
+        Each row is claimed with a conditional UPDATE, so concurrent executors
+        never run the same action twice.
+        """
+        if limit <= 0:
+            return []
+        with Session(self.engine, expire_on_commit=False) as session:
+            candidates = session.exec(
+                select(SoarAction)
+                .where(SoarAction.status == "pending", SoarAction.next_attempt_at <= datetime.utcnow())
+                .order_by(SoarAction.next_attempt_at)
+                .limit(limit)
+            ).all()
+            claimed = []
+            for action in candidates:
+                result = session.exec(
+                    update(SoarAction)
+                    .where(SoarAction.id == action.id, SoarAction.status == "pending")
+                    .values(status="running")
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount:
+                    claimed.append(action)
+            session.commit()
+            for action in claimed:
+                action.status = "running"
+            return claimed
+
+    def _record_success(self, action_id: int, result: str):
+        with Session(self.engine) as session:
+            action = session.get(SoarAction, action_id)
+            action.attempts += 1
+            action.status = "succeeded"
+            action.result = result
+            action.last_error = None
+            action.completed_at = datetime.utcnow()
+            session.add(action)
+            apply_local_effects(session, action)
+            session.commit()
+        response_cache.invalidate(("stats",))
+        live_hub.touch()
+
+    def _record_failure(self, action_id: int, error: str, retryable: bool) -> Optional[float]:
+        """Schedule a retry or mark the action failed. Returns the retry delay, or None."""
+        with Session(self.engine) as session:
+            action = session.get(SoarAction, action_id)
+            action.attempts += 1
+            action.last_error = error
+            delay = retry_delay(action.attempts) if retryable and action.attempts < action.max_attempts else None
+            if delay is not None:
+                action.status = "pending"
+                action.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            else:
+                action.status = "failed"
+                action.completed_at = datetime.utcnow()
+            session.add(action)
+            session.commit()
+            return delay
+
+    # --- Execution -----------------------------------------------------------
+
+    async def _execute(self, action: SoarAction, semaphores: Dict[str, asyncio.Semaphore]):
+        try:
+            connector = self.connectors.get(action.connector)
+            if connector is None:
+                raise ConnectorError(f"No connector named {action.connector!r}", retryable=False)
+            _, verb = PLAYBOOK_ACTIONS.get(action.playbook, (None, action.playbook))
+            async with semaphores.setdefault(action.connector, asyncio.Semaphore(1)):
+                result = await asyncio.wait_for(
+                    connector.execute(verb, action.target, action.idempotency_key),
+                    settings.SOAR_ACTION_TIMEOUT_SECONDS,
+                )
+            await asyncio.to_thread(self._record_success, action.id, result)
+            self.succeeded += 1
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                error, retryable = f"Timed out after {settings.SOAR_ACTION_TIMEOUT_SECONDS}s", True
+            else:
+                error, retryable = str(e) or type(e).__name__, getattr(e, "retryable", True)
+            try:
+                delay = await asyncio.to_thread(self._record_failure, action.id, error, retryable)
+            except Exception as db_error:
+                # Left "running"; recover() requeues it on the next start
+                logger.error(f"SOAR action {action.id}: could not record failure: {db_error}")
+                return
+            if delay is not None:
+                self.retried += 1
+                # Claim it when due rather than at the next poll
+                asyncio.get_running_loop().call_later(delay, self.wake)
+                logger.warning(f"SOAR action {action.id} ({action.playbook} {action.target}) failed, will retry: {error}")
+            else:
+                self.failed += 1
+                logger.error(f"SOAR action {action.id} ({action.playbook} {action.target}) failed permanently: {error}")
+        finally:
+            self._in_flight[action.connector] -= 1
+            self.wake()
+
+    def stats(self, session: Session) -> Dict[str, Any]:
+        counts = dict(session.exec(select(SoarAction.status, func.count()).group_by(SoarAction.status)).all())
+        return {
+            "running": self._thread is not None,
+            "queue": counts,
+            "in_flight": dict(self._in_flight),
+            "concurrency": self.limits,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "timeouts": self.timeouts,
+        }
+
+soar_executor = SoarExecutor(engine)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_enqueue(session):
+    if session.info.pop(ENQUEUED_KEY, None):
+        soar_executor.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_enqueued(session):
+    session.info.pop(ENQUEUED_KEY, None)
@@ -0,0 +1,191 @@
+from sqlmodel import Session, select
+from app.models.models import Log
+from app.core.logging import logger
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Optional
+import math
+import threading
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class _KeyState:
+    __slots__ = ("buckets", "total", "values")
+
+    def __init__(self):
+        self.buckets = deque()  # [bucket_id, count, {value: count} or None]
+        self.total = 0
+        self.values = {}  # value -> count across live buckets
+
+
+class SlidingWindow:
+    """
+    Keyed, time-bucketed sliding window.
+
+    Each key keeps a deque of buckets plus running totals, so adding an event
+    and reading the count / distinct-value count for a key are O(1) amortized.
+    Buckets older than the window (relative to the newest event seen for the
+    key) are expired lazily.
+    """
+    def __init__(self, name: str, window: timedelta, bucket: timedelta):
+        self.name = name
+        self.window = window
+        self.bucket_seconds = bucket.total_seconds()
+        self.num_buckets = max(1, math.ceil(window.total_seconds() / self.bucket_seconds))
+        self._keys: Dict[Hashable, _KeyState] = {}
+        self._lock = threading.Lock()
+        self._newest_bucket = 0
+        self._adds_since_sweep = 0
+
+    def _bucket_id(self, ts: datetime) -> int:
+        return int((ts - EPOCH).total_seconds() // self.bucket_seconds)
+
+    def _expire(self, state: _KeyState, current: int):
+        cutoff = current - self.num_buckets
+        buckets = state.buckets
+        while buckets and buckets[0][0] <= cutoff:
+            _, count, values = buckets.popleft()
+            state.total -= count
+            if values:
+                for value, n in values.items():
+                    remaining = state.values[value] - n
+                    if remaining:
+                        state.values[value] = remaining
+                    else:
+                        del state.values[value]
+
+    def add(self, key: Hashable, ts: datetime, value: Optional[Hashable] = None):
+        bucket_id = self._bucket_id(ts)
+        with self._lock:
+            if bucket_id <= self._newest_bucket - self.num_buckets:
+                return  # Already outside every window we can be asked about
+            self._newest_bucket = max(self._newest_bucket, bucket_id)
+
+            state = self._keys.get(key)
+            if state is None:
+                state = self._keys[key] = _KeyState()
+
+            buckets = state.buckets
+            if not buckets or buckets[-1][0] < bucket_id:
+                buckets.append([bucket_id, 0, None])
+                bucket = buckets[-1]
+            else:
+                # Same or out-of-order bucket: scan back from the newest (rare, short)
+                bucket = None
+                for position in range(len(buckets) - 1, -1, -1):
+                    if buckets[position][0] == bucket_id:
+                        bucket = buckets[position]
+                        break
+                    if buckets[position][0] < bucket_id:
+                        bucket = [bucket_id, 0, None]
+                        buckets.insert(position + 1, bucket)
+                        break
+                if bucket is None:
+                    bucket = [bucket_id, 0, None]
+                    buckets.appendleft(bucket)
+
+            bucket[1] += 1
+            state.total += 1
+            if value is not None:
+                if bucket[2] is None:
+                    bucket[2] = {}
+                bucket[2][value] = bucket[2].get(value, 0) + 1
+                state.values[value] = state.values.get(value, 0) + 1
+
+            self._expire(state, buckets[-1][0])
+
+            self._adds_since_sweep += 1
+            if self._adds_since_sweep >= 10000:
+                self._sweep()
+
+    def _sweep(self):
+        """Drop keys that have no live buckets left. Caller holds the lock."""
+        self._adds_since_sweep = 0
+        stale = []
+        for key, state in self._keys.items():
+            self._expire(state, self._newest_bucket)
+            if not state.buckets:
+                stale.append(key)
+        for key in stale:
+            del self._keys[key]
+
+    def _state_at(self, key: Hashable, ts: datetime) -> Optional[_KeyState]:
+        state = self._keys.get(key)
+        if state is not None:
+            self._expire(state, max(self._bucket_id(ts), state.buckets[-1][0] if state.buckets else 0))
+        return state
+
+    def count(self, key: Hashable, ts: datetime) -> int:
+        """Number of events for key within the window ending at ts."""
+        with self._lock:
+            state = self._state_at(key, ts)
+            return state.total if state else 0
+
+    def distinct(self, key: Hashable, ts: datetime) -> int:
+        """Number of distinct values for key within the window ending at ts."""
+        with self._lock:
+            state = self._state_at(key, ts)
+            return len(state.values) if state else 0
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._newest_bucket = 0
+            self._adds_since_sweep = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "window_seconds": self.window.total_seconds(),
+                "bucket_seconds": self.bucket_seconds,
+                "keys": len(self._keys),
+            }
+
+
+class SlidingWindowStore:
+    """
+    Registry of named sliding windows shared by the windowed detection rules.
+    """
+    def __init__(self):
+        self._windows: Dict[str, SlidingWindow] = {}
+        self._lock = threading.Lock()
+
+    def window(self, name: str, window: timedelta, bucket: timedelta = timedelta(seconds=1)) -> SlidingWindow:
+        with self._lock:
+            if name not in self._windows:
+                self._windows[name] = SlidingWindow(name, window, bucket)
+            return self._windows[name]
+
+    @property
+    def max_window(self) -> timedelta:
+        return max((w.window for w in self._windows.values()), default=timedelta(0))
+
+    def clear(self):
+        for w in list(self._windows.values()):
+            w.clear()
+
+    def rebuild(self, session: Session, rules: list):
+        """
+        Repopulate all windows from recently analyzed logs (e.g. at startup).
+        """
+        self.clear()
+        since = datetime.utcnow() - self.max_window
+        statement = select(Log).where(
+            Log.timestamp >= since,
+            Log.processed == True
+        ).order_by(Log.timestamp)
+
+        count = 0
+        for log in session.exec(statement):
+            # Windowed rules only read normalized columns, so raw_data is not decoded
+            for rule in rules:
+                rule.observe(log, {})
+            count += 1
+
+        logger.info(f"Sliding window state rebuilt from {count} logs since {since}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: w.stats() for name, w in self._windows.items()}
+
+window_store = SlidingWindowStore()
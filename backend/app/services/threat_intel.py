@@ -1,24 +1,400 @@
-from typing import List
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.bloom import BloomFilter
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import ipaddress
+import json
+import os
+import re
+import socket
+import threading
+import time
+
+# Built-in indicators, always present in addition to any configured feeds
+BUILTIN_INDICATORS = [
+    ("192.168.1.100", "Known C2 Server"),
+    ("10.0.0.5", "Botnet Node"),
+    ("172.16.0.20", "Phishing Source"),
+    ("e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855", "Empty File (Test)"),
+    ("5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8", "Ransomware.WannaCry"),
+]
+
+HASH_PATTERN = re.compile(r"^(?:[0-9a-fA-F]{32}|[0-9a-fA-F]{40}|[0-9a-fA-F]{64})$")
+FEED_EXTENSIONS = (".csv", ".json", ".txt", ".lst", ".list")
+# Bloom filter granularity: /24 for IPv4, /48 for IPv6 (host bits shifted off)
+BLOOM_BUCKET_SHIFT = {4: 8, 6: 80}
+
+
+def ip_to_int(ip: str) -> Tuple[int, int]:
+    """
+    Parse an address into (version, integer). IPv4 takes a fast path
+    through inet_pton; raises ValueError for anything that is not an IP.
+    """
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except OSError:
+        address = ipaddress.ip_address(ip)
+        return address.version, int(address)
+
+
+def parse_network(indicator: str) -> Tuple[int, int, int]:
+    """
+    Parse an IP or CIDR block into (version, first, last) integers.
+    """
+    if "/" not in indicator:
+        version, value = ip_to_int(indicator)
+        return version, value, value
+    network = ipaddress.ip_network(indicator, strict=False)
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def _bucket_key(version: int, bucket: int) -> int:
+    # Low bits tag the key kind so IPv4, IPv6 and hash keys never collide
+    return bucket << 2 | (0 if version == 4 else 1)
+
+
+def _hash_key(digest: bytes) -> int:
+    return int.from_bytes(digest[:16], "big") << 2 | 2
+
+
+def _flatten(ranges: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """
+    Turn possibly nested (start, end, label_id) prefixes into sorted, disjoint
+    segments where the most specific prefix wins, so a lookup is a single
+    binary search.
+    """
+    ranges.sort(key=lambda r: (r[0], -r[1]))
+    segments: List[Tuple[int, int, int]] = []
+    stack: List[Tuple[int, int, int]] = []
+    cursor = 0
+
+    def emit(until: int):
+        nonlocal cursor
+        start, end, label = stack[-1]
+        if cursor <= until:
+            segments.append((cursor, until, label))
+        cursor = until + 1
+
+    for start, end, label in ranges:
+        while stack and stack[-1][1] < start:
+            emit(stack[-1][1])
+            stack.pop()
+        if stack and cursor < start:
+            emit(start - 1)
+        stack.append((start, end, label))
+        cursor = max(cursor, start)
+    while stack:
+        emit(stack[-1][1])
+        stack.pop()
+    return segments
+
+
+class ThreatIntelIndex:
+    """
+    Immutable lookup structure for one version of the threat intel feeds.
+
+    IPv4 prefixes are flattened into disjoint segments stored as sorted
+    uint32 arrays; IPv6 uses sorted integer lists. Both answer exact and
+    prefix (CIDR) lookups with one binary search. File hashes are kept in a
+    dict keyed by their raw bytes.
+
+    A Bloom filter sits in front of the lookups, since nearly all of them are
+    misses. It holds hash digests and, per address, the bucket (/24 for IPv4,
+    /48 for IPv6) of every network at least that specific, so each lookup is
+    one probe. Wider networks are kept aside in a small segment list that is
+    consulted when the filter rules out the bucket.
+    """
+    def __init__(self, v4_starts: array, v4_ends: array, v4_labels: array,
+                 v6_starts: List[int], v6_ends: List[int], v6_labels: List[int],
+                 hashes: Dict[bytes, int], labels: List[str], info: Dict[str, Any],
+                 bloom: Optional[BloomFilter] = None, wide: Optional[Dict[int, Tuple[List[int], List[int], List[int]]]] = None):
+        self.v4_starts = v4_starts
+        self.v4_ends = v4_ends
+        self.v4_labels = v4_labels
+        self.v6_starts = v6_starts
+        self.v6_ends = v6_ends
+        self.v6_labels = v6_labels
+        self.hashes = hashes
+        self.labels = labels
+        self.info = info
+        self.bloom = bloom
+        self.wide = wide or {4: ([], [], []), 6: ([], [], [])}
+        self._counts = {"hits": 0, "misses": 0, "false_positives": 0}
+        self._counts_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, str]], info: Optional[Dict[str, Any]] = None,
+              fp_rate: Optional[float] = None) -> "ThreatIntelIndex":
+        start_time = time.perf_counter()
+        label_ids: Dict[str, int] = {}
+        v4: List[Tuple[int, int, int]] = []
+        v6: List[Tuple[int, int, int]] = []
+        hashes: Dict[bytes, int] = {}
+        rejected = 0
+
+        for indicator, label in entries:
+            indicator = indicator.strip()
+            label_id = label_ids.setdefault(label, len(label_ids))
+            if HASH_PATTERN.match(indicator):
+                hashes.setdefault(bytes.fromhex(indicator), label_id)
+                continue
+            try:
+                version, first, last = parse_network(indicator)
+            except ValueError:
+                rejected += 1
+                continue
+            (v4 if version == 4 else v6).append((first, last, label_id))
+
+        bloom, wide = None, {}
+        fp_rate = settings.THREAT_INTEL_BLOOM_FP_RATE if fp_rate is None else fp_rate
+        if fp_rate > 0:
+            bloom = BloomFilter.for_capacity(len(v4) + len(v6) + len(hashes), fp_rate)
+            for version, networks in ((4, v4), (6, v6)):
+                shift = BLOOM_BUCKET_SHIFT[version]
+                wide_networks = []
+                for network in networks:
+                    first, last, _ = network
+                    if last - first < 1 << shift:
+                        bloom.add(_bucket_key(version, first >> shift))
+                    else:
+                        wide_networks.append(network)
+                segments = _flatten(wide_networks)
+                wide[version] = ([s[0] for s in segments], [s[1] for s in segments], [s[2] for s in segments])
+            for digest in hashes:
+                bloom.add(_hash_key(digest))
+
+        v4_segments = _flatten(v4)
+        v6_segments = _flatten(v6)
+        info = dict(info or {})
+        info.update({
+            "ipv4_entries": len(v4),
+            "ipv4_segments": len(v4_segments),
+            "ipv6_entries": len(v6),
+            "hashes": len(hashes),
+            "rejected": rejected,
+            "build_seconds": round(time.perf_counter() - start_time, 3),
+        })
+        return cls(
+            array("I", (s[0] for s in v4_segments)),
+            array("I", (s[1] for s in v4_segments)),
+            array("I", (s[2] for s in v4_segments)),
+            [s[0] for s in v6_segments],
+            [s[1] for s in v6_segments],
+            [s[2] for s in v6_segments],
+            hashes,
+            list(label_ids),
+            info,
+            bloom=bloom,
+            wide=wide,
+        )
+
+    def _count(self, outcome: str):
+        with self._counts_lock:
+            self._counts[outcome] += 1
+
+    def _lookup_wide(self, version: int, value: int) -> Optional[str]:
+        starts, ends, labels = self.wide[version]
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return self.labels[labels[i]]
+        return None
+
+    def lookup_ip(self, ip: str) -> Optional[str]:
+        try:
+            version, value = ip_to_int(ip)
+        except ValueError:
+            return None
+        if self.bloom is not None and _bucket_key(version, value >> BLOOM_BUCKET_SHIFT[version]) not in self.bloom:
+            # Nothing as specific as a bucket matches; only wide networks can
+            label = self._lookup_wide(version, value)
+            self._count("hits" if label else "misses")
+            return label
+        label = self._lookup_range(version, value)
+        if self.bloom is not None:
+            self._count("hits" if label else "false_positives")
+        return label
+
+    def _lookup_range(self, version: int, value: int) -> Optional[str]:
+        if version == 4:
+            starts, ends, labels = self.v4_starts, self.v4_ends, self.v4_labels
+        else:
+            starts, ends, labels = self.v6_starts, self.v6_ends, self.v6_labels
+            value = self._v6_key(value)
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return self.labels[labels[i]]
+        return None
+
+    def _v6_key(self, value: int):
+        return value
+
+    def lookup_hash(self, file_hash: str) -> Optional[str]:
+        if not file_hash or not HASH_PATTERN.match(file_hash):
+            return None
+        digest = bytes.fromhex(file_hash)
+        if self.bloom is not None and _hash_key(digest) not in self.bloom:
+            self._count("misses")
+            return None
+        label = self._lookup_digest(digest)
+        if self.bloom is not None:
+            self._count("hits" if label else "false_positives")
+        return label
+
+    def _lookup_digest(self, digest: bytes) -> Optional[str]:
+        label_id = self.hashes.get(digest)
+        return self.labels[label_id] if label_id is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.info)
+        if self.bloom is not None:
+            with self._counts_lock:
+                counts = dict(self._counts)
+            maybe = counts["hits"] + counts["false_positives"]
+            negatives = counts["misses"] + counts["false_positives"]
+            stats["bloom"] = {
+                **self.bloom.describe(),
+                "wide_segments": {v: len(w[0]) for v, w in self.wide.items()},
+                **counts,
+                "rejected_ratio": round(counts["misses"] / (maybe + counts["misses"]), 4) if maybe + counts["misses"] else None,
+                "observed_fp_rate": round(counts["false_positives"] / negatives, 6) if negatives else None,
+            }
+        return stats
+
+
+def iter_feed(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (indicator, label) pairs from a feed file.
+
+    - .json: a list of indicators, a list of objects with an indicator field
+      (indicator/ip/cidr/hash/value) and optional label (label/threat/type),
+      or an {indicator: label} mapping
+    - .csv: indicator in the first column, optional label in the second;
+      a header row is skipped
+    - anything else: one indicator per line, optionally followed by a label;
+      '#' starts a comment
+    """
+    default_label = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            for indicator, label in data.items():
+                yield str(indicator), str(label or default_label)
+            return
+        for item in data:
+            if isinstance(item, dict):
+                indicator = next((item[k] for k in ("indicator", "ip", "cidr", "hash", "value") if item.get(k)), None)
+                label = next((item[k] for k in ("label", "threat", "type") if item.get(k)), default_label)
+                if indicator:
+                    yield str(indicator), str(label)
+            elif item:
+                yield str(item), default_label
+    elif path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for i, row in enumerate(csv.reader(f)):
+                if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                    continue
+                if i == 0 and row[0].strip().lower() in ("indicator", "ip", "cidr", "hash", "value"):
+                    continue
+                label = row[1].strip() if len(row) > 1 and row[1].strip() else default_label
+                yield row[0], label
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                parts = line.split(None, 1)
+                yield parts[0], parts[1] if len(parts) > 1 else default_label
+
+
+def feed_paths(spec: str) -> List[str]:
+    """
+    Expand THREAT_INTEL_FEEDS: comma-separated files and/or directories.
+    """
+    paths = []
+    for item in (p.strip() for p in (spec or "").split(",")):
+        if not item:
+            continue
+        if os.path.isdir(item):
+            paths += sorted(
+                os.path.join(item, name) for name in os.listdir(item)
+                if name.endswith(FEED_EXTENSIONS)
+            )
+        else:
+            paths.append(item)
+    return paths
+
+
+def load_entries(feeds: Optional[str] = None) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Built-in indicators plus every configured feed, and the list of sources read.
+    """
+    entries = list(BUILTIN_INDICATORS)
+    sources = ["builtin"]
+    for path in feed_paths(settings.THREAT_INTEL_FEEDS if feeds is None else feeds):
+        try:
+            entries.extend(iter_feed(path))
+            sources.append(path)
+        except Exception as e:
+            logger.error(f"Failed to load threat intel feed {path}: {e}")
+    return entries, sources
+
 
 class ThreatIntelService:
+    """
+    Holds the current ThreatIntelIndex. reload() builds a new index off to the
+    side and publishes it with a single reference swap, so lookups never block
+    and always see one complete feed version.
+    """
     def __init__(self):
-        # Mock database of known malicious indicators
-        self.malicious_ips = {
-            "192.168.1.100": "Known C2 Server",
-            "10.0.0.5": "Botnet Node",
-            "172.16.0.20": "Phishing Source"
-        }
-        self.malicious_hashes = {
-            "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855": "Empty File (Test)",
-            "5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8": "Ransomware.WannaCry"
-        }
+        self._reload_lock = threading.Lock()
+        self._version = 0
+        self._index = ThreatIntelIndex.build(BUILTIN_INDICATORS, {"version": 0, "sources": ["builtin"]})
+
+    @property
+    def index(self) -> ThreatIntelIndex:
+        return self._index
+
+    def reload(self, feeds: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Swap in a new index: the compiled snapshot (THREAT_INTEL_SNAPSHOT) when
+        there is one, otherwise an index built from the configured feeds.
+        """
+        with self._reload_lock:
+            snapshot = settings.THREAT_INTEL_SNAPSHOT
+            if feeds is None and snapshot and os.path.exists(snapshot):
+                from app.services.threat_intel_snapshot import MappedThreatIntelIndex
+                index = MappedThreatIntelIndex(snapshot)
+            else:
+                entries, sources = load_entries(feeds)
+                index = ThreatIntelIndex.build(entries, {"sources": sources})
+
+            version = self._version + 1
+            index.info.update({"version": version, "loaded_at": datetime.utcnow().isoformat()})
+            self._index = index
+            self._version = version
+            logger.info(
+                f"Threat intel v{version} loaded: {index.info['ipv4_entries'] + index.info['ipv6_entries']} networks, "
+                f"{index.info['hashes']} hashes" + (f" from snapshot {snapshot}" if index.info.get("mapped") else "")
+            )
+            return index.info
 
     def check_ip(self, ip: str) -> str:
         """Returns the threat type if found, else None"""
-        return self.malicious_ips.get(ip)
+        if not ip:
+            return None
+        return self._index.lookup_ip(ip)
 
     def check_file_hash(self, file_hash: str) -> str:
         """Returns the threat type if found, else None"""
-        return self.malicious_hashes.get(file_hash)
+        return self._index.lookup_hash(file_hash)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._index.stats()
 
 threat_intel = ThreatIntelService()
@@ -0,0 +1,170 @@
+"""
+Compiled, memory-mapped threat intel snapshots.
+
+A snapshot holds one ThreatIntelIndex in fixed-width sorted sections:
+
+    magic (8 bytes) | metadata length (uint32) | metadata JSON | padding | sections
+
+IPv4 segment bounds and label ids are uint32 arrays in host byte order,
+IPv6 bounds are 16-byte big-endian integers, and hash digests are stored
+sorted per digest size (MD5/SHA-1/SHA-256) with a parallel label array.
+The Bloom prefilter bits are stored as one more section.
+Opening a snapshot maps the file read-only and binary-searches the mapped
+buffer in place, so every worker process shares the same page cache and
+startup does no parsing.
+"""
+from app.services.bloom import BloomFilter
+from app.services.threat_intel import ThreatIntelIndex
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"TISNAP01"
+FORMAT_VERSION = 1
+HASH_SIZES = (16, 20, 32)
+V6_WIDTH = 16
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class FixedWidthView:
+    """
+    Read-only sequence of fixed-width byte strings over a buffer, so bisect
+    can search it without materializing a list. Big-endian integers of equal
+    width compare the same as bytes.
+    """
+    def __init__(self, buffer: memoryview, width: int):
+        self.buffer = buffer
+        self.width = width
+
+    def __len__(self) -> int:
+        return len(self.buffer) // self.width
+
+    def __getitem__(self, i: int) -> bytes:
+        start = i * self.width
+        return bytes(self.buffer[start:start + self.width])
+
+
+def write_snapshot(index: ThreatIntelIndex, path: str) -> Dict[str, Any]:
+    """
+    Write `index` as a snapshot file. The file is written next to the target
+    and renamed into place, so processes that have the previous snapshot
+    mapped keep reading it undisturbed.
+    """
+    sections: List[Tuple[str, bytes]] = [
+        ("v4_starts", array("I", index.v4_starts).tobytes()),
+        ("v4_ends", array("I", index.v4_ends).tobytes()),
+        ("v4_labels", array("I", index.v4_labels).tobytes()),
+        ("v6_starts", b"".join(v.to_bytes(V6_WIDTH, "big") for v in index.v6_starts)),
+        ("v6_ends", b"".join(v.to_bytes(V6_WIDTH, "big") for v in index.v6_ends)),
+        ("v6_labels", array("I", index.v6_labels).tobytes()),
+    ]
+    for size in HASH_SIZES:
+        digests = sorted((d, label) for d, label in index.hashes.items() if len(d) == size)
+        sections.append((f"hash{size}", b"".join(d for d, _ in digests)))
+        sections.append((f"hash{size}_labels", array("I", (label for _, label in digests)).tobytes()))
+
+    if index.bloom is not None:
+        sections.append(("bloom", bytes(index.bloom.bits)))
+
+    layout = {}
+    offset = 0
+    for name, data in sections:
+        layout[name] = [offset, len(data)]
+        offset = _align(offset + len(data))
+
+    info = {k: v for k, v in index.info.items() if k not in ("snapshot", "mapped")}
+    info["compiled_at"] = datetime.utcnow().isoformat()
+    metadata = json.dumps({
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "sections": layout,
+        "labels": index.labels,
+        "bloom": {
+            "bits": index.bloom.size,
+            "hashes": index.bloom.hashes,
+            # Networks wider than a bucket; few, so kept inline
+            "wide": index.wide,
+        } if index.bloom is not None else None,
+        "info": info,
+    }).encode("utf-8")
+    base = _align(len(MAGIC) + 4 + len(metadata))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(metadata)))
+        f.write(metadata)
+        for name, data in sections:
+            f.seek(base + layout[name][0])
+            f.write(data)
+        f.truncate(base + offset)
+    os.replace(tmp_path, path)
+    return info
+
+
+class MappedThreatIntelIndex(ThreatIntelIndex):
+    """
+    ThreatIntelIndex backed by a memory-mapped snapshot file. Lookups read
+    the mapping directly; nothing but the label table is copied into the heap.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a threat intel snapshot")
+        (metadata_length,) = struct.unpack_from("<I", buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        metadata = json.loads(bytes(buffer[start:start + metadata_length]))
+        if metadata["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {metadata['format']}")
+        if metadata["byteorder"] != sys.byteorder:
+            raise ValueError(f"Snapshot was compiled on a {metadata['byteorder']}-endian host")
+        base = _align(start + metadata_length)
+
+        def section(name: str) -> memoryview:
+            offset, length = metadata["sections"][name]
+            return buffer[base + offset:base + offset + length]
+
+        self._hash_tables = {
+            size: (FixedWidthView(section(f"hash{size}"), size), section(f"hash{size}_labels").cast("I"))
+            for size in HASH_SIZES
+        }
+        bloom, wide = None, None
+        if metadata.get("bloom"):
+            bloom = BloomFilter(section("bloom"), metadata["bloom"]["bits"], metadata["bloom"]["hashes"])
+            wide = {int(v): tuple(w) for v, w in metadata["bloom"]["wide"].items()}
+        info = dict(metadata["info"])
+        info.update({"snapshot": path, "mapped": True})
+        super().__init__(
+            section("v4_starts").cast("I"),
+            section("v4_ends").cast("I"),
+            section("v4_labels").cast("I"),
+            FixedWidthView(section("v6_starts"), V6_WIDTH),
+            FixedWidthView(section("v6_ends"), V6_WIDTH),
+            section("v6_labels").cast("I"),
+            {},
+            metadata["labels"],
+            info,
+            bloom=bloom,
+            wide=wide,
+        )
+
+    def _v6_key(self, value: int) -> bytes:
+        return value.to_bytes(V6_WIDTH, "big")
+
+    def _lookup_digest(self, digest: bytes) -> Optional[str]:
+        digests, labels = self._hash_tables[len(digest)]
+        i = bisect_left(digests, digest)
+        if i < len(digests) and digests[i] == digest:
+            return self.labels[labels[i]]
+        return None
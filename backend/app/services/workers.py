@@ -0,0 +1,246 @@
+from sqlmodel import Session, select, delete
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logging import logger
+from app.models.models import AnalysisClaim, Log
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import socket
+import threading
+import time
+
+
+def claim_unprocessed(session: Session, owner: str, after_id: int, limit: int) -> Tuple[List[int], Optional[int]]:
+    """
+    Claim up to `limit` unprocessed, unclaimed logs with id > after_id.
+    Returns (claimed ids, last id looked at), or ([], None) when no such
+    logs are left. A log claimed concurrently by another process is skipped.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    session.exec(delete(AnalysisClaim).where(AnalysisClaim.claimed_at < now - timedelta(seconds=settings.ANALYSIS_CLAIM_TTL_SECONDS)))
+    candidates = session.exec(
+        select(Log.id)
+        .where(Log.processed == False, Log.id > after_id, Log.id.not_in(select(AnalysisClaim.log_id)))
+        .order_by(Log.id)
+        .limit(limit)
+    ).all()
+    if not candidates:
+        session.commit()
+        return [], None
+    claimed = session.execute(
+        insert(AnalysisClaim)
+        .values([{"log_id": log_id, "owner": owner, "claimed_at": now} for log_id in candidates])
+        .on_conflict_do_nothing(index_elements=["log_id"])
+        .returning(AnalysisClaim.log_id)
+    ).scalars().all()
+    session.commit()
+    return sorted(claimed), candidates[-1]
+
+
+class _WorkerStats:
+    __slots__ = ("jobs", "logs", "busy_seconds", "last_lag", "errors")
+
+    def __init__(self):
+        self.jobs = 0
+        self.logs = 0
+        self.busy_seconds = 0.0
+        self.last_lag = 0.0
+        self.errors = 0
+
+
+class AnalysisWorkerPool:
+    """
+    Dedicated analysis threads fed by a bounded in-process queue.
+
+    Capacity is counted in logs, not jobs, so one large ingest batch weighs
+    the same as many single-log jobs. Ingest reserves capacity before it
+    writes anything; when the queue is full the reservation either fails
+    immediately ("reject") or waits up to ANALYSIS_BLOCK_TIMEOUT ("block").
+    """
+    def __init__(self):
+        self._jobs = deque()  # (log_ids, enqueued_at)
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stats: Dict[str, _WorkerStats] = {}
+        self._pending = 0  # reserved + queued + in-flight logs
+        self._running = False
+        self._requeue_thread: Optional[threading.Thread] = None
+        self.max_pending = settings.ANALYSIS_QUEUE_MAX_LOGS
+        self.mode = settings.ANALYSIS_BACKPRESSURE
+        self.rejected = 0
+
+    def start(self, num_workers: Optional[int] = None):
+        # Import the analysis stack (and the ML libraries) up front, not in the first job
+        import app.services.analysis  # noqa: F401
+
+        num_workers = num_workers or settings.ANALYSIS_WORKERS
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(num_workers):
+            name = f"analysis-worker-{i}"
+            self._stats[name] = _WorkerStats()
+            thread = threading.Thread(target=self._run, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Analysis worker pool started with {num_workers} workers")
+
+    def stop(self, timeout: float = 10.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._requeue_thread is not None:
+            self._requeue_thread.join(timeout)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._requeue_thread = None
+        logger.info("Analysis worker pool stopped")
+
+    def reserve(self, count: int) -> bool:
+        """
+        Reserve queue capacity for `count` logs before they are stored.
+        Returns False if the queue is full (after waiting, in block mode).
+        A batch larger than the whole queue is admitted when the queue is empty.
+        """
+        deadline = time.monotonic() + settings.ANALYSIS_BLOCK_TIMEOUT
+        with self._cond:
+            while self._pending and self._pending + count > self.max_pending:
+                remaining = deadline - time.monotonic()
+                if self.mode != "block" or remaining <= 0:
+                    self.rejected += count
+                    return False
+                self._cond.wait(remaining)
+            self._pending += count
+            return True
+
+    def release(self, count: int):
+        """Return an unused reservation."""
+        with self._cond:
+            self._pending -= count
+            self._cond.notify_all()
+
+    def submit(self, log_ids: List[int], reserved: int = 0):
+        """
+        Queue logs for analysis, consuming `reserved` logs of earlier reservation.
+        """
+        with self._cond:
+            self._pending += len(log_ids) - reserved
+            if log_ids:
+                self._jobs.append((log_ids, time.monotonic()))
+            self._cond.notify_all()
+
+    def _run(self):
+        from app.services.analysis import analyze_batch_task
+        name = threading.current_thread().name
+        stats = self._stats[name]
+        session_factory = lambda: Session(engine)
+
+        while True:
+            with self._cond:
+                while self._running and not self._jobs:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                # Coalesce queued jobs into one micro-batch
+                log_ids, enqueued_at = self._jobs.popleft()
+                log_ids = list(log_ids)
+                while self._jobs and len(log_ids) + len(self._jobs[0][0]) <= settings.ANALYSIS_BATCH_SIZE:
+                    log_ids.extend(self._jobs.popleft()[0])
+
+            started = time.monotonic()
+            stats.last_lag = started - enqueued_at
+            try:
+                analyze_batch_task(log_ids, session_factory)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"{name} failed analyzing {len(log_ids)} logs: {e}")
+            finally:
+                stats.busy_seconds += time.monotonic() - started
+                stats.jobs += 1
+                stats.logs += len(log_ids)
+                with self._cond:
+                    self._pending -= len(log_ids)
+                    self._cond.notify_all()
+
+    def requeue_unprocessed(self):
+        """
+        Queue logs that were stored but never analyzed (e.g. before a
+        restart), from a background thread. Logs are claimed and queued in
+        chunks only as the queue has room, taking at most half of it, so
+        ingest keeps being admitted while the backlog drains.
+        """
+        if self._requeue_thread is not None:
+            return
+        self._requeue_thread = threading.Thread(target=self._requeue, name="analysis-requeue", daemon=True)
+        self._requeue_thread.start()
+
+    def _reserve_backlog(self, count: int) -> bool:
+        """Wait for room for `count` backlog logs and reserve it; False once the pool stops."""
+        with self._cond:
+            while self._running and self._pending and self._pending + count > self.max_pending // 2:
+                self._cond.wait()
+            if not self._running:
+                return False
+            self._pending += count
+            return True
+
+    def _requeue(self, chunk_size: int = 500):
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        total = 0
+        last_id = 0
+        while self._reserve_backlog(chunk_size):
+            try:
+                with Session(engine) as session:
+                    log_ids, last_id = claim_unprocessed(session, owner, last_id, chunk_size)
+            except Exception as e:
+                self.release(chunk_size)
+                logger.error(f"Requeueing unprocessed logs failed: {e}")
+                break
+            if last_id is None:
+                self.release(chunk_size)
+                break
+            self.submit(log_ids, reserved=chunk_size)
+            total += len(log_ids)
+        if total:
+            logger.info(f"Requeued {total} unprocessed logs for analysis")
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            queued_logs = sum(len(ids) for ids, _ in self._jobs)
+            lag = now - self._jobs[0][1] if self._jobs else 0.0
+            depth = len(self._jobs)
+            pending = self._pending
+
+        workers = {}
+        for name, stats in self._stats.items():
+            workers[name] = {
+                "jobs": stats.jobs,
+                "logs": stats.logs,
+                "errors": stats.errors,
+                "logs_per_sec": round(stats.logs / stats.busy_seconds, 1) if stats.busy_seconds > 0 else None,
+                "last_lag_ms": round(stats.last_lag * 1000, 1),
+            }
+
+        return {
+            "running": self._running,
+            "mode": self.mode,
+            "queue_depth": depth,
+            "queued_logs": queued_logs,
+            "pending_logs": pending,
+            "max_pending_logs": self.max_pending,
+            "lag_seconds": round(lag, 3),
+            "rejected_logs": self.rejected,
+            "workers": workers,
+        }
+
+analysis_pool = AnalysisWorkerPool()
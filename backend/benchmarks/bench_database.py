@@ -0,0 +1,214 @@
+"""
+Ingest throughput and dashboard latency under each database profile.
+
+Profiles:
+  sqlite-default  the previous engine: rollback journal, synchronous=FULL,
+                  default cache, ingest sharing the read pool
+  sqlite-wal      the SQLite profile: WAL, synchronous=NORMAL, mmap, busy
+                  timeout and a dedicated writer connection
+  postgres        the PostgreSQL profile: tuned pool and COPY ingest (also
+                  run with a multi-row INSERT as postgres-insert). Runs
+                  against --postgres-url, or a throwaway local server when the
+                  pgserver package is installed; skipped otherwise. A
+                  scratch database is created and dropped for the run.
+
+Each profile first ingests --batches batches serially (ingest throughput),
+then runs --writers ingest threads and --readers dashboard threads together
+for --seconds (dashboard latency while ingest is running). Each dashboard
+thread recomputes one payload every --interval-ms, like a polling viewer,
+so every profile serves the same dashboard load.
+
+Usage (from the backend directory):
+    python benchmarks/bench_database.py [--batch-size 500] [--batches 40] [--seconds 10]
+        [--writers 2] [--readers 4] [--interval-ms 100] [--postgres-url postgresql+psycopg://user@host/db]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.api.dashboard import compute_app_stats, compute_dashboard_stats, compute_hardware_stats, compute_network_stats
+from app.core.config import settings
+from app.core.database import create_engines
+from app.models.models import Log
+from app.services.ingest import bulk_insert_logs
+from app.services.normalization import normalize_log
+
+DASHBOARDS = (compute_dashboard_stats, compute_network_stats, compute_hardware_stats, compute_app_stats)
+CATEGORIES = ("network", "hardware", "application", "security")
+
+
+def make_logs(count: int, rng: random.Random):
+    now = datetime.utcnow()
+    logs = []
+    for _ in range(count):
+        category = rng.choice(CATEGORIES)
+        raw = {
+            "network": lambda: {"dest_ip": f"10.0.0.{rng.randint(1, 50)}", "dest_port": rng.choice((22, 80, 443, 3389)), "bytes_in": rng.randint(0, 50000), "bytes_out": rng.randint(0, 50000)},
+            "hardware": lambda: {"temp": rng.uniform(30, 90), "cpu_load": rng.uniform(0, 100)},
+            "application": lambda: {"status": rng.choice(("ok", "error")), "status_code": rng.choice((200, 200, 500))},
+            "security": lambda: {"action": rng.choice(("login", "logout")), "status": rng.choice(("success", "failure"))},
+        }[category]()
+        log = Log(
+            timestamp=now - timedelta(seconds=rng.randint(0, 3600)),
+            source="bench",
+            category=category,
+            event_type="bench_event",
+            entity_id=f"user{rng.randint(1, 200)}",
+            raw_data=json.dumps(raw),
+        )
+        normalize_log(log)
+        logs.append(log)
+    return logs
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def run(label: str, engine, writer_engine, args):
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(7)
+
+    # Serial ingest
+    batches = [make_logs(args.batch_size, rng) for _ in range(args.batches)]
+    start = time.perf_counter()
+    for batch in batches:
+        with Session(writer_engine) as session:
+            bulk_insert_logs(session, batch)
+    serial = args.batch_size * args.batches / (time.perf_counter() - start)
+
+    # Dashboards while ingest keeps running
+    stop = threading.Event()
+    ingested = [0] * args.writers
+    latencies = [[] for _ in range(args.readers)]
+    errors = []
+
+    def writer(i: int):
+        local = random.Random(i)
+        pending = [make_logs(args.batch_size, local) for _ in range(4)]
+        while not stop.is_set():
+            try:
+                with Session(writer_engine) as session:
+                    bulk_insert_logs(session, pending[ingested[i] // args.batch_size % len(pending)])
+                ingested[i] += args.batch_size
+            except Exception as e:
+                errors.append(f"ingest: {e}")
+
+    def reader(i: int):
+        n = 0
+        while not stop.is_set():
+            compute = DASHBOARDS[n % len(DASHBOARDS)]
+            n += 1
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    compute(session)
+            except Exception as e:
+                errors.append(f"{compute.__name__}: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            latencies[i].append(elapsed * 1000)
+            stop.wait(max(0.0, args.interval_ms / 1000 - elapsed))
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [ms for thread in latencies for ms in thread]
+    print(f"{label:<16} ingest {serial:9.0f} rows/s | under load: ingest {sum(ingested) / elapsed:9.0f} rows/s, "
+          f"dashboard p50 {percentile(all_latencies, 0.5):7.1f} ms  p95 {percentile(all_latencies, 0.95):7.1f} ms  "
+          f"({len(all_latencies)} requests)")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error ({errors.count(error)}x): {error}")
+    engine.dispose()
+    writer_engine.dispose()
+
+
+def run_sqlite(args):
+    tuned = {name: getattr(settings, name) for name in ("SQLITE_JOURNAL_MODE", "SQLITE_SYNCHRONOUS", "SQLITE_MMAP_SIZE", "SQLITE_CACHE_SIZE_KB")}
+    with tempfile.TemporaryDirectory() as tmp:
+        # SQLite's own defaults, with ingest on the shared pool
+        settings.SQLITE_JOURNAL_MODE, settings.SQLITE_SYNCHRONOUS = "DELETE", "FULL"
+        settings.SQLITE_MMAP_SIZE, settings.SQLITE_CACHE_SIZE_KB = 0, 2000
+        engine, _ = create_engines(f"sqlite:///{os.path.join(tmp, 'default.db')}")
+        run("sqlite-default", engine, engine, args)
+
+        for name, value in tuned.items():
+            setattr(settings, name, value)
+        run("sqlite-wal", *create_engines(f"sqlite:///{os.path.join(tmp, 'wal.db')}"), args)
+
+
+def local_postgres(tmp: str):
+    """URL of a throwaway local server, if pgserver is installed."""
+    try:
+        import pgserver
+    except ImportError:
+        return None, None
+    server = pgserver.get_server(os.path.join(tmp, "pgdata"), cleanup_mode="stop")
+    return make_url(server.get_uri()).set(drivername="postgresql+psycopg").render_as_string(hide_password=False), server
+
+
+def run_postgres(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url, server = (args.postgres_url, None) if args.postgres_url else local_postgres(tmp)
+        if url is None:
+            print("postgres         skipped (pass --postgres-url or pip install pgserver)")
+            return
+        admin = create_engine(url, isolation_level="AUTOCOMMIT")
+        try:
+            # The same profile with a multi-row INSERT, to show what COPY adds
+            for label, copy_ingest in (("postgres-insert", False), ("postgres", True)):
+                settings.POSTGRES_COPY_INGEST = copy_ingest
+                database = f"titan_bench_{os.getpid()}_{int(copy_ingest)}"
+                with admin.connect() as conn:
+                    conn.execute(text(f"CREATE DATABASE {database}"))
+                try:
+                    run(label, *create_engines(make_url(url).set(database=database).render_as_string(hide_password=False)), args)
+                finally:
+                    with admin.connect() as conn:
+                        conn.execute(text(f"DROP DATABASE {database}"))
+        finally:
+            admin.dispose()
+            if server is not None:
+                server.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--interval-ms", type=float, default=100.0)
+    parser.add_argument("--postgres-url", default=None)
+    args = parser.parse_args()
+
+    print(f"batch size: {args.batch_size}, serial batches: {args.batches}, "
+          f"load: {args.writers} ingest + {args.readers} dashboard threads (one payload per {args.interval_ms:.0f} ms) for {args.seconds:.0f} s")
+    run_sqlite(args)
+    run_postgres(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+SOAR executor throughput with the local stub connectors, against a
+temporary SQLite database. Compares one call at a time (the old inline
+behaviour) with the configured per-connector concurrency.
+
+Usage (from the backend directory):
+    python benchmarks/bench_soar.py [--actions 500] [--latency-ms 50] [--failure-rate 0.1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel, Session, create_engine, func, select
+
+from app.core.config import settings
+from app.models.models import SoarAction
+from app.services.soar_connectors import EDRConnector, FirewallConnector, IAMConnector, PLAYBOOK_ACTIONS, parse_concurrency
+from app.services.soar_executor import SoarExecutor
+
+
+def enqueue(engine, count: int):
+    playbooks = list(PLAYBOOK_ACTIONS)
+    with Session(engine) as session:
+        for i in range(count):
+            playbook = playbooks[i % len(playbooks)]
+            session.add(SoarAction(
+                idempotency_key=f"bench:{i}",
+                playbook=playbook,
+                connector=PLAYBOOK_ACTIONS[playbook][0],
+                target=f"10.0.{i // 250}.{i % 250}",
+            ))
+        session.commit()
+
+
+def drain(engine, executor: SoarExecutor) -> float:
+    start = time.perf_counter()
+    executor.start()
+    with Session(engine) as session:
+        while session.exec(select(func.count()).where(SoarAction.status.in_(("pending", "running")))).one():
+            time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    executor.stop()
+    return elapsed
+
+
+def run(label: str, concurrency, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        enqueue(engine, args.actions)
+        connectors = {
+            c.name: c
+            for c in (FirewallConnector(args.latency_ms, args.failure_rate), IAMConnector(args.latency_ms, args.failure_rate), EDRConnector(args.latency_ms, args.failure_rate))
+        }
+        executor = SoarExecutor(engine, connectors=connectors, concurrency=concurrency)
+        elapsed = drain(engine, executor)
+        calls = sum(c.calls for c in connectors.values())
+        print(f"{label:<28} {elapsed:8.2f} s  {args.actions / elapsed:8.1f} actions/s  "
+              f"calls={calls} succeeded={executor.succeeded} failed={executor.failed} retried={executor.retried}")
+        engine.dispose()
+        return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actions", type=int, default=500)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    # Retries in a benchmark should not wait minutes
+    settings.SOAR_RETRY_BASE_SECONDS = 0.05
+    settings.SOAR_RETRY_MAX_SECONDS = 0.5
+
+    print(f"actions: {args.actions}, stub latency: {args.latency_ms} ms, failure rate: {args.failure_rate}")
+    serial = run("serial (1 per connector)", {"firewall": 1, "iam": 1, "edr": 1}, args)
+    concurrent = run(f"concurrent ({settings.SOAR_CONNECTOR_CONCURRENCY})", parse_concurrency(settings.SOAR_CONNECTOR_CONCURRENCY), args)
+    print(f"speedup: {serial / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Titan-SIEM maintenance commands.
+
+Usage (from the backend directory):
+    python manage.py migrate
+    python manage.py rebuild-rollups [--since-hours N]
+    python manage.py compile-threat-intel [--feeds PATHS] [--output FILE]
+    python manage.py export {logs,alerts} [--format F] [--output FILE] [filters...]
+    python manage.py partition-logs
+"""
+import argparse
+import contextlib
+import sys
+
+
+def cmd_migrate(args):
+    from app.core.database import create_db_and_tables
+    create_db_and_tables()
+    print("Database schema and data migrations are up to date.")
+
+
+def cmd_rebuild_rollups(args):
+    from datetime import datetime, timedelta
+    from sqlmodel import Session
+    from app.core.database import create_db_and_tables, engine
+    from app.services.rollups import rebuild_rollups
+
+    create_db_and_tables()
+    since = datetime.utcnow() - timedelta(hours=args.since_hours) if args.since_hours else None
+    with Session(engine) as session:
+        total = rebuild_rollups(session, since=since)
+    print(f"Rebuilt rollups from {total} logs.")
+
+
+def cmd_compile_threat_intel(args):
+    from app.core.config import settings
+    from app.services.threat_intel import ThreatIntelIndex, load_entries
+    from app.services.threat_intel_snapshot import write_snapshot
+
+    output = args.output or settings.THREAT_INTEL_SNAPSHOT
+    if not output:
+        print("No output file: pass --output or set THREAT_INTEL_SNAPSHOT.", file=sys.stderr)
+        return 1
+    entries, sources = load_entries(args.feeds)
+    index = ThreatIntelIndex.build(entries, {"sources": sources})
+    info = write_snapshot(index, output)
+    print(
+        f"Compiled {info['ipv4_entries']} IPv4 and {info['ipv6_entries']} IPv6 networks, "
+        f"{info['hashes']} hashes from {len(sources) - 1} feeds into {output} "
+        f"({info['rejected']} rejected)."
+    )
+
+
+def cmd_export(args):
+    from datetime import datetime
+    from app.services.export import ExportJob
+    from app.services.search import SearchFilters
+
+    split = lambda value: [v.strip() for v in value.split(",") if v.strip()] if value else None
+    filters = SearchFilters(
+        start=datetime.fromisoformat(args.start) if args.start else None,
+        end=datetime.fromisoformat(args.end) if args.end else None,
+        category=split(args.category),
+        source=split(args.source),
+        event_type=split(args.event_type),
+        entity_id=split(args.entity_id),
+        status=split(args.status),
+        min_risk=args.min_risk,
+        max_risk=args.max_risk,
+    )
+    try:
+        job = ExportJob(args.table, filters, split(args.fields), args.format)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    output = args.output or job.filename(datetime.utcnow().strftime("%Y%m%d%H%M%S"))
+    written = 0
+    with (open(output, "wb") if output != "-" else contextlib.nullcontext(sys.stdout.buffer)) as out:
+        for piece in job.stream():
+            out.write(piece)
+            written += len(piece)
+    if output != "-":
+        print(f"Exported {args.table} to {output} ({written} bytes).")
+
+
+def cmd_partition_logs(args):
+    from app.core.database import create_db_and_tables
+    from app.services.partitions import log_partitions
+
+    create_db_and_tables()
+    result = log_partitions.maintain()
+    print(
+        f"Moved {result['moved']} logs into day partitions, compacted {len(result['compacted'])} partitions "
+        f"into the cold tier, dropped {len(result['dropped'])} expired partitions/segments."
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="manage.py", description="Titan-SIEM maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Create tables, add new columns/indexes and run data migrations")
+    migrate.set_defaults(func=cmd_migrate)
+
+    rollups = subparsers.add_parser("rebuild-rollups", help="Regenerate the per-minute and per-hour rollup tables from Log, in one transaction (ingest waits for it)")
+    rollups.add_argument("--since-hours", type=int, default=None, help="Only rebuild the last N hours (default: everything)")
+    rollups.set_defaults(func=cmd_rebuild_rollups)
+
+    compile_ti = subparsers.add_parser("compile-threat-intel", help="Compile threat intel feeds into a memory-mapped snapshot")
+    compile_ti.add_argument("--feeds", default=None, help="Comma-separated feed files/directories (default: THREAT_INTEL_FEEDS)")
+    compile_ti.add_argument("--output", default=None, help="Snapshot file (default: THREAT_INTEL_SNAPSHOT)")
+    compile_ti.set_defaults(func=cmd_compile_threat_intel)
+
+    export = subparsers.add_parser("export", help="Stream logs or alerts to NDJSON, CSV, Parquet or Arrow")
+    export.add_argument("table", choices=["logs", "alerts"])
+    export.add_argument("--format", default="ndjson", choices=["ndjson", "csv", "parquet", "arrow"])
+    export.add_argument("--output", default=None, help="Output file, '-' for stdout (default: <table>-<timestamp>.<ext>)")
+    export.add_argument("--fields", default=None, help="Comma-separated columns (default: all)")
+    export.add_argument("--start", default=None, help="ISO timestamp, inclusive")
+    export.add_argument("--end", default=None, help="ISO timestamp, exclusive")
+    for name in ("category", "source", "event-type", "entity-id", "status"):
+        export.add_argument(f"--{name}", default=None, help="Comma-separated values")
+    export.add_argument("--min-risk", type=float, default=None)
+    export.add_argument("--max-risk", type=float, default=None)
+    export.set_defaults(func=cmd_export)
+
+    partition = subparsers.add_parser("partition-logs", help="Move aged logs into per-day partitions, compact old partitions to the cold tier and apply retention")
+    partition.set_defaults(func=cmd_partition_logs)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
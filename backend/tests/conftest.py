@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+from sqlmodel import SQLModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import create_engines
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A fresh database: TEST_DATABASE_URL (emptied first), else a SQLite file."""
+    url = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{tmp_path / 'test.db'}"
+    engine, _ = create_engines(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
@@ -0,0 +1,98 @@
+import threading
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.models.models import Alert
+from app.services import alert_aggregation
+from app.services.alert_aggregation import AlertAggregator
+
+SIGNALS = ["Brute Force"]
+
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    """A fresh aggregator in place of the singleton, which the session hooks update."""
+    aggregator = AlertAggregator()
+    monkeypatch.setattr(alert_aggregation, "alert_aggregator", aggregator)
+    return aggregator
+
+
+def candidate(timestamp: datetime, risk_score: float = 90.0):
+    alert = Alert(
+        timestamp=timestamp,
+        risk_score=risk_score,
+        title="Brute Force",
+        description="5 failed logins",
+        entity_id="alice",
+        confidence_score=0.9,
+    )
+    return alert, SIGNALS
+
+
+def test_repeats_in_one_window_update_one_row(engine, aggregator):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        new_alerts, soar_alerts = aggregator.coalesce(session, [candidate(now, 50.0), candidate(now, 95.0)])
+        session.commit()
+        assert len(new_alerts) == 1 and len(soar_alerts) == 1
+
+        new_alerts, soar_alerts = aggregator.coalesce(session, [candidate(now, 99.0)])
+        session.commit()
+        assert new_alerts == [] and soar_alerts == []
+
+        alert = session.exec(select(Alert)).one()
+        assert (alert.occurrence_count, alert.peak_score) == (3, 99.0)
+    assert (aggregator.created, aggregator.suppressed) == (1, 2)
+
+
+def test_concurrent_workers_create_one_row_and_fire_soar_once(engine, aggregator):
+    now = datetime.utcnow()
+    first, second = Session(engine), Session(engine)
+    try:
+        # The first worker creates the aggregate but has not committed yet
+        first_new, first_soar = aggregator.coalesce(first, [candidate(now)])
+        results = {}
+
+        def second_worker():
+            results["second"] = aggregator.coalesce(second, [candidate(now)])
+            second.commit()
+
+        thread = threading.Thread(target=second_worker)
+        thread.start()
+        thread.join(0.5)
+        assert thread.is_alive() # waiting on the first worker's uncommitted insert
+        first.commit()
+        thread.join(10)
+        assert not thread.is_alive()
+        second_new, second_soar = results["second"]
+
+        assert len(first_new) + len(second_new) == 1
+        assert len(first_soar) + len(second_soar) == 1
+        with Session(engine) as session:
+            alert = session.exec(select(Alert)).one()
+            assert alert.occurrence_count == 2
+    finally:
+        first.close()
+        second.close()
+
+
+def test_repeat_of_a_deleted_alert_starts_a_new_aggregate(engine, aggregator):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        aggregator.coalesce(session, [candidate(now)])
+        session.commit()
+
+        # Deleted behind the aggregator's back: the repeats must not be lost
+        session.exec(delete(Alert))
+        session.commit()
+
+        new_alerts, soar_alerts = aggregator.coalesce(session, [candidate(now, 85.0), candidate(now, 95.0)])
+        session.commit()
+        assert len(new_alerts) == 1 and soar_alerts == new_alerts
+
+        alert = session.exec(select(Alert)).one()
+        assert (alert.occurrence_count, alert.peak_score) == (2, 95.0)
+        assert aggregator._open[alert.rule_key].id == alert.id
+    assert (aggregator.created, aggregator.suppressed) == (2, 1)
@@ -1,30 +1,10 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
+import { useLiveData } from '../hooks/useLiveData';
 import { Shield, Users, AlertTriangle, Activity } from 'lucide-react';
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, BarChart, Bar, Cell } from 'recharts';
 
 const AppView = ({ refreshInterval = 2000, isLive = true }) => {
-    const [data, setData] = useState(null);
-    const [loading, setLoading] = useState(true);
-
-    const fetchData = async () => {
-        try {
-            const response = await axios.get('http://localhost:8000/api/v1/dashboard/app-stats');
-            setData(response.data);
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching app stats:", error);
-        }
-    };
-
-    useEffect(() => {
-        fetchData();
-        let interval;
-        if (isLive) {
-            interval = setInterval(fetchData, refreshInterval);
-        }
-        return () => clearInterval(interval);
-    }, [refreshInterval, isLive]);
+    const { data, loading } = useLiveData('app-stats', '/dashboard/app-stats', { isLive, throttleMs: refreshInterval });
 
     if (loading || !data) return <div className="p-10 text-center text-primary">Loading Application Security Data...</div>;
 
@@ -1,30 +1,15 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
+import { useLiveData, applyStatsDelta } from '../hooks/useLiveData';
 import { Shield, Search, RefreshCw, Eye, AlertTriangle, Activity, Map, User, Terminal, Server, Globe } from 'lucide-react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, BarChart, Bar, Cell, AreaChart, Area, RadarChart, PolarGrid, PolarAngleAxis, PolarRadiusAxis, Radar } from 'recharts';
 
 const Dashboard = ({ refreshInterval = 2000, isLive = true }) => {
-    const [data, setData] = useState(null);
-    const [loading, setLoading] = useState(true);
-
-    const fetchData = async () => {
-        try {
-            const response = await axios.get('http://localhost:8000/api/v1/dashboard/stats');
-            setData(response.data);
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching dashboard data:", error);
-        }
-    };
-
-    useEffect(() => {
-        fetchData();
-        let interval;
-        if (isLive) {
-            interval = setInterval(fetchData, refreshInterval);
-        }
-        return () => clearInterval(interval);
-    }, [refreshInterval, isLive]);
+    // Pushed by the server as logs and alerts arrive; no polling
+    const { data, loading, refresh } = useLiveData('stats', '/dashboard/stats', {
+        isLive,
+        throttleMs: refreshInterval,
+        applyDelta: applyStatsDelta,
+    });
 
     if (loading || !data) return (
         <div className="flex flex-col items-center justify-center h-96 text-primary gap-4">
@@ -53,7 +38,7 @@ const Dashboard = ({ refreshInterval = 2000, isLive = true }) => {
                     </p>
                 </div>
                 <div className="flex items-center gap-4">
-                    <button onClick={fetchData} className="p-2 bg-surface border border-gray-700 rounded-lg hover:border-primary transition-colors group">
+                    <button onClick={refresh} className="p-2 bg-surface border border-gray-700 rounded-lg hover:border-primary transition-colors group">
                         <RefreshCw className="w-5 h-5 text-gray-400 group-hover:text-primary group-hover:rotate-180 transition-all duration-500" />
                     </button>
                 </div>
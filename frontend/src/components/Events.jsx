@@ -1,26 +1,9 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
+import { useLiveData, applyStatsDelta } from '../hooks/useLiveData';
 import { Activity, AlertCircle, CheckCircle, Clock } from 'lucide-react';
 
 const Events = () => {
-    const [data, setData] = useState(null);
-    const [loading, setLoading] = useState(true);
-
-    const fetchData = async () => {
-        try {
-            const response = await axios.get('http://localhost:8000/api/v1/dashboard/stats');
-            setData(response.data);
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching events data:", error);
-        }
-    };
-
-    useEffect(() => {
-        fetchData();
-        const interval = setInterval(fetchData, 5000);
-        return () => clearInterval(interval);
-    }, []);
+    const { data, loading } = useLiveData('stats', '/dashboard/stats', { applyDelta: applyStatsDelta });
 
     if (loading || !data) return <div className="flex items-center justify-center h-96"><Clock className="w-8 h-8 animate-spin text-primary" /></div>;
 
@@ -1,32 +1,12 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
+import { useLiveData } from '../hooks/useLiveData';
 import { Server, Cpu, HardDrive, Thermometer } from 'lucide-react';
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 
 const HardwareView = ({ refreshInterval = 2000, isLive = true }) => {
-    const [tempData, setTempData] = useState([]);
-    const [racks, setRacks] = useState([]);
-    const [loading, setLoading] = useState(true);
-
-    const fetchData = async () => {
-        try {
-            const response = await axios.get('http://localhost:8000/api/v1/dashboard/hardware-stats');
-            setTempData(response.data.temp_data);
-            setRacks(response.data.racks);
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching hardware stats:", error);
-        }
-    };
-
-    useEffect(() => {
-        fetchData();
-        let interval;
-        if (isLive) {
-            interval = setInterval(fetchData, refreshInterval);
-        }
-        return () => clearInterval(interval);
-    }, [refreshInterval, isLive]);
+    const { data, loading } = useLiveData('hardware-stats', '/dashboard/hardware-stats', { isLive, throttleMs: refreshInterval });
+    const tempData = data?.temp_data ?? [];
+    const racks = data?.racks ?? [];
 
     if (loading) return <div className="p-10 text-center text-primary">Loading Hardware Telemetry...</div>;
 
@@ -1,28 +1,12 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React, { useState } from 'react';
+import { useLiveData, applyStatsDelta } from '../hooks/useLiveData';
 import { FileText, Filter, Download, Search, Clock } from 'lucide-react';
 
 const Logs = () => {
-    const [data, setData] = useState(null);
-    const [loading, setLoading] = useState(true);
     const [filter, setFilter] = useState('all');
     const [showExportMenu, setShowExportMenu] = useState(false);
 
-    const fetchData = async () => {
-        try {
-            const response = await axios.get('http://localhost:8000/api/v1/dashboard/stats');
-            setData(response.data);
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching logs data:", error);
-        }
-    };
-
-    useEffect(() => {
-        fetchData();
-        const interval = setInterval(fetchData, 5000);
-        return () => clearInterval(interval);
-    }, []);
+    const { data, loading } = useLiveData('stats', '/dashboard/stats', { applyDelta: applyStatsDelta });
 
     const filteredLogs = data && filter === 'all'
         ? data.lists.live_logs
@@ -1,27 +1,10 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
+import { useLiveData, applyStatsDelta } from '../hooks/useLiveData';
 import { Network, TrendingUp, TrendingDown, Activity, Clock } from 'lucide-react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 
 const NetworkActivity = () => {
-    const [data, setData] = useState(null);
-    const [loading, setLoading] = useState(true);
-
-    const fetchData = async () => {
-        try {
-            const response = await axios.get('http://localhost:8000/api/v1/dashboard/stats');
-            setData(response.data);
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching network data:", error);
-        }
-    };
-
-    useEffect(() => {
-        fetchData();
-        const interval = setInterval(fetchData, 5000);
-        return () => clearInterval(interval);
-    }, []);
+    const { data, loading } = useLiveData('stats', '/dashboard/stats', { applyDelta: applyStatsDelta });
 
     if (loading || !data) return <div className="flex items-center justify-center h-96"><Clock className="w-8 h-8 animate-spin text-primary" /></div>;
 
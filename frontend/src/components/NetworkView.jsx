@@ -1,32 +1,12 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React from 'react';
+import { useLiveData } from '../hooks/useLiveData';
 import { Globe, Shield, Activity, Wifi } from 'lucide-react';
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, BarChart, Bar, Cell } from 'recharts';
 
 const NetworkView = ({ refreshInterval = 2000, isLive = true }) => {
-    const [trafficData, setTrafficData] = useState([]);
-    const [topPorts, setTopPorts] = useState([]);
-    const [loading, setLoading] = useState(true);
-
-    const fetchData = async () => {
-        try {
-            const response = await axios.get('http://localhost:8000/api/v1/dashboard/network-stats');
-            setTrafficData(response.data.traffic_data);
-            setTopPorts(response.data.top_ports);
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching network stats:", error);
-        }
-    };
-
-    useEffect(() => {
-        fetchData();
-        let interval;
-        if (isLive) {
-            interval = setInterval(fetchData, refreshInterval);
-        }
-        return () => clearInterval(interval);
-    }, [refreshInterval, isLive]);
+    const { data, loading } = useLiveData('network-stats', '/dashboard/network-stats', { isLive, throttleMs: refreshInterval });
+    const trafficData = data?.traffic_data ?? [];
+    const topPorts = data?.top_ports ?? [];
 
     if (loading) return <div className="p-10 text-center text-primary">Loading Network Telemetry...</div>;
 
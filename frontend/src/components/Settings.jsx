@@ -26,7 +26,7 @@ const Settings = ({ refreshInterval, setRefreshInterval, isLive, setIsLive }) =>
                             </div>
                             <div>
                                 <h4 className="font-medium text-gray-200">Live Updates</h4>
-                                <p className="text-sm text-gray-500">Pause or resume real-time data fetching</p>
+                                <p className="text-sm text-gray-500">Pause or resume the live update stream</p>
                             </div>
                         </div>
                         <button
@@ -59,8 +59,8 @@ const Settings = ({ refreshInterval, setRefreshInterval, isLive, setIsLive }) =>
                             ))}
                         </div>
                         <p className="text-sm text-gray-500 mt-2">
-                            Current setting: Updates every <span className="text-primary font-bold">{refreshInterval / 1000} seconds</span>.
-                            Faster updates provide more real-time visibility but increase network load.
+                            Current setting: Charts redraw at most every <span className="text-primary font-bold">{refreshInterval / 1000} seconds</span>.
+                            Updates are pushed by the server as data changes, so a faster rate adds no load on the backend.
                         </p>
                     </div>
                 </div>
@@ -0,0 +1,104 @@
+import { useState, useEffect, useCallback, useRef } from 'react';
+import axios from 'axios';
+
+const API_BASE = 'http://localhost:8000/api/v1';
+
+// Loads a dashboard snapshot over REST, then keeps it current from the
+// server's live stream (/live/events) instead of polling. The server pushes
+// a fresh snapshot whenever the underlying data changes; `applyDelta` can
+// also fold the incremental "delta" messages (new logs, new alerts,
+// counters) into the current data between snapshots. `throttleMs` caps how
+// often the view re-renders.
+export function useLiveData(topic, path, { isLive = true, throttleMs = 0, applyDelta = null } = {}) {
+    const [data, setData] = useState(null);
+    const [loading, setLoading] = useState(true);
+    const applyDeltaRef = useRef(applyDelta);
+    useEffect(() => {
+        applyDeltaRef.current = applyDelta;
+    }, [applyDelta]);
+
+    const refresh = useCallback(async () => {
+        try {
+            const response = await axios.get(`${API_BASE}${path}`);
+            setData(response.data);
+            setLoading(false);
+        } catch (error) {
+            console.error(`Error fetching ${path}:`, error);
+        }
+    }, [path]);
+
+    useEffect(() => {
+        if (!isLive) {
+            refresh();
+            return undefined;
+        }
+
+        const topics = applyDeltaRef.current ? `${topic},events` : topic;
+        const source = new EventSource(`${API_BASE}/live/events?topics=${topics}`);
+        let lastRender = 0;
+        let pending = null;
+        let timer = null;
+
+        const render = (update) => {
+            const previous = pending;
+            pending = previous ? (prev) => update(previous(prev)) : update;
+            const flush = () => {
+                const apply = pending;
+                pending = null;
+                timer = null;
+                lastRender = Date.now();
+                setData((prev) => (prev ? apply(prev) : prev));
+            };
+            const wait = lastRender + throttleMs - Date.now();
+            if (wait <= 0) flush();
+            else if (!timer) timer = setTimeout(flush, wait);
+        };
+
+        source.addEventListener('snapshot', (event) => {
+            const message = JSON.parse(event.data);
+            if (message.topic === topic) render(() => message.data);
+        });
+        source.addEventListener('delta', (event) => {
+            const message = JSON.parse(event.data);
+            if (applyDeltaRef.current) render((prev) => applyDeltaRef.current(prev, message));
+        });
+        // Load the REST snapshot once subscribed, so no delta falls in between;
+        // also after a reconnect or when the server says we fell behind
+        source.onopen = refresh;
+        source.addEventListener('resync', refresh);
+
+        return () => {
+            source.close();
+            if (timer) clearTimeout(timer);
+        };
+    }, [topic, isLive, throttleMs, refresh]);
+
+    return { data, loading, refresh };
+}
+
+// Folds a delta into a /dashboard/stats response.
+export function applyStatsDelta(prev, delta) {
+    const byCategory = { ...prev.stats.by_category };
+    let newEvents = 0;
+    for (const [category, count] of Object.entries(delta.counters.logs)) {
+        const key = category in byCategory ? category : 'security';
+        byCategory[key] += count;
+        newEvents += count;
+    }
+    const newestFirst = (items) => [...items].reverse();
+    return {
+        ...prev,
+        stats: {
+            ...prev.stats,
+            events_last_hour: prev.stats.events_last_hour + newEvents,
+            offenses_last_hour: prev.stats.offenses_last_hour + delta.counters.alerts,
+            by_category: byCategory,
+        },
+        lists: {
+            ...prev.lists,
+            live_logs: [...newestFirst(delta.logs), ...prev.lists.live_logs].slice(0, 10),
+            recent_offenses: [...newestFirst(delta.alerts), ...prev.lists.recent_offenses].slice(0, 10),
+            anomalies: [...newestFirst(delta.alerts.filter((a) => a.risk_score > 50)), ...prev.lists.anomalies].slice(0, 8),
+        },
+    };
+}
@@ -1,3 +1,5 @@
+import json
+import threading
 import time
 import requests
 from rich.live import Live
@@ -22,6 +24,28 @@ def fetch_stats():
         pass
     return None
 
+def follow_stats(state):
+    """
+    Keep state["data"] current from the server's live stream (stats
+    snapshots are pushed when data changes) instead of polling. Reconnects,
+    reloading the REST snapshot, whenever the stream drops.
+    """
+    while True:
+        try:
+            with requests.get(f"{BASE_URL}/live/events", params={"topics": "stats"}, stream=True, timeout=(5, 60)) as response:
+                state["data"] = fetch_stats() or state["data"]
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event == "snapshot":
+                        state["data"] = json.loads(line[5:])["data"]
+                    elif line.startswith("data:") and event == "resync":
+                        state["data"] = fetch_stats() or state["data"]
+        except Exception:
+            pass
+        time.sleep(3)
+
 def make_header():
     grid = Table.grid(expand=True)
     grid.add_column(justify="left")
@@ -118,9 +142,12 @@ def make_layout():
 def run_tui():
     layout = make_layout()
     
+    state = {"data": fetch_stats()}
+    threading.Thread(target=follow_stats, args=(state,), daemon=True).start()
+
     with Live(layout, refresh_per_second=2, screen=True):
         while True:
-            data = fetch_stats()
+            data = state["data"]
             
             layout["header"].update(make_header())
             layout["stats"].update(make_stats_table(data))